@@ -13,21 +13,24 @@
 # limitations under the License.
 
 
-def convert_to_idl(package_dir, package_name, interface_file, output_dir):
+def convert_to_idl(package_dir, package_name, interface_file, output_dir, verbose=True):
     if interface_file.suffix == '.msg':
         from rosidl_adapter.msg import convert_msg_to_idl
         return convert_msg_to_idl(
-            package_dir, package_name, interface_file, output_dir / 'msg')
+            package_dir, package_name, interface_file, output_dir / 'msg',
+            verbose=verbose)
 
     if interface_file.suffix == '.srv':
         from rosidl_adapter.srv import convert_srv_to_idl
         return convert_srv_to_idl(
-            package_dir, package_name, interface_file, output_dir / 'srv')
+            package_dir, package_name, interface_file, output_dir / 'srv',
+            verbose=verbose)
 
     if interface_file.suffix == '.action':
         from rosidl_adapter.action import convert_action_to_idl
         return convert_action_to_idl(
-            package_dir, package_name, interface_file, output_dir / 'action')
+            package_dir, package_name, interface_file, output_dir / 'action',
+            verbose=verbose)
 
     assert False, "Unsupported interface type '{interface_file.suffix}'" \
         .format_map(locals())
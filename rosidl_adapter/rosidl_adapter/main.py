@@ -13,13 +13,14 @@
 # limitations under the License.
 
 import argparse
+import functools
 import json
 import os
 import pathlib
 import sys
 
-
 from rosidl_adapter import convert_to_idl
+from rosidl_adapter.parallel import process_in_parallel
 
 
 def main(argv=sys.argv[1:]):
@@ -38,6 +39,13 @@ def main(argv=sys.argv[1:]):
         '--output-file', required=True,
         help='The output file containing the tuples for the generated .idl '
              'files')
+    parser.add_argument(
+        '--jobs', type=int,
+        help='The maximum number of processes, defaults to the number of '
+             'CPUs')
+    parser.add_argument(
+        '--quiet', action='store_true',
+        help='Only print a summary instead of each converted file')
     args = parser.parse_args(argv)
     output_dir = pathlib.Path(args.output_dir)
     output_file = pathlib.Path(args.output_file)
@@ -45,15 +53,20 @@ def main(argv=sys.argv[1:]):
     with open(args.arguments_file, 'r') as h:
         data = json.load(h)
 
-    idl_tuples = []
+    interface_files = []
     for non_idl_tuple in data['non_idl_tuples']:
         # only take the filastrst : for separation, since the first tuple
         # contains an absolute path which on Windows contains a colon
         basepath, relative_path = non_idl_tuple.rsplit(':', 1)
-        abs_idl_file = convert_to_idl(
-            pathlib.Path(basepath), args.package_name,
-            pathlib.Path(relative_path), output_dir)
-        idl_tuples.append((output_dir, abs_idl_file.relative_to(output_dir)))
+        interface_files.append(
+            (pathlib.Path(basepath), pathlib.Path(relative_path)))
+
+    results = convert_interface_files(
+        interface_files, args.package_name, output_dir, jobs=args.jobs,
+        verbose=not args.quiet)
+    idl_tuples = [
+        (output_dir, abs_idl_file.relative_to(output_dir))
+        for abs_idl_file, _ in results]
 
     output_file.parent.mkdir(exist_ok=True)
     with output_file.open('w') as h:
@@ -62,3 +75,82 @@ def main(argv=sys.argv[1:]):
             # use CMake friendly separator
             line = line.replace(os.sep, '/')
             h.write(line)
+
+    count = len(results)
+    changed = sum(1 for _, is_changed in results if is_changed)
+    unchanged = count - changed
+    print(
+        'Converted {count} interface files to .idl: {changed} updated, '
+        '{unchanged} unchanged'.format_map(locals()))
+
+
+def convert_interface_files(
+    interface_files, package_name, output_dir, jobs=None, verbose=True
+):
+    """
+    Convert multiple interface files to .idl, in parallel if it is worth it.
+
+    The files are distributed across a pool of processes, see
+    `rosidl_adapter.parallel.process_in_parallel`.
+    The output of the processes is being printed in the order of the files.
+
+    If any files fail to convert the other files are still being converted,
+    each failure is reported and the exception of the first failing file is
+    being raised after all files have been processed.
+
+    :param interface_files: an iterable of tuples containing the package
+      directory and the relative path of an interface file
+    :param str package_name: the name of the package
+    :param output_dir: the base directory to create .idl files in
+    :param int jobs: the maximum number of processes, if None the number of
+      CPUs is being used
+    :param bool verbose: a flag if each input and output file should be
+      printed
+    :returns: a list of tuples in the order of the interface files, each
+      containing the path of the .idl file and a flag if the .idl file has
+      been created or updated
+    """
+    interface_files = list(interface_files)
+    results = process_in_parallel(
+        functools.partial(
+            _convert_interface_file, package_name=package_name,
+            output_dir=output_dir),
+        interface_files, jobs=jobs)
+    error = None
+    for (package_dir, interface_file), (result, e) in zip(
+        interface_files, results
+    ):
+        abs_input_file = package_dir / interface_file
+        if e is not None:
+            print(
+                "Failed to convert '{abs_input_file}': {e}"
+                .format_map(locals()), file=sys.stderr)
+            if error is None:
+                error = e
+        elif verbose:
+            abs_output_file = result[0].absolute()
+            print('Reading input file: {abs_input_file}'.format_map(locals()))
+            print('Writing output file: {abs_output_file}'.format_map(locals()))
+    if error is not None:
+        raise error
+    return [result for result, _ in results]
+
+
+def _convert_interface_file(interface_file_tuple, package_name, output_dir):
+    # the template is only written if the content changed, comparing the
+    # file state before and after the conversion detects that
+    package_dir, interface_file = interface_file_tuple
+    idl_file = output_dir / interface_file.suffix[1:] / \
+        interface_file.with_suffix('.idl').name
+    state = _get_file_state(idl_file)
+    abs_idl_file = convert_to_idl(
+        package_dir, package_name, interface_file, output_dir, verbose=False)
+    return abs_idl_file, _get_file_state(abs_idl_file) != state
+
+
+def _get_file_state(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
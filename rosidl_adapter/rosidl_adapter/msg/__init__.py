@@ -16,20 +16,22 @@ from rosidl_adapter.parser import parse_message_string
 from rosidl_adapter.resource import expand_template
 
 
-def convert_msg_to_idl(package_dir, package_name, input_file, output_dir):
+def convert_msg_to_idl(package_dir, package_name, input_file, output_dir, verbose=True):
     assert package_dir.is_absolute()
     assert not input_file.is_absolute()
     assert input_file.suffix == '.msg'
 
     abs_input_file = package_dir / input_file
-    print('Reading input file: {abs_input_file}'.format_map(locals()))
+    if verbose:
+        print('Reading input file: {abs_input_file}'.format_map(locals()))
     abs_input_file = package_dir / input_file
     content = abs_input_file.read_text(encoding='utf-8')
     msg = parse_message_string(package_name, input_file.stem, content)
 
     output_file = output_dir / input_file.with_suffix('.idl').name
     abs_output_file = output_file.absolute()
-    print('Writing output file: {abs_output_file}'.format_map(locals()))
+    if verbose:
+        print('Writing output file: {abs_output_file}'.format_map(locals()))
     data = {
         'pkg_name': package_name,
         'relative_input_file': input_file,
@@ -59,7 +61,7 @@ MSG_TYPE_TO_IDL = {
 
 
 def to_idl_literal(idl_type, value):
-    if idl_type[-1] in (']', '>'):
+    if idl_type[-1] == ']' or idl_type.startswith('sequence<'):
         elements = [repr(v) for v in value]
         while len(elements) < 2:
             elements.append('')
@@ -67,7 +69,7 @@ def to_idl_literal(idl_type, value):
 
     if 'boolean' == idl_type:
         return 'TRUE' if value else 'FALSE'
-    if 'string' == idl_type:
+    if idl_type.startswith('string'):
         return string_to_idl_string_literal(value)
     return value
 
@@ -90,6 +92,8 @@ def get_idl_type(type_):
         identifier = MSG_TYPE_TO_IDL[type_]
     elif type_.is_primitive_type():
         identifier = MSG_TYPE_TO_IDL[type_.type]
+        if type_.type == 'string' and type_.string_upper_bound is not None:
+            identifier += '<{type_.string_upper_bound}>'.format_map(locals())
     else:
         identifier = '{type_.pkg_name}::msg::{type_.type}' \
             .format_map(locals())
@@ -101,6 +105,9 @@ def get_idl_type(type_):
         return '{identifier}[{type_.array_size}]'.format_map(locals())
 
     if not type_.is_upper_bound:
+        # like in C++03 '>>' is a shift operator in IDL
+        if identifier.endswith('>'):
+            identifier += ' '
         return 'sequence<{identifier}>'.format_map(locals())
 
     return 'sequence<{identifier}, {type_.array_size}>'.format_map(locals())
@@ -0,0 +1,122 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import pickle
+import traceback
+
+# the minimum number of items for each process when processing in parallel
+MIN_ITEMS_PER_JOB = 32
+
+
+def process_in_parallel(
+    function, items, jobs=None, min_items_per_job=None, initializer=None,
+    initargs=()
+):
+    """
+    Invoke a function for each item, in parallel if it is worth it.
+
+    The items are distributed across a pool of processes.
+    Batches with less than `min_items_per_job` items per process are
+    processed within the current process since starting the processes would
+    take longer than processing the items.
+
+    An exception raised for an item doesn't stop the other items from being
+    processed.
+    Exceptions raised within the current process are returned as is.
+    Exceptions raised in another process keep their formatted traceback as
+    their cause, the ones which can't be pickled are replaced by a
+    `RuntimeError` containing the name of their type.
+
+    :param function: the callable invoked with each item, when using
+      multiple processes it must be importable from the worker processes
+    :param items: an iterable of items
+    :param int jobs: the maximum number of processes, if None the number of
+      CPUs is being used
+    :param int min_items_per_job: the minimum number of items for each
+      process, if None `MIN_ITEMS_PER_JOB` is being used
+    :param initializer: an optional callable invoked with `initargs` once in
+      each process processing items, including the current process if any
+      items are processed there
+    :param tuple initargs: the arguments for the initializer
+    :returns: a list of tuples in the order of the items, each containing
+      the return value and None, or None and the exception raised for the
+      item
+    """
+    items = list(items)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if min_items_per_job is None:
+        min_items_per_job = MIN_ITEMS_PER_JOB
+    jobs = min(jobs, len(items) // min_items_per_job)
+    if jobs <= 1:
+        if initializer is not None and items:
+            initializer(*initargs)
+        return [_try_invoke(function, item) for item in items]
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=initializer, initargs=initargs,
+    ) as executor:
+        results = list(executor.map(
+            _invoke_in_worker, itertools.repeat(function), items,
+            chunksize=max(1, len(items) // (4 * jobs))))
+    # the traceback isn't pickled together with the exception
+    for i, (result, error) in enumerate(results):
+        if error is not None:
+            error.error.__cause__ = _RemoteTraceback(error.tb)
+            results[i] = (None, error.error)
+    return results
+
+
+def _try_invoke(function, item):
+    # the exception is returned so that the other items are still processed
+    try:
+        return function(item), None
+    except Exception as e:
+        return None, e
+
+
+def _invoke_in_worker(function, item):
+    result, error = _try_invoke(function, item)
+    if error is None:
+        return result, None
+    tb = ''.join(traceback.format_exception(
+        type(error), error, error.__traceback__))
+    try:
+        # not all exceptions can be recreated from their arguments
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        error = RuntimeError('{type}: {error}'.format(
+            type=type(error).__name__, error=error))
+    return None, _ErrorWithTraceback(error, tb)
+
+
+class _ErrorWithTraceback:
+    """An exception raised in a worker process and its formatted traceback."""
+
+    def __init__(self, error, tb):
+        self.error = error
+        self.tb = tb
+
+
+class _RemoteTraceback(Exception):
+    """The formatted traceback of an exception raised in another process."""
+
+    def __init__(self, tb):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
@@ -12,9 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
 import os
 import re
 import sys
+import weakref
 
 PACKAGE_NAME_MESSAGE_TYPE_SEPARATOR = '/'
 COMMENT_DELIMITER = '#'
@@ -54,6 +56,20 @@ PRIMITIVE_TYPES = [
     'time',  # for compatibility only
 ]
 
+# the lower and upper bound of the integer types
+_INTEGER_TYPE_BOUNDS = {
+    'byte': (0, 255),
+    'char': (-128, 127),
+    'int8': (-2 ** 7, 2 ** 7 - 1),
+    'uint8': (0, 2 ** 8 - 1),
+    'int16': (-2 ** 15, 2 ** 15 - 1),
+    'uint16': (0, 2 ** 16 - 1),
+    'int32': (-2 ** 31, 2 ** 31 - 1),
+    'uint32': (0, 2 ** 32 - 1),
+    'int64': (-2 ** 63, 2 ** 63 - 1),
+    'uint64': (0, 2 ** 64 - 1),
+}
+
 VALID_PACKAGE_NAME_PATTERN = re.compile('^[a-z]([a-z0-9_]?[a-z0-9]+)*$')
 VALID_FIELD_NAME_PATTERN = re.compile('^[a-z]([a-z0-9_]?[a-z0-9]+)*$')
 # relaxed patterns used for compatibility with ROS 1 messages
@@ -92,6 +108,10 @@ class UnknownMessageType(InvalidSpecification):
     pass
 
 
+class CyclicMessageDependency(InvalidSpecification):
+    pass
+
+
 class InvalidValue(Exception):
 
     def __init__(self, type_, value_string, message_suffix=None):
@@ -147,30 +167,67 @@ def is_valid_constant_name(name):
     return m is not None and m.group(0) == name
 
 
-class BaseType:
+# the parsed types by class, type string and context package name, the
+# cache is cleared when reaching the maximum size
+_MAX_PARSED_TYPES = 4096
+_parsed_types = {}
+
+# the shared instances of all types by class and string representation
+_interned_types = weakref.WeakValueDictionary()
+
+
+class _InternedType(type):
+    """
+    Metaclass of the immutable types returning shared instances.
+
+    Parsing a type string is memoized, constructing a type which is equal to
+    an existing instance returns that instance instead.
+    """
+
+    def __call__(cls, type_string, context_package_name=None):
+        key = (cls, type_string, context_package_name)
+        try:
+            return _parsed_types[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable arguments are being rejected by the constructor
+            return super(_InternedType, cls).__call__(
+                type_string, context_package_name=context_package_name)
+
+        type_ = super(_InternedType, cls).__call__(
+            type_string, context_package_name=context_package_name)
+        type_ = _interned_types.setdefault((cls, str(type_)), type_)
+        if len(_parsed_types) >= _MAX_PARSED_TYPES:
+            _parsed_types.clear()
+        _parsed_types[key] = type_
+        return type_
 
-    __slots__ = ['pkg_name', 'type', 'string_upper_bound']
+
+class BaseType(metaclass=_InternedType):
+
+    __slots__ = ['pkg_name', 'type', 'string_upper_bound', '__weakref__']
 
     def __init__(self, type_string, context_package_name=None):
+        string_upper_bound = None
         # check for primitive types
         if type_string in PRIMITIVE_TYPES:
-            self.pkg_name = None
-            self.type = type_string
-            self.string_upper_bound = None
+            pkg_name = None
+            type_ = type_string
 
         elif type_string.startswith('string%s' % STRING_UPPER_BOUND_TOKEN):
-            self.pkg_name = None
-            self.type = 'string'
-            upper_bound_string = type_string[len(self.type) +
+            pkg_name = None
+            type_ = 'string'
+            upper_bound_string = type_string[len(type_) +
                                              len(STRING_UPPER_BOUND_TOKEN):]
 
             ex = TypeError(("the upper bound of the string type '%s' must " +
                             'be a valid integer value > 0') % type_string)
             try:
-                self.string_upper_bound = int(upper_bound_string)
+                string_upper_bound = int(upper_bound_string)
             except ValueError:
                 raise ex
-            if self.string_upper_bound <= 0:
+            if string_upper_bound <= 0:
                 raise ex
 
         else:
@@ -182,17 +239,20 @@ class BaseType:
 
             if len(parts) == 2:
                 # either the type string contains the package name
-                self.pkg_name = parts[0]
-                self.type = parts[1]
+                pkg_name = parts[0]
+                type_ = parts[1]
             else:
                 # or the package name is provided by context
-                self.pkg_name = context_package_name
-                self.type = type_string
-            if not is_valid_package_name(self.pkg_name):
-                raise InvalidResourceName(self.pkg_name)
-            if not is_valid_message_name(self.type):
-                raise InvalidResourceName(self.type)
-            self.string_upper_bound = None
+                pkg_name = context_package_name
+                type_ = type_string
+            if not is_valid_package_name(pkg_name):
+                raise InvalidResourceName(pkg_name)
+            if not is_valid_message_name(type_):
+                raise InvalidResourceName(type_)
+
+        self.pkg_name = pkg_name
+        self.type = type_
+        self.string_upper_bound = string_upper_bound
 
     def is_primitive_type(self):
         return self.pkg_name is None
@@ -207,6 +267,20 @@ class BaseType:
     def __hash__(self):
         return hash(str(self))
 
+    def __setattr__(self, name, value):
+        # each attribute can only be set once by the constructor
+        if hasattr(self, name):
+            raise AttributeError(
+                "'%s' object is immutable" % type(self).__name__)
+        super(BaseType, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("'%s' object is immutable" % type(self).__name__)
+
+    def __reduce__(self):
+        # the string representation is fully qualified
+        return type(self), (str(self), )
+
     def __str__(self):
         if self.pkg_name is not None:
             return '%s/%s' % (self.pkg_name, self.type)
@@ -224,11 +298,11 @@ class Type(BaseType):
 
     def __init__(self, type_string, context_package_name=None):
         # check for array brackets
-        self.is_array = type_string[-1] == ']'
+        is_array = type_string[-1] == ']'
 
-        self.array_size = None
-        self.is_upper_bound = False
-        if self.is_array:
+        array_size = None
+        is_upper_bound = False
+        if is_array:
             try:
                 index = type_string.rindex('[')
             except ValueError:
@@ -239,9 +313,9 @@ class Type(BaseType):
             if array_size_string != '':
 
                 # check if the limit is an upper bound
-                self.is_upper_bound = array_size_string.startswith(
+                is_upper_bound = array_size_string.startswith(
                     ARRAY_UPPER_BOUND_TOKEN)
-                if self.is_upper_bound:
+                if is_upper_bound:
                     array_size_string = array_size_string[
                         len(ARRAY_UPPER_BOUND_TOKEN):]
 
@@ -251,11 +325,11 @@ class Type(BaseType):
                     'an upper bound') %
                     (ARRAY_UPPER_BOUND_TOKEN, type_string))
                 try:
-                    self.array_size = int(array_size_string)
+                    array_size = int(array_size_string)
                 except ValueError:
                     raise ex
                 # check valid range
-                if self.array_size <= 0:
+                if array_size <= 0:
                     raise ex
 
             type_string = type_string[:index]
@@ -263,6 +337,9 @@ class Type(BaseType):
         super(Type, self).__init__(
             type_string,
             context_package_name=context_package_name)
+        self.is_array = is_array
+        self.array_size = array_size
+        self.is_upper_bound = is_upper_bound
 
     def is_dynamic_array(self):
         return self.is_array and (not self.array_size or self.is_upper_bound)
@@ -379,9 +456,9 @@ class MessageSpecification:
             self.fields.append(field)
         # ensure that there are no duplicate field names
         field_names = [f.name for f in self.fields]
-        duplicate_field_names = {n for n in field_names
-                                 if field_names.count(n) > 1}
-        if duplicate_field_names:
+        if len(set(field_names)) != len(field_names):
+            duplicate_field_names = {n for n in field_names
+                                     if field_names.count(n) > 1}
             raise ValueError(
                 'the fields iterable contains duplicate names: %s' %
                 ', '.join(sorted(duplicate_field_names)))
@@ -394,9 +471,9 @@ class MessageSpecification:
             self.constants.append(constant)
         # ensure that there are no duplicate constant names
         constant_names = [c.name for c in self.constants]
-        duplicate_constant_names = {n for n in constant_names
-                                    if constant_names.count(n) > 1}
-        if duplicate_constant_names:
+        if len(set(constant_names)) != len(constant_names):
+            duplicate_constant_names = {n for n in constant_names
+                                        if constant_names.count(n) > 1}
             raise ValueError(
                 'the constants iterable contains duplicate names: %s' %
                 ', '.join(sorted(duplicate_constant_names)))
@@ -546,8 +623,12 @@ def parse_message_string(pkg_name, msg_name, message_string):
     return msg
 
 
+# the pattern of a unit in brackets in the comment of a field / constant
+_UNIT_PATTERN = re.compile(r'(\s*\[([^,\]]+)\])')
+
+
 def process_comments(instance):
-    if 'comment' in instance.annotations:
+    if instance.annotations.get('comment'):
         lines = instance.annotations['comment']
         # remove empty leading lines
         while lines and lines[0] == '':
@@ -567,8 +648,7 @@ def process_comments(instance):
         # look for a unit in brackets
         # the unit should not contains a comma since it might be a range
         comment = '\n'.join(lines)
-        pattern = r'(\s*\[([^,\]]+)\])'
-        matches = re.findall(pattern, comment)
+        matches = _UNIT_PATTERN.findall(comment)
         if len(matches) == 1:
             instance.annotations['unit'] = matches[0][1]
             # remove the unit from the comment
@@ -609,12 +689,17 @@ def parse_value_string(type_, value_string):
                     'array must have not more than %u elements, not %u' %
                     (type_.array_size, len(value_strings)))
 
+        # parse numeric values all at once
+        values = _parse_numeric_value_strings(type_.type, value_strings)
+        if values is not None:
+            return values
+
         # parse all primitive values one by one
         values = []
+        base_type = Type(BaseType.__str__(type_))
         for index, element_string in enumerate(value_strings):
             element_string = element_string.strip()
             try:
-                base_type = Type(BaseType.__str__(type_))
                 value = parse_primitive_value_string(base_type, element_string)
             except InvalidValue as e:
                 raise InvalidValue(
@@ -626,57 +711,93 @@ def parse_value_string(type_, value_string):
         "parsing string values into type '%s' is not supported" % type_)
 
 
+def _parse_numeric_value_strings(primitive_type, value_strings):
+    # parse the elements of a numeric array and check the range of all values
+    # at once, returns None if the type isn't numeric or any element is invalid
+    # in which case the elements need to be parsed one by one to report the
+    # first invalid element
+    if primitive_type in ['float32', 'float64']:
+        convert = float
+    elif primitive_type in _INTEGER_TYPE_BOUNDS:
+        convert = int
+    else:
+        return None
+    try:
+        values = list(map(convert, map(str.strip, value_strings)))
+    except ValueError:
+        return None
+    if convert is int and values:
+        lower_bound, upper_bound = _INTEGER_TYPE_BOUNDS[primitive_type]
+        if min(values) < lower_bound or max(values) > upper_bound:
+            return None
+    return values
+
+
 def parse_string_array_value_string(element_string, expected_size):
     # Walks the string, if start with quote (' or ") find next unescapted quote,
     # returns a list of string elements
+    # The string is scanned once by advancing an index instead of slicing off
+    # the already parsed part, the remaining part is only sliced for errors
     value_strings = []
-    while len(element_string) > 0:
-        element_string = element_string.lstrip(' ')
-        if element_string[0] == ',':
-            raise ValueError("unxepected ',' at beginning of [%s]" % element_string)
-        if len(element_string) == 0:
-            return value_strings
+    length = len(element_string)
+    index = 0
+    while index < length:
+        index = _skip_spaces(element_string, index)
+        if element_string[index] == ',':
+            raise ValueError("unxepected ',' at beginning of [%s]" % element_string[index:])
         quoted_value = False
         for quote in ['"', "'"]:
-            if element_string.startswith(quote):
+            if element_string.startswith(quote, index):
                 quoted_value = True
-                end_quote_idx = find_matching_end_quote(element_string, quote)
+                end_quote_idx = find_matching_end_quote(element_string, quote, start=index)
                 if end_quote_idx == -1:
                     raise ValueError('string [%s] incorrectly quoted\n%s' % (
-                        element_string, value_strings))
+                        element_string[index:], value_strings))
                 else:
-                    value_string = element_string[1:end_quote_idx + 1]
+                    value_string = element_string[index + 1:index + end_quote_idx + 1]
                     value_string = value_string.replace('\\' + quote, quote)
                     value_strings.append(value_string)
-                    element_string = element_string[end_quote_idx + 2:]
+                    index = min(index + end_quote_idx + 2, length)
         if not quoted_value:
-            next_comma_idx = element_string.find(',')
+            next_comma_idx = element_string.find(',', index)
             if next_comma_idx == -1:
-                value_strings.append(element_string)
-                element_string = ''
+                value_strings.append(element_string[index:])
+                index = length
             else:
-                value_strings.append(element_string[:next_comma_idx])
-                element_string = element_string[next_comma_idx:]
-        element_string = element_string.lstrip(' ')
-        if len(element_string) > 0 and element_string[0] == ',':
-            element_string = element_string[1:]
+                value_strings.append(element_string[index:next_comma_idx])
+                index = next_comma_idx
+        index = _skip_spaces(element_string, index)
+        if index < length and element_string[index] == ',':
+            index += 1
     return value_strings
 
 
-def find_matching_end_quote(string, quote):
+def _skip_spaces(string, index):
+    # the index of the first character at or after the index which isn't a space
+    length = len(string)
+    while index < length and string[index] == ' ':
+        index += 1
+    return index
+
+
+def find_matching_end_quote(string, quote, start=0):
     # Given a string, walk it and find the next unescapted quote
     # returns the index of the ending quote if successful, -1 otherwise
+    # The string is expected to start with the quote at the start index, the
+    # returned index is relative to that and the search doesn't slice the string
     ending_quote_idx = -1
     final_quote_idx = 0
-    while len(string) > 0:
-        ending_quote_idx = string[1:].find(quote)
-        if ending_quote_idx == -1:
+    length = len(string)
+    while start < length:
+        quote_idx = string.find(quote, start + 1)
+        if quote_idx == -1:
             return -1
-        if string[ending_quote_idx:ending_quote_idx + 2] != '\\%s' % quote:
+        ending_quote_idx = quote_idx - start - 1
+        if string[quote_idx - 1] != '\\':
             # found a matching end quote that is not escaped
             return final_quote_idx + ending_quote_idx
         else:
-            string = string[ending_quote_idx + 2:]
+            start = quote_idx + 1
             final_quote_idx = ending_quote_idx + 2
     return -1
 
@@ -733,11 +854,7 @@ def parse_primitive_value_string(type_, value_string):
         'int32', 'uint32',
         'int64', 'uint64',
     ]:
-        # determine lower and upper bound
-        is_unsigned = primitive_type.startswith('u')
-        bits = int(primitive_type[4 if is_unsigned else 3:])
-        lower_bound = 0 if is_unsigned else -(2 ** (bits - 1))
-        upper_bound = (2 ** (bits if is_unsigned else (bits - 1))) - 1
+        lower_bound, upper_bound = _INTEGER_TYPE_BOUNDS[primitive_type]
 
         ex = InvalidValue(primitive_type, value_string,
                           'must be a valid integer value >= %d and <= %u' %
@@ -783,6 +900,34 @@ def parse_primitive_value_string(type_, value_string):
 
 
 def validate_field_types(spec, known_msg_types):
+    for message in _get_unknown_field_type_messages(spec, known_msg_types):
+        raise UnknownMessageType(message)
+
+
+def validate_all_field_types(specs, known_msg_types):
+    """
+    Validate the field types of multiple interfaces in a single pass.
+
+    Unlike `validate_field_types` all unknown field types are reported at
+    once.
+
+    :param specs: an iterable of message, service and action specifications,
+      e.g. all interfaces of a package
+    :param known_msg_types: the known message types as `BaseType` instances,
+      a container supporting fast membership tests like a set or a
+      `TypeRegistry` is used as is, any other iterable is converted to a set
+    :raises: UnknownMessageType listing all fields with an unknown type
+    """
+    if not isinstance(known_msg_types, (set, frozenset, dict, TypeRegistry)):
+        known_msg_types = set(known_msg_types)
+    messages = []
+    for spec in specs:
+        messages += _get_unknown_field_type_messages(spec, known_msg_types)
+    if messages:
+        raise UnknownMessageType('\n'.join(messages))
+
+
+def _get_unknown_field_type_messages(spec, known_msg_types):
     if isinstance(spec, MessageSpecification):
         spec_type = 'Message'
         fields = spec.fields
@@ -802,9 +947,172 @@ def validate_field_types(spec, known_msg_types):
             continue
         base_type = BaseType(BaseType.__str__(field.type))
         if base_type not in known_msg_types:
+            yield "%s interface '%s' contains an unknown field type: %s" % \
+                (spec_type, base_type, field)
+
+
+class TypeRegistry:
+    """
+    An index of the message types of a package and its dependencies.
+
+    The types are derived from the interface file names.
+    Each message file is only parsed when its specification or its
+    dependencies are needed.
+    """
+
+    def __init__(self, parse_message_file=None):
+        """
+        Constructor.
+
+        :param parse_message_file: an optional callable to parse a message
+          file with, invoked with the package name and the file path,
+          by default `parse_message_file`
+        """
+        self._interface_files = OrderedDict()
+        self._parse_message_file = parse_message_file
+        self._specs = {}
+        self._dependencies = {}
+
+    def add_interface_file(self, pkg_name, interface_file):
+        """
+        Add an interface file to the registry.
+
+        :param str pkg_name: the name of the package containing the file
+        :param str interface_file: the path of the interface file
+        :returns: the `BaseType` of the message or None if the file isn't a
+          .msg file
+        """
+        msg_name, extension = os.path.splitext(
+            os.path.basename(interface_file))
+        if extension != '.msg':
+            return None
+        base_type = BaseType(
+            pkg_name + PACKAGE_NAME_MESSAGE_TYPE_SEPARATOR + msg_name)
+        self._interface_files[base_type] = interface_file
+        return base_type
+
+    def add_message_specification(self, spec, interface_file=None):
+        """
+        Add an already parsed message to the registry.
+
+        :param MessageSpecification spec: the message specification
+        :param str interface_file: the path of the interface file if any
+        """
+        self._interface_files[spec.base_type] = interface_file
+        self._specs[spec.base_type] = spec
+        self._dependencies.pop(spec.base_type, None)
+
+    def __contains__(self, base_type):
+        return base_type in self._interface_files
+
+    def __iter__(self):
+        return iter(self._interface_files)
+
+    def __len__(self):
+        return len(self._interface_files)
+
+    def get_interface_file(self, base_type):
+        """
+        Get the path of the interface file of a message type.
+
+        :raises: UnknownMessageType if the type isn't in the registry
+        """
+        try:
+            return self._interface_files[base_type]
+        except KeyError:
             raise UnknownMessageType(
-                "%s interface '%s' contains an unknown field type: %s" %
-                (spec_type, base_type, field))
+                "Unknown message type '%s'" % base_type)
+
+    def get_message_specification(self, base_type):
+        """
+        Get the specification of a message type, parsing the file if needed.
+
+        :raises: UnknownMessageType if the type isn't in the registry
+        """
+        spec = self._specs.get(base_type)
+        if spec is None:
+            parse = self._parse_message_file or parse_message_file
+            spec = parse(
+                base_type.pkg_name, self.get_interface_file(base_type))
+            self._specs[base_type] = spec
+        return spec
+
+    def get_dependencies(self, base_type):
+        """
+        Get the message types used by the fields of a message type.
+
+        :returns: a tuple of unique `BaseType` instances in field order
+        """
+        dependencies = self._dependencies.get(base_type)
+        if dependencies is None:
+            spec = self.get_message_specification(base_type)
+            dependencies = OrderedDict()
+            for field in spec.fields:
+                if not field.type.is_primitive_type():
+                    dependencies[BaseType(BaseType.__str__(field.type))] = None
+            dependencies = tuple(dependencies.keys())
+            self._dependencies[base_type] = dependencies
+        return dependencies
+
+    def get_dependency_graph(self):
+        """
+        Get the dependencies of all message types in the registry.
+
+        :returns: an OrderedDict mapping each `BaseType` to the tuple of
+          `BaseType` instances it depends on
+        """
+        return OrderedDict(
+            (base_type, self.get_dependencies(base_type))
+            for base_type in self._interface_files.keys())
+
+    def get_topological_order(self, base_types=None):
+        """
+        Get message types ordered so that each type follows its dependencies.
+
+        Dependencies which aren't in the registry are skipped, they are
+        reported by `validate_field_types`.
+        The order is deterministic and otherwise follows the order in which
+        the types have been added.
+
+        :param base_types: an iterable of `BaseType` instances to order
+          (including their transitive dependencies), or None for all types
+        :returns: a list of `BaseType` instances
+        :raises: CyclicMessageDependency if the types depend on each other
+        """
+        if base_types is None:
+            base_types = self._interface_files.keys()
+        order = []
+        # the state of each visited type: False while its dependencies are
+        # being visited, True once it has been added to the order
+        visited = {}
+        for root in base_types:
+            if root in visited:
+                continue
+            visited[root] = False
+            stack = [(root, iter(self.get_dependencies(root)))]
+            while stack:
+                base_type, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency not in self._interface_files:
+                        continue
+                    state = visited.get(dependency)
+                    if state is None:
+                        visited[dependency] = False
+                        stack.append(
+                            (dependency,
+                             iter(self.get_dependencies(dependency))))
+                        break
+                    if state is False:
+                        cycle = [t for t, _ in stack]
+                        cycle = cycle[cycle.index(dependency):] + [dependency]
+                        raise CyclicMessageDependency(
+                            'Cyclic dependency between message types: %s' %
+                            ' -> '.join(str(t) for t in cycle))
+                else:
+                    stack.pop()
+                    visited[base_type] = True
+                    order.append(base_type)
+        return order
 
 
 class ServiceSpecification:
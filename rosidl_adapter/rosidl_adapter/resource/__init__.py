@@ -18,9 +18,18 @@ import sys
 
 import em
 
+# the environment variable selecting the EmPy templates to generate .idl files
+USE_EMPY_ENVIRONMENT_VARIABLE = 'ROSIDL_ADAPTER_USE_EMPY'
+
 
 def expand_template(template_name, data, output_file):
-    content = evaluate_template(template_name, data)
+    # the templates are only evaluated with EmPy if requested, otherwise the
+    # identical content is generated by the pure Python writer
+    if os.environ.get(USE_EMPY_ENVIRONMENT_VARIABLE) not in (None, '', '0'):
+        content = evaluate_template(template_name, data)
+    else:
+        from rosidl_adapter.resource.idl_writer import write_template
+        content = write_template(template_name, data)
 
     if output_file.exists():
         existing_content = output_file.read_text()
@@ -0,0 +1,169 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Each function in this module produces exactly the same output as the
+# EmPy template with the same name, any change to one of the templates must
+# be applied here as well.
+
+from collections import OrderedDict
+
+from rosidl_adapter.msg import get_idl_type
+from rosidl_adapter.msg import get_include_file
+from rosidl_adapter.msg import string_to_idl_string_literal
+from rosidl_adapter.msg import to_idl_literal
+
+
+def write_template(template_name, data):
+    """
+    Generate the content of one of the .idl templates without EmPy.
+
+    :param str template_name: the name of the template, e.g. `msg.idl.em`
+    :param dict data: the data the template would be evaluated with
+    :returns: the generated content, which is identical to the result of
+      `evaluate_template`
+    :raises: KeyError if there is no writer for the template
+    """
+    output = []
+    _TEMPLATE_WRITERS[template_name](output, **data)
+    return ''.join(output)
+
+
+def _write_msg_idl(output, pkg_name, relative_input_file, msg):
+    _write_header(output, 'msg', pkg_name, relative_input_file, msg.fields)
+    _write_struct(output, msg)
+    _write_footer(output)
+
+
+def _write_srv_idl(output, pkg_name, relative_input_file, srv):
+    _write_header(
+        output, 'srv', pkg_name, relative_input_file,
+        srv.request.fields + srv.response.fields)
+    _write_struct(output, srv.request)
+    _write_struct(output, srv.response)
+    _write_footer(output)
+
+
+def _write_action_idl(output, pkg_name, relative_input_file, action):
+    fields = action.goal_service.request.fields + \
+        action.goal_service.response.fields + \
+        action.result_service.request.fields + \
+        action.result_service.response.fields + \
+        action.feedback.fields
+    _write_header(output, 'action', pkg_name, relative_input_file, fields)
+    _write_struct(output, action.goal_service.request)
+    _write_struct(output, action.result_service.response)
+    _write_struct(output, action.feedback)
+    _write_footer(output)
+
+
+def _write_header(output, subfolder, pkg_name, relative_input_file, fields):
+    output.append(
+        '// generated from rosidl_adapter/resource/%s.idl.em\n'
+        '// with input from %s/%s\n'
+        '\n' % (subfolder, pkg_name, relative_input_file))
+    include_files = set()
+    for field in fields:
+        include_file = get_include_file(field.type)
+        if include_file is not None:
+            include_files.add(include_file)
+    for include_file in sorted(include_files):
+        output.append('#include "%s"\n' % include_file)
+    output.append(
+        '\n'
+        'module %s {\n'
+        '  module %s {\n' % (pkg_name, subfolder))
+
+
+def _write_footer(output):
+    output.append(
+        '  };\n'
+        '};\n')
+
+
+def _write_struct(output, msg):
+    # same as struct.idl.em
+    # typedefs for arrays need to be defined outside of the struct
+    typedefs = OrderedDict()
+    for field in msg.fields:
+        if not field.type.is_fixed_size_array():
+            continue
+        idl_type = get_idl_type(field.type)
+        idl_base_type = idl_type.split('[', 1)[0]
+        idl_base_type_identifier = idl_base_type.replace('::', '__')
+        # only necessary for complex types
+        if idl_base_type_identifier != idl_base_type:
+            if idl_base_type_identifier not in typedefs:
+                typedefs[idl_base_type_identifier] = idl_base_type
+            else:
+                assert typedefs[idl_base_type_identifier] == idl_base_type
+        idl_type_identifier = _get_idl_type_identifier(idl_type) + \
+            '[' + str(field.type.array_size) + ']'
+        if idl_type_identifier not in typedefs:
+            typedefs[idl_type_identifier] = idl_base_type_identifier
+        else:
+            assert typedefs[idl_type_identifier] == idl_base_type_identifier
+    for k, v in typedefs.items():
+        output.append('    typedef %s %s;\n' % (v, k))
+
+    if msg.constants:
+        output.append('    module %s_Constants {\n' % msg.msg_name)
+        for constant in msg.constants:
+            idl_type = get_idl_type(constant.type)
+            output.append('      const %s %s = %s;\n' % (
+                idl_type, constant.name,
+                to_idl_literal(idl_type, constant.value)))
+        output.append('    };\n')
+
+    if msg.annotations.get('comment', []):
+        output.append('    /*\n')
+        for comment in msg.annotations['comment']:
+            output.append('     *%s\n' % comment)
+        output.append('     */\n')
+
+    output.append('    struct %s {\n' % msg.msg_name)
+    if msg.fields:
+        for i, field in enumerate(msg.fields):
+            if i > 0:
+                output.append('\n')
+            if field.annotations.get('comment', []):
+                output.append('      /*\n')
+                for comment in field.annotations['comment']:
+                    output.append('       *%s\n' % comment)
+                output.append('       */\n')
+            idl_type = get_idl_type(field.type)
+            if field.default_value is not None:
+                output.append('      @default (value=%s)\n' % to_idl_literal(
+                    idl_type, field.default_value))
+            if 'unit' in field.annotations:
+                output.append('      @unit (value=%s)\n' % string_to_idl_string_literal(
+                    field.annotations['unit']))
+            if field.type.is_fixed_size_array():
+                idl_type = _get_idl_type_identifier(idl_type)
+            output.append('      %s %s;\n' % (idl_type, field.name))
+    else:
+        output.append('      boolean structure_needs_at_least_one_member;\n')
+    output.append('    };\n')
+
+
+def _get_idl_type_identifier(idl_type):
+    return idl_type.replace('::', '__') \
+        .replace('<', '__').replace('>', '') \
+        .replace('[', '__').replace(']', '')
+
+
+_TEMPLATE_WRITERS = {
+    'msg.idl.em': _write_msg_idl,
+    'srv.idl.em': _write_srv_idl,
+    'action.idl.em': _write_action_idl,
+}
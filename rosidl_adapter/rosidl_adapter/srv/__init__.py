@@ -16,20 +16,22 @@ from rosidl_adapter.parser import parse_service_string
 from rosidl_adapter.resource import expand_template
 
 
-def convert_srv_to_idl(package_dir, package_name, input_file, output_dir):
+def convert_srv_to_idl(package_dir, package_name, input_file, output_dir, verbose=True):
     assert package_dir.is_absolute()
     assert not input_file.is_absolute()
     assert input_file.suffix == '.srv'
 
     abs_input_file = package_dir / input_file
-    print('Reading input file: {abs_input_file}'.format_map(locals()))
+    if verbose:
+        print('Reading input file: {abs_input_file}'.format_map(locals()))
     abs_input_file = package_dir / input_file
     content = abs_input_file.read_text(encoding='utf-8')
     srv = parse_service_string(package_name, input_file.stem, content)
 
     output_file = output_dir / input_file.with_suffix('.idl').name
     abs_output_file = output_file.absolute()
-    print('Writing output file: {abs_output_file}'.format_map(locals()))
+    if verbose:
+        print('Writing output file: {abs_output_file}'.format_map(locals()))
     data = {
         'pkg_name': package_name,
         'relative_input_file': input_file,
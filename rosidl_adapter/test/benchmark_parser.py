@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import sys
+import timeit
+
+from rosidl_adapter.parser import BaseType
+from rosidl_adapter.parser import parse_message_string
+from rosidl_adapter.parser import validate_all_field_types
+from rosidl_adapter.parser import validate_field_types
+
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        description='Measure the performance of the message parser.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        'paths', nargs='*',
+        help='The base paths to search for .msg files to measure parsing')
+    parser.add_argument(
+        '--scale', type=int, default=1000,
+        help='The number of times each .msg file is parsed')
+    parser.add_argument(
+        '--messages', type=int, default=1000,
+        help='The number of messages of the synthetic package')
+    parser.add_argument(
+        '--dependencies', type=int, default=200,
+        help='The number of message types of other packages')
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='The number of measurements, the fastest one is reported')
+    args = parser.parse_args(argv)
+
+    if args.paths:
+        messages = []
+        for filename in get_files(args.paths):
+            with open(filename, 'r') as h:
+                messages.append((
+                    os.path.basename(os.path.dirname(os.path.dirname(filename))),
+                    os.path.splitext(os.path.basename(filename))[0],
+                    h.read()))
+        print('%d .msg files with %d lines, each parsed %d times' % (
+            len(messages), sum(len(m[2].splitlines()) for m in messages),
+            args.scale))
+
+        def parse():
+            for _ in range(args.scale):
+                for pkg_name, msg_name, message_string in messages:
+                    parse_message_string(pkg_name, msg_name, message_string)
+
+        duration = min(timeit.repeat(parse, number=1, repeat=args.repeat))
+        print('parse_message_string: %.2f s' % duration)
+
+    specs, known_msg_types = create_package(args.messages, args.dependencies)
+    print('%d messages, %d known message types' % (
+        len(specs), len(known_msg_types)))
+
+    def validate_each():
+        for spec in specs:
+            validate_field_types(spec, known_msg_types)
+
+    def validate_all():
+        validate_all_field_types(specs, known_msg_types)
+
+    for name, function in (
+        ('validate_field_types for each message', validate_each),
+        ('validate_all_field_types', validate_all),
+    ):
+        duration = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print('%s: %.2f ms' % (name, duration * 1000))
+
+    return 0
+
+
+def get_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                # ignore folder starting with . or _
+                dirnames[:] = sorted(d for d in dirnames if d[0] not in ['.', '_'])
+                files += [
+                    os.path.join(dirpath, f) for f in sorted(filenames)
+                    if f.endswith('.msg')]
+        if os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def create_package(message_count, dependency_count):
+    """
+    Create the specifications of a synthetic package.
+
+    Each message uses primitive types, another message of the same package
+    and a few messages of other packages.
+
+    :returns: a tuple containing the list of specifications and the list of
+      all known message types
+    """
+    dependencies = [
+        'dep_pkg%d/Dependency%d' % (i % 10, i) for i in range(dependency_count)]
+    specs = []
+    for i in range(message_count):
+        lines = ['int32 a', 'string b', 'float64[3] c']
+        if i:
+            lines.append('Message%d d' % (i - 1))
+        for j in range(3):
+            lines.append('%s[] dep%d' % (
+                dependencies[(i * 3 + j) % dependency_count], j))
+        specs.append(parse_message_string(
+            'pkg', 'Message%d' % i, '\n'.join(lines)))
+    known_msg_types = [spec.base_type for spec in specs] + [
+        BaseType(dependency) for dependency in dependencies]
+    return specs, known_msg_types
+
+
+if __name__ == '__main__':
+    sys.exit(main())
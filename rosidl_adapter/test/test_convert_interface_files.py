@@ -0,0 +1,82 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+
+import em
+import pytest
+
+from rosidl_adapter import parallel
+from rosidl_adapter.main import convert_interface_files
+
+
+@pytest.fixture(autouse=True)
+def empy_stdout_proxy(monkeypatch):
+    # EmPy refuses to install its stdout proxy again after pytest replaced
+    # sys.stdout between tests
+    monkeypatch.setattr(em.Interpreter, '_wasProxyInstalled', False)
+
+
+def _write_interface_files(package_dir, count):
+    interface_files = []
+    for i in range(count):
+        interface_file = pathlib.Path('msg') / ('Msg%d.msg' % i)
+        path = package_dir / interface_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('int32 a %d\n' % i)
+        interface_files.append((package_dir, interface_file))
+    return interface_files
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_convert_interface_files(tmpdir, monkeypatch, capsys, jobs):
+    monkeypatch.setattr(parallel, 'MIN_ITEMS_PER_JOB', 1)
+    package_dir = pathlib.Path(str(tmpdir)) / 'pkg'
+    output_dir = pathlib.Path(str(tmpdir)) / 'idl'
+    interface_files = _write_interface_files(package_dir, 4)
+
+    results = convert_interface_files(
+        interface_files, 'pkg', output_dir, jobs=jobs)
+    assert [r[0] for r in results] == [
+        output_dir / 'msg' / ('Msg%d.idl' % i) for i in range(4)]
+    assert all(r[1] for r in results)
+    assert 'int32 a' in results[0][0].read_text()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].endswith('Msg0.msg')
+    assert lines[-1].endswith('Msg3.idl')
+
+    (package_dir / 'msg' / 'Msg2.msg').write_text('int32 b\n')
+    results = convert_interface_files(
+        interface_files, 'pkg', output_dir, jobs=jobs, verbose=False)
+    assert [r[1] for r in results] == [False, False, True, False]
+    assert capsys.readouterr().out == ''
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_convert_interface_files_error(tmpdir, monkeypatch, capsys, jobs):
+    monkeypatch.setattr(parallel, 'MIN_ITEMS_PER_JOB', 1)
+    package_dir = pathlib.Path(str(tmpdir)) / 'pkg'
+    interface_files = _write_interface_files(package_dir, 4)
+    (package_dir / 'msg' / 'Msg1.msg').write_text('int32 1a\n')
+    (package_dir / 'msg' / 'Msg2.msg').write_text('int32 2a\n')
+
+    # the other files are still converted and each failure is reported
+    with pytest.raises(NameError):
+        convert_interface_files(
+            interface_files, 'pkg', pathlib.Path(str(tmpdir)) / 'idl',
+            jobs=jobs, verbose=False)
+    err = capsys.readouterr().err
+    assert 'Msg1.msg' in err
+    assert 'Msg2.msg' in err
+    assert (pathlib.Path(str(tmpdir)) / 'idl' / 'msg' / 'Msg3.idl').exists()
@@ -0,0 +1,137 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import os
+import pathlib
+
+import em
+import pytest
+
+from rosidl_adapter import convert_to_idl
+from rosidl_adapter.resource import USE_EMPY_ENVIRONMENT_VARIABLE
+
+INTERFACES = {
+    'msg/Features.msg': (
+        '# a file-level comment\n'
+        '#\n'
+        '#  with "quotes"\n'
+        '\n'
+        'bool BOOL_CONSTANT=true\n'
+        'byte BYTE_CONSTANT=255\n'
+        'char CHAR_CONSTANT=-1\n'
+        'int64 INT_CONSTANT=-9223372036854775808\n'
+        'float64 FLOAT_CONSTANT=1.5\n'
+        'string STRING_CONSTANT="foo\'bar"\n'
+        '# a comment\n'
+        'bool a true\n'
+        'float32 b 1.25  # [m/s]\n'
+        '  # an indented comment\n'
+        'string c "Hello\\"World"\n'
+        'string<=5 d "abc"\n'
+        'string<=5[3] e ["a", "b\'c", "d"]\n'
+        'string<=5[<=10] f\n'
+        'int32[] g [1]\n'
+        'int32[3] h [1, 2, 3]\n'
+        'uint8[<=2] i []\n'
+        'Other j\n'
+        'Other[2] k\n'
+        'other_pkg/Other[2] l\n'
+        'other_pkg/Other[] m\n'
+        'other_pkg/Other[<=3] n\n'
+        'string<=5[] o ["a", "b"]\n'
+        'string<=5[<=3] p\n'),
+    'msg/Empty.msg': '',
+    'msg/OnlyConstants.msg': 'int8 A=1\nint8 B=2\n',
+    'srv/Service.srv': (
+        'int8 REQUEST_CONSTANT=1\n'
+        'other_pkg/Other request\n'
+        '---\n'
+        '# a response comment\n'
+        'string RESPONSE_CONSTANT="bar"\n'
+        'bool[] response [true, false]\n'),
+    'action/Action.action': (
+        'int32 goal 5\n'
+        '---\n'
+        'Other[] result\n'
+        '---\n'
+        'float64 FEEDBACK_CONSTANT=0.5\n'
+        'string<=3 feedback\n'),
+    'action/EmptyAction.action': '---\n---\n',
+}
+
+# the interface files of other packages in the same source tree
+REPOSITORY_INTERFACE_FILES = sorted(
+    f
+    for subfolder, extension in (
+        ('msg', '.msg'), ('srv', '.srv'), ('action', '.action'))
+    for f in glob.glob(os.path.join(
+        os.path.dirname(__file__), '..', '..', '*', subfolder,
+        '*' + extension)))
+
+
+@pytest.fixture(autouse=True)
+def empy_stdout_proxy(monkeypatch):
+    # EmPy refuses to install its stdout proxy again after pytest replaced
+    # sys.stdout between tests
+    monkeypatch.setattr(em.Interpreter, '_wasProxyInstalled', False)
+
+
+def _assert_identical(
+    monkeypatch, output_dir, package_dir, package_name, interface_file
+):
+    contents = []
+    for use_empy in ('1', ''):
+        monkeypatch.setenv(USE_EMPY_ENVIRONMENT_VARIABLE, use_empy)
+        idl_file = convert_to_idl(
+            package_dir, package_name, interface_file,
+            output_dir / ('empy' if use_empy else 'writer'), verbose=False)
+        contents.append(idl_file.read_bytes())
+    assert contents[0] == contents[1]
+
+
+@pytest.mark.parametrize('interface_file', sorted(INTERFACES.keys()))
+def test_idl_writer(tmpdir, monkeypatch, interface_file):
+    package_dir = pathlib.Path(str(tmpdir)) / 'pkg'
+    path = package_dir / interface_file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(INTERFACES[interface_file])
+    _assert_identical(
+        monkeypatch, pathlib.Path(str(tmpdir)), package_dir, 'pkg',
+        pathlib.Path(interface_file))
+
+
+def test_idl_writer_bounded_string_sequence(tmpdir, monkeypatch):
+    package_dir = pathlib.Path(str(tmpdir)) / 'pkg'
+    path = package_dir / 'msg' / 'Features.msg'
+    path.parent.mkdir(parents=True)
+    path.write_text(INTERFACES['msg/Features.msg'])
+    idl_file = convert_to_idl(
+        package_dir, 'pkg', pathlib.Path('msg/Features.msg'),
+        pathlib.Path(str(tmpdir)) / 'idl', verbose=False)
+    # like in C++03 the closing angle brackets must be separated
+    content = idl_file.read_text()
+    assert 'sequence<string<5> > o;' in content
+    assert 'sequence<string<5>, 3> p;' in content
+
+
+@pytest.mark.parametrize(
+    'interface_file', REPOSITORY_INTERFACE_FILES,
+    ids=[os.path.basename(f) for f in REPOSITORY_INTERFACE_FILES])
+def test_idl_writer_repository_interfaces(tmpdir, monkeypatch, interface_file):
+    path = pathlib.Path(os.path.abspath(interface_file))
+    package_dir = path.parent.parent
+    _assert_identical(
+        monkeypatch, pathlib.Path(str(tmpdir)), package_dir, package_dir.name,
+        pathlib.Path(path.parent.name) / path.name)
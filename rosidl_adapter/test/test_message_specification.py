@@ -60,3 +60,33 @@ def test_message_specification_methods():
     assert msg_spec != MessageSpecification('pkg', 'Bar', [], [])
     assert msg_spec != MessageSpecification('pkg', 'Foo', [field], [])
     assert msg_spec != MessageSpecification('pkg', 'Foo', [], [constant])
+
+
+class _CountingName(str):
+    comparisons = 0
+
+    def __eq__(self, other):
+        _CountingName.comparisons += 1
+        return str.__eq__(self, other)
+
+    __hash__ = str.__hash__
+
+
+def test_message_specification_duplicate_names_scaling():
+    for count in (10, 1000):
+        fields = [
+            Field(Type('int32'), _CountingName('foo%d' % i))
+            for i in range(count)]
+        constants = [
+            Constant('int32', _CountingName('BAR%d' % i), '1')
+            for i in range(count)]
+        _CountingName.comparisons = 0
+        MessageSpecification('pkg', 'Foo', fields, constants)
+        # the names are only compared with each other on hash collisions
+        # instead of comparing each name with all the others
+        assert _CountingName.comparisons < count
+
+    # duplicates are still reported
+    with pytest.raises(ValueError) as e:
+        MessageSpecification('pkg', 'Foo', fields + fields[:2], constants)
+    assert str(e.value).endswith(': foo0, foo1')
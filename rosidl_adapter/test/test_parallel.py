@@ -0,0 +1,73 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from rosidl_adapter.parallel import process_in_parallel
+
+_offset = 0
+
+
+class UnpicklableError(Exception):
+
+    def __init__(self, value, other):
+        super().__init__(value)
+
+
+def _initialize(offset):
+    global _offset
+    _offset = offset
+
+
+def _process(item):
+    if item == 2:
+        raise ValueError('invalid item %d' % item)
+    if item == 3:
+        raise UnpicklableError('unpicklable item %d' % item, None)
+    return item + _offset, os.getpid()
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_process_in_parallel(jobs):
+    results = process_in_parallel(
+        _process, range(8), jobs=jobs, min_items_per_job=1,
+        initializer=_initialize, initargs=(10,))
+    assert [r[0] for r, e in results if e is None] == \
+        [10, 11, 14, 15, 16, 17]
+    pids = {r[1] for r, e in results if e is None}
+    assert (os.getpid() in pids) == (jobs == 1)
+
+    # the other items are still processed after an exception
+    assert [r is None for r, _ in results] == [
+        False, False, True, True, False, False, False, False]
+    error = results[2][1]
+    assert isinstance(error, ValueError)
+    assert str(error) == 'invalid item 2'
+    error = results[3][1]
+    if jobs == 1:
+        assert isinstance(error, UnpicklableError)
+    else:
+        # exceptions from other processes keep their type and traceback
+        assert isinstance(error, RuntimeError)
+        assert str(error) == 'UnpicklableError: unpicklable item 3'
+        assert 'in _process' in str(error.__cause__)
+        assert 'in _process' in str(results[2][1].__cause__)
+
+
+def test_process_in_parallel_min_items_per_job():
+    # too few items for a second process
+    results = process_in_parallel(_process, [0, 1], jobs=2)
+    assert {r[1] for r, _ in results} == {os.getpid()}
@@ -14,6 +14,7 @@
 
 import pytest
 
+from rosidl_adapter import parser
 from rosidl_adapter.parser import InvalidFieldDefinition
 from rosidl_adapter.parser import InvalidResourceName
 from rosidl_adapter.parser import parse_message_string
@@ -71,3 +72,52 @@ def test_parse_message_string():
     with pytest.raises(ValueError) as e:
         parse_message_string('pkg', 'Foo', 'bool FOO=1\nbool FOO=1')
     assert 'FOO' in str(e)
+
+
+def test_parse_message_string_whitespace_and_comments():
+    msg_spec = parse_message_string('pkg', 'Foo', (
+        '# file-level\n'
+        '#\n'
+        '\n'
+        '# leading\n'
+        'string  \t a  "x#y" # c1\n'
+        '  # indented\n'
+        'int32 \tb\n'
+        'int32 FOO \t=\t 1 \t# c2\n'
+        'bool c  # [m/s]\n'))
+    assert msg_spec.annotations['comment'] == [' file-level']
+    assert [(str(f.type), f.name, f.default_value) for f in msg_spec.fields] == [
+        ('string', 'a', '"x'), ('int32', 'b', None), ('bool', 'c', None)]
+    assert msg_spec.fields[0].annotations['comment'] == [
+        ' leading', 'y" # c1', ' indented']
+    assert msg_spec.fields[2].annotations['unit'] == 'm/s'
+    assert msg_spec.constants[0].name == 'FOO'
+    assert msg_spec.constants[0].value == 1
+    assert msg_spec.constants[0].annotations['comment'] == [' c2']
+
+    with pytest.raises(InvalidFieldDefinition) as e:
+        parse_message_string('pkg', 'Foo', 'int32\ta  # comment')
+    assert str(e.value) == 'int32\ta'
+
+
+def test_parse_message_string_comment_scaling(monkeypatch):
+    searched_comments = []
+    unit_pattern = parser._UNIT_PATTERN
+
+    class CountingPattern:
+
+        def findall(self, comment):
+            searched_comments.append(comment)
+            return unit_pattern.findall(comment)
+
+    monkeypatch.setattr(parser, '_UNIT_PATTERN', CountingPattern())
+    for count in (10, 1000):
+        searched_comments.clear()
+        msg_spec = parse_message_string('pkg', 'Foo', (
+            ''.join('int32 foo%d\n' % i for i in range(count)) +
+            'int32 BAR=1\n'
+            'bool baz  # [m/s]\n'))
+        # only the comments of commented elements are searched for a unit,
+        # independent of the number of other elements
+        assert searched_comments == [' [m/s]']
+        assert msg_spec.fields[-1].annotations['unit'] == 'm/s'
@@ -15,6 +15,7 @@
 import pytest
 
 from rosidl_adapter.parser import InvalidValue
+from rosidl_adapter.parser import parse_string_array_value_string
 from rosidl_adapter.parser import parse_value_string
 from rosidl_adapter.parser import Type
 
@@ -60,3 +61,50 @@ def test_parse_value_string():
 def test_parse_value_string_not_implemented():
     with pytest.raises(NotImplementedError):
         parse_value_string(Type('pkg/Foo[]'), '')
+
+
+def test_parse_value_string_numeric():
+    value = parse_value_string(Type('float32[]'), '[1, -2.5, 1e3 ]')
+    assert value == [1.0, -2.5, 1000.0]
+    assert all(isinstance(v, float) for v in value)
+    value = parse_value_string(Type('uint64[2]'), '[0, %d]' % (2 ** 64 - 1))
+    assert value == [0, 2 ** 64 - 1]
+    assert parse_value_string(Type('int8[<=2]'), '[]') == []
+
+    with pytest.raises(InvalidValue) as e:
+        parse_value_string(Type('int8[]'), '[1, -129, 128]')
+    assert str(e.value) == (
+        "value '[1, -129, 128]' can not be converted to type 'int8[]': "
+        "element 1 with value '-129' can not be converted to type 'int8': "
+        'must be a valid integer value >= -128 and <= 127')
+    with pytest.raises(InvalidValue) as e:
+        parse_value_string(Type('byte[]'), '[1, 2, foo]')
+    assert 'element 2 with ' in str(e.value)
+    with pytest.raises(InvalidValue) as e:
+        parse_value_string(Type('float64[]'), '[1.0, 2.0, 1.5.0]')
+    assert "element 2 with value '1.5.0'" in str(e.value)
+
+
+def test_parse_value_string_scaling():
+    # the parsing time must grow linearly with the number of elements
+    count = 10000
+    elements = ['"fo\\"o%d, bar"' % i if i % 2 else "'baz%d'" % i for i in range(count)]
+    value = parse_value_string(
+        Type('string[%d]' % count), '[%s]' % ', '.join(elements))
+    assert len(value) == count
+    assert value[0] == 'baz0'
+    assert value[-1] == 'fo"o%d, bar' % (count - 1)
+
+    value = parse_value_string(
+        Type('string[]'), '[%s]' % ','.join('foo%d' % i for i in range(count)))
+    assert len(value) == count
+    assert value[-1] == 'foo%d' % (count - 1)
+
+    with pytest.raises(ValueError) as e:
+        parse_string_array_value_string(
+            ', '.join(elements[:count - 1] + ['"foo']), count)
+    assert str(e.value).startswith('string ["foo] incorrectly quoted\n')
+
+    value = parse_value_string(
+        Type('int64[]'), '[%s]' % ', '.join(str(-i) for i in range(count)))
+    assert value == [-i for i in range(count)]
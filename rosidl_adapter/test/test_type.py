@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import pickle
+
 import pytest
 
+from rosidl_adapter.parser import BaseType
 from rosidl_adapter.parser import Type
 
 
@@ -81,3 +85,20 @@ def test_type_methods():
     assert str(Type('pkg/Foo[]')) == 'pkg/Foo[]'
     assert str(Type('pkg/Foo[5]')) == 'pkg/Foo[5]'
     assert str(Type('pkg/Foo[<=5]')) == 'pkg/Foo[<=5]'
+
+
+def test_type_interned():
+    type_ = Type('pkg/Foo[<=5]')
+    assert Type('pkg/Foo[<=5]') is type_
+    assert Type('Foo[<=5]', context_package_name='pkg') is type_
+    assert pickle.loads(pickle.dumps(type_)) is type_
+    assert copy.deepcopy(type_) is type_
+
+    assert Type('pkg/Foo') is not BaseType('pkg/Foo')
+    assert BaseType('Foo', 'pkg') is BaseType('pkg/Foo')
+
+    with pytest.raises(AttributeError):
+        type_.array_size = 3
+    with pytest.raises(AttributeError):
+        del type_.pkg_name
+    assert type_.array_size == 5
@@ -0,0 +1,117 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from rosidl_adapter.parser import BaseType
+from rosidl_adapter.parser import CyclicMessageDependency
+from rosidl_adapter.parser import MessageSpecification
+from rosidl_adapter.parser import parse_message_string
+from rosidl_adapter.parser import TypeRegistry
+from rosidl_adapter.parser import UnknownMessageType
+from rosidl_adapter.parser import validate_field_types
+
+
+def _write_message(path, name, content):
+    filename = os.path.join(str(path), name + '.msg')
+    with open(filename, 'w') as handle:
+        handle.write(content)
+    return filename
+
+
+def test_type_registry(tmpdir):
+    registry = TypeRegistry()
+    assert registry.add_interface_file(
+        'pkg', _write_message(tmpdir, 'Outer', 'Inner[] a\nother/Leaf b')) == \
+        BaseType('pkg/Outer')
+    registry.add_interface_file(
+        'pkg', _write_message(tmpdir, 'Inner', 'other/Leaf a\nother/Leaf b'))
+    registry.add_interface_file(
+        'other', _write_message(tmpdir, 'Leaf', 'int32 a'))
+    assert registry.add_interface_file('pkg', 'srv/Service.srv') is None
+
+    assert len(registry) == 3
+    assert BaseType('pkg/Inner') in registry
+    assert BaseType('pkg/Service') not in registry
+    assert list(registry) == [
+        BaseType('pkg/Outer'), BaseType('pkg/Inner'), BaseType('other/Leaf')]
+
+    assert registry.get_dependencies(BaseType('pkg/Inner')) == (
+        BaseType('other/Leaf'), )
+    assert registry.get_dependency_graph() == {
+        BaseType('pkg/Outer'): (BaseType('pkg/Inner'), BaseType('other/Leaf')),
+        BaseType('pkg/Inner'): (BaseType('other/Leaf'), ),
+        BaseType('other/Leaf'): (),
+    }
+    assert registry.get_topological_order() == [
+        BaseType('other/Leaf'), BaseType('pkg/Inner'), BaseType('pkg/Outer')]
+    assert registry.get_topological_order([BaseType('pkg/Inner')]) == [
+        BaseType('other/Leaf'), BaseType('pkg/Inner')]
+
+    with pytest.raises(UnknownMessageType):
+        registry.get_message_specification(BaseType('pkg/Unknown'))
+
+
+def test_type_registry_unknown_dependency():
+    registry = TypeRegistry()
+    registry.add_message_specification(
+        parse_message_string('pkg', 'Foo', 'pkg/Bar bar'))
+    assert registry.get_topological_order() == [BaseType('pkg/Foo')]
+
+    spec = MessageSpecification('pkg', 'Baz', [], [])
+    validate_field_types(spec, registry)
+    with pytest.raises(UnknownMessageType):
+        validate_field_types(
+            registry.get_message_specification(BaseType('pkg/Foo')), registry)
+
+
+def test_type_registry_cycle():
+    registry = TypeRegistry()
+    registry.add_message_specification(
+        parse_message_string('pkg', 'A', 'B[] b'))
+    registry.add_message_specification(
+        parse_message_string('pkg', 'B', 'C[<=1] c'))
+    registry.add_message_specification(
+        parse_message_string('pkg', 'C', 'A[] a'))
+    with pytest.raises(CyclicMessageDependency) as e:
+        registry.get_topological_order()
+    assert 'pkg/A -> pkg/B -> pkg/C -> pkg/A' in str(e.value)
+
+
+def test_type_registry_scaling():
+    # a long chain of dependencies must not exceed the recursion limit
+    registry = TypeRegistry()
+    count = 5000
+    for i in range(count):
+        registry.add_message_specification(parse_message_string(
+            'pkg', 'Msg%d' % i, 'Msg%d a' % (i + 1) if i + 1 < count else ''))
+    order = registry.get_topological_order()
+    assert order[0] == BaseType('pkg/Msg%d' % (count - 1))
+    assert order[-1] == BaseType('pkg/Msg0')
+
+
+def test_type_registry_parse_message_file():
+    parsed = []
+
+    def parse_message_file(pkg_name, interface_file):
+        parsed.append(interface_file)
+        return parse_message_string(pkg_name, 'Foo', 'int32 a')
+
+    registry = TypeRegistry(parse_message_file=parse_message_file)
+    registry.add_interface_file('pkg', 'msg/Foo.msg')
+    assert registry.get_dependencies(BaseType('pkg/Foo')) == ()
+    assert registry.get_message_specification(BaseType('pkg/Foo')).fields
+    assert parsed == ['msg/Foo.msg']
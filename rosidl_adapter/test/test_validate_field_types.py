@@ -17,8 +17,10 @@ import pytest
 from rosidl_adapter.parser import BaseType
 from rosidl_adapter.parser import Field
 from rosidl_adapter.parser import MessageSpecification
+from rosidl_adapter.parser import parse_message_string
 from rosidl_adapter.parser import Type
 from rosidl_adapter.parser import UnknownMessageType
+from rosidl_adapter.parser import validate_all_field_types
 from rosidl_adapter.parser import validate_field_types
 
 
@@ -36,3 +38,26 @@ def test_validate_field_types():
 
     known_msg_type.append(BaseType('pkg/Bar'))
     validate_field_types(msg_spec, known_msg_type)
+
+
+def test_validate_all_field_types():
+    specs = [
+        parse_message_string('pkg', 'Foo', 'Bar a\nother/Baz[] b\nint32 c'),
+        parse_message_string('pkg', 'Bar', 'other/Baz[<=3] a'),
+        parse_message_string('pkg', 'Empty', ''),
+    ]
+    validate_all_field_types(
+        specs, [BaseType('pkg/Bar'), BaseType('other/Baz')])
+    validate_all_field_types(
+        specs, {BaseType('pkg/Bar'), BaseType('other/Baz')})
+
+    with pytest.raises(UnknownMessageType) as e:
+        validate_all_field_types(specs, [BaseType('pkg/Bar')])
+    lines = str(e.value).splitlines()
+    assert len(lines) == 2
+    assert 'other/Baz[] b' in lines[0]
+    assert 'other/Baz[<=3] a' in lines[1]
+
+    with pytest.raises(UnknownMessageType) as e:
+        validate_all_field_types(specs, [])
+    assert len(str(e.value).splitlines()) == 3
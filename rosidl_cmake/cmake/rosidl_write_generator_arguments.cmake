@@ -22,6 +22,8 @@ function(rosidl_write_generator_arguments output_file)
   set(REQUIRED_ONE_VALUE_KEYWORDS
     "PACKAGE_NAME")
   set(OPTIONAL_ONE_VALUE_KEYWORDS
+    "DEPFILE"  # the generators write the dependencies of the generated files
+    "DEPFILE_TARGET"  # the first output of the command as known to the build tool
     "OUTPUT_DIR"
     "TEMPLATE_DIR")
 
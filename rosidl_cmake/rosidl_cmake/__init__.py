@@ -12,6 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
+from collections import namedtuple
+from collections import OrderedDict
+import hashlib
+from importlib import import_module
 from io import StringIO
 import json
 import os
@@ -20,8 +25,23 @@ import sys
 
 import em
 
+from rosidl_adapter.parallel import process_in_parallel
+from rosidl_cmake.file_utils import encode_file_content
+from rosidl_cmake.file_utils import is_file_content_equal
+from rosidl_cmake.file_utils import write_file_atomically
+from rosidl_cmake.output_cache import get_code_fingerprint
+from rosidl_cmake.output_cache import get_output_cache
+from rosidl_parser import ActionSpecification
 from rosidl_parser import BaseType
+from rosidl_parser import MessageSpecification
 from rosidl_parser import PACKAGE_NAME_MESSAGE_TYPE_SEPARATOR
+from rosidl_parser import parse_action_file
+from rosidl_parser import parse_message_file
+from rosidl_parser import parse_service_file
+from rosidl_parser import ServiceSpecification
+from rosidl_parser import TypeRegistry
+from rosidl_parser.serialized_size import MaxSerializedSizeCalculator
+from rosidl_parser.specification import get_definition_structure
 
 
 def convert_camel_case_to_lower_case_underscore(value):
@@ -35,31 +55,542 @@ def convert_camel_case_to_lower_case_underscore(value):
 
 
 def extract_message_types(pkg_name, ros_interface_files, deps):
-    types = []
+    """
+    Index the message types of a package and its dependencies.
+
+    :param str pkg_name: the name of the package
+    :param list ros_interface_files: the interface files of the package
+    :param list deps: the interface files of the dependencies, each prefixed
+      with the package name and a colon
+    :returns: a `TypeRegistry` containing the `BaseType` of each message
+    """
+    registry = TypeRegistry(parse_message_file=parse_interface_file)
 
     for ros_interface_file in ros_interface_files:
-        base_type = _get_base_type(pkg_name, ros_interface_file)
-        if base_type:
-            types.append(base_type)
+        registry.add_interface_file(pkg_name, ros_interface_file)
 
     for dep in deps:
         # only take the first : for separation, as Windows follows with a C:\
         dep_parts = dep.split(':', 1)
         assert len(dep_parts) == 2, "The dependency '%s' must contain a double colon" % dep
-        pkg_name = dep_parts[0]
-        base_type = _get_base_type(pkg_name, dep_parts[1])
-        if base_type:
-            types.append(base_type)
+        registry.add_interface_file(*dep_parts)
+
+    return registry
+
+
+def get_max_serialized_size_calculator(pkg_name, ros_interface_files, deps):
+    """
+    Create a calculator for the maximum serialized size of messages.
+
+    The .msg files of the package and its dependencies are only parsed when
+    the structure of a message is needed.
+
+    :param str pkg_name: the name of the package
+    :param list ros_interface_files: the interface files of the package
+    :param list deps: the interface files of the dependencies, each prefixed
+      with the package name and a colon
+    :returns: a `MaxSerializedSizeCalculator`
+    """
+    return MaxSerializedSizeCalculator(get_structure=get_structure_resolver(
+        pkg_name, ros_interface_files, deps))
+
+
+def get_structure_resolver(pkg_name, ros_interface_files, deps):
+    """
+    Create a callable resolving namespaced types to their structures.
+
+    The .msg files of the package and its dependencies are only parsed when
+    the structure of a message is needed.
+
+    :param str pkg_name: the name of the package
+    :param list ros_interface_files: the interface files of the package
+    :param list deps: the interface files of the dependencies, each prefixed
+      with the package name and a colon
+    :returns: a callable which is invoked with a `NamespacedType` and returns
+      the `Structure` or None if the type is unknown
+    """
+    registry = extract_message_types(pkg_name, ros_interface_files, deps)
+
+    def get_structure(type_):
+        base_type = BaseType(
+            type_.namespaces[0] + PACKAGE_NAME_MESSAGE_TYPE_SEPARATOR +
+            type_.name)
+        if base_type not in registry:
+            return None
+        interface_file = registry.get_interface_file(base_type)
+        subfolder = os.path.basename(os.path.dirname(interface_file))
+        if type_.namespaces[1:] != [subfolder]:
+            return None
+        spec = parse_interface_file(base_type.pkg_name, interface_file)
+        return get_definition_structure(spec, subfolder=subfolder)
+
+    return get_structure
+
+
+def get_interface_dependencies(spec, registry):
+    """
+    Get the interface files of the message types used by a specification.
+
+    Nested message types are followed transitively.
+    Message types which aren't in the registry are skipped.
+
+    :param spec: the `MessageSpecification`, `ServiceSpecification` or
+      `ActionSpecification`
+    :param TypeRegistry registry: the known message types
+    :returns: a list of paths, each dependency before its dependents
+    """
+    if isinstance(spec, MessageSpecification):
+        messages = [spec]
+    elif isinstance(spec, ServiceSpecification):
+        messages = [spec.request, spec.response]
+    elif isinstance(spec, ActionSpecification):
+        messages = [
+            spec.goal_service.request, spec.goal_service.response,
+            spec.result_service.request, spec.result_service.response,
+            spec.feedback]
+    else:
+        assert False, 'Unknown specification type: %s' % type(spec)
+
+    base_types = OrderedDict()
+    for msg in messages:
+        for field in msg.fields:
+            if field.type.is_primitive_type():
+                continue
+            base_type = BaseType(BaseType.__str__(field.type))
+            if base_type in registry:
+                base_types[base_type] = None
+    return [
+        registry.get_interface_file(base_type)
+        for base_type in registry.get_topological_order(base_types.keys())]
+
+
+def write_depfile(depfile, target, dependencies):
+    """
+    Write a Make-style depfile which can also be read by Ninja.
+
+    Ninja only accepts a depfile whose first rule names the first output of
+    the build statement and it applies the dependencies to all of its
+    outputs, so a single rule is being written.
+
+    :param str depfile: the path of the depfile
+    :param str target: the path of the first output as known to the build
+      tool
+    :param dependencies: an iterable of paths the outputs depend on
+    """
+    line = ' '.join(
+        [_escape_depfile_path(target) + ':'] +
+        [_escape_depfile_path(f) for f in dependencies])
+    data = encode_file_content(line + '\n')
+
+    if is_file_content_equal(depfile, data):
+        return
+    if os.path.dirname(depfile):
+        os.makedirs(os.path.dirname(depfile), exist_ok=True)
+    write_file_atomically(depfile, data)
+
+
+def _escape_depfile_path(path):
+    return path.replace('$', '$$').replace('#', '\\#').replace(' ', '\\ ')
+
+
+# the name of the file in the output directory storing the inputs of each interface
+GENERATION_MANIFEST_FILENAME = 'rosidl_generation_manifest.json'
+
+# incremented whenever the content of the manifest changes incompatibly
+_GENERATION_MANIFEST_FORMAT = 1
+
+
+class GeneratedFileDependencies:
+    """
+    Collect the files each generated file depends on.
+
+    A generated file depends on the generator itself, its template, its
+    interface file and the interface files of all message types used by it.
+    If the generator arguments contain a `depfile` the dependencies of all
+    generated files are written to it as a single rule for the
+    `depfile_target`, by default the first generated file, and each generated
+    file is only compared against its own dependencies rather than all
+    target dependencies.
+
+    The content hash of all dependencies is recorded per interface file in a
+    manifest in the output directory together with the code fingerprint,
+    which covers all Python modules the templates might use.
+    As long as none of them changed and the generated files still exist the
+    interface doesn't need to be parsed and its templates don't need to be
+    expanded again.
+    """
+
+    def __init__(self, args, generator_files=None):
+        """
+        Constructor.
+
+        :param dict args: the generator arguments
+        :param list generator_files: additional files affecting the output
+          of the generator, e.g. its Python modules
+        """
+        self.depfile = args.get('depfile')
+        self.depfile_target = args.get('depfile_target')
+        self.registry = extract_message_types(
+            args['package_name'], args.get('ros_interface_files', []),
+            args.get('ros_interface_dependencies', []))
+        target_dependencies = args.get('target_dependencies', [])
+        self.latest_target_timestamp = get_newest_modification_time(
+            target_dependencies)
+        self.generator_files = [
+            f for f in target_dependencies
+            if os.path.splitext(f)[1] not in INTERFACE_FILE_PARSERS and
+            not f.endswith('.em')]
+        self.template_files = [
+            f for f in target_dependencies if f.endswith('.em')]
+        for generator_file in (generator_files or []) + [__file__]:
+            generator_file = os.path.abspath(generator_file)
+            if generator_file not in self.generator_files:
+                self.generator_files.append(generator_file)
+        self._package_name = args['package_name']
+        self._interface_files = list(args.get('ros_interface_files', []))
+        self._interface_dependencies = {}
+        self._generated_files = {}
+        self._file_hashes = {}
+
+        self._manifest_file = os.path.join(
+            args['output_dir'], GENERATION_MANIFEST_FILENAME)
+        # any change to the arguments or to the code of any generator
+        # invalidates the recorded interfaces
+        self._arguments = {
+            'format': _GENERATION_MANIFEST_FORMAT,
+            'code_fingerprint': get_code_fingerprint(),
+            'package_name': args['package_name'],
+            'output_dir': args['output_dir'],
+            'ros_interface_dependencies':
+                args.get('ros_interface_dependencies', []),
+        }
+        self._previous_interfaces = {}
+        try:
+            with open(self._manifest_file, 'r') as h:
+                manifest = json.load(h)
+        except (OSError, ValueError):
+            manifest = None
+        if isinstance(manifest, dict):
+            self._previous_interfaces = OrderedDict(
+                (interface_file, interface)
+                for interface_file, interface in manifest.items()
+                if isinstance(interface, dict) and
+                isinstance(interface.get('arguments'), dict) and
+                interface['arguments'].get('format') ==
+                _GENERATION_MANIFEST_FORMAT)
+        # keep the entries of interfaces generated by other invocations
+        # using the same output directory, e.g. for actions
+        self._interfaces = OrderedDict(
+            (interface_file, interface)
+            for interface_file, interface in self._previous_interfaces.items()
+            if interface_file not in args.get('ros_interface_files', []))
+
+    def add(self, generated_file, template_file, interface_file, spec):
+        """
+        Add a generated file.
+
+        :param str generated_file: the path of the generated file
+        :param str template_file: the path of the template
+        :param str interface_file: the path of the interface file
+        :param spec: the specification parsed from the interface file
+        :returns: the minimum timestamp to pass to `expand_template`
+        """
+        interface_dependencies = self._interface_dependencies.get(
+            interface_file)
+        if interface_dependencies is None:
+            interface_dependencies = [interface_file] + \
+                get_interface_dependencies(spec, self.registry)
+            self._interface_dependencies[interface_file] = \
+                interface_dependencies
+        dependencies = \
+            self.generator_files + [template_file] + interface_dependencies
+        interface = self._interfaces.setdefault(interface_file, OrderedDict([
+            ('arguments', self._arguments),
+            ('generated_files', OrderedDict()),
+            ('hashes', {}),
+        ]))
+        interface['generated_files'][generated_file] = dependencies
+        self._generated_files[generated_file] = (interface_file, dependencies)
+        for dependency in dependencies:
+            interface['hashes'][dependency] = self._get_file_hash(dependency)
+
+        return self._get_minimum_timestamp(dependencies)
+
+    def get_output_cache_key(self, generated_file):
+        """
+        Get the key of a generated file in the output cache.
+
+        The key is a hash of the content of all files the generated file
+        depends on, all templates of the generator, the code fingerprint
+        and the package name.
+        The names of interface files are part of the key since the types are
+        derived from them, other paths are not in order to share the entries
+        across build trees.
+
+        :param str generated_file: the path of a generated file passed to
+          `add`
+        :returns: a hex digest, None if the output cache is disabled or the
+          output can't be cached
+        """
+        if get_output_cache() is None:
+            return None
+        interface_file, dependencies = self._generated_files[generated_file]
+        h = hashlib.sha256()
+        h.update(get_code_fingerprint().encode() + b'\0')
+        h.update(self._package_name.encode() + b'\0')
+        h.update(os.path.basename(generated_file).encode() + b'\0')
+        h.update(os.path.basename(os.path.dirname(interface_file)).encode() + b'\0')
+        for dependency in dependencies + self.template_files:
+            file_hash = self._get_file_hash(dependency)
+            if not file_hash:
+                return None
+            if os.path.splitext(dependency)[1] in INTERFACE_FILE_PARSERS:
+                h.update(os.path.basename(dependency).encode())
+            h.update(b'\0' + file_hash.encode() + b'\0')
+        return h.hexdigest()
+
+    def is_unchanged(self, interface_file):
+        """
+        Check if the files generated for an interface are still up-to-date.
+
+        If they are the files are added as if they had been generated again.
+
+        :param str interface_file: the path of the interface file
+        :returns: True if the interface doesn't need to be parsed and its
+          templates don't need to be expanded
+        """
+        interface = self._previous_interfaces.get(interface_file)
+        if interface is None or interface.get('arguments') != self._arguments:
+            return False
+        generated_files = interface['generated_files']
+        for generated_file, dependencies in generated_files.items():
+            if not os.path.exists(generated_file):
+                return False
+            if not set(self.generator_files).issubset(dependencies):
+                return False
+        for dependency, file_hash in interface['hashes'].items():
+            if self._get_file_hash(dependency) != file_hash:
+                return False
+
+        for generated_file, dependencies in generated_files.items():
+            # same as expand_template for a file with identical content
+            minimum_timestamp = self._get_minimum_timestamp(dependencies)
+            if minimum_timestamp is not None and \
+                    os.path.getmtime(generated_file) <= minimum_timestamp:
+                os.utime(generated_file)
+        self._interfaces[interface_file] = interface
+        return True
+
+    def get_interface(self, interface_file):
+        """
+        Get the recorded dependencies of the files generated for an interface.
+
+        :param str interface_file: the path of the interface file
+        :returns: a JSON serializable dictionary
+        """
+        return self._interfaces[interface_file]
+
+    def add_interface(self, interface_file, interface):
+        """
+        Add the dependencies recorded for an interface by another instance.
+
+        :param str interface_file: the path of the interface file
+        :param dict interface: the value returned by `get_interface`
+        """
+        self._interfaces[interface_file] = interface
+
+    def discard_interface(self, interface_file):
+        """
+        Discard the dependencies of an interface which failed to be generated.
+
+        :param str interface_file: the path of the interface file
+        """
+        self._interfaces.pop(interface_file, None)
+
+    def write(self):
+        """Write the manifest and the depfile if one has been requested."""
+        if self.depfile is not None:
+            generated_files = OrderedDict()
+            for interface_file in self._interface_files:
+                if interface_file in self._interfaces:
+                    generated_files.update(
+                        self._interfaces[interface_file]['generated_files'])
+            dependencies = OrderedDict(
+                (f, None) for files in generated_files.values() for f in files)
+            target = self.depfile_target
+            if target is None and generated_files:
+                target = next(iter(generated_files))
+            if target is not None:
+                write_depfile(self.depfile, target, dependencies.keys())
+
+        os.makedirs(os.path.dirname(self._manifest_file), exist_ok=True)
+        write_file_atomically(self._manifest_file, encode_file_content(
+            json.dumps(self._interfaces, indent=2, sort_keys=True)))
+
+    def _get_minimum_timestamp(self, dependencies):
+        if self.depfile is None:
+            return self.latest_target_timestamp
+        return get_newest_modification_time(dependencies)
 
-    return types
+    def _get_file_hash(self, path):
+        file_hash = self._file_hashes.get(path)
+        if file_hash is None:
+            try:
+                with open(path, 'rb') as h:
+                    file_hash = hashlib.sha256(h.read()).hexdigest()
+            except OSError:
+                # a missing file never matches a recorded hash
+                file_hash = ''
+            self._file_hashes[path] = file_hash
+        return file_hash
 
 
-def _get_base_type(pkg_name, idl_path):
-    idl_filename = os.path.basename(idl_path)
-    msg_name, extension = os.path.splitext(idl_filename)
-    if extension != '.msg':
-        return None
-    return BaseType(pkg_name + PACKAGE_NAME_MESSAGE_TYPE_SEPARATOR + msg_name)
+def generate_interface_files(args, create_generator, generator_files=None, jobs=None):
+    """
+    Generate the files of all interfaces which changed, in parallel if requested.
+
+    Each interface is processed by a generator created once per process.
+    The generated files only depend on the interface, so the output is the
+    same independent of the number of processes.
+
+    If the files of any interface fail to be generated the other interfaces
+    are still being processed, all errors are reported and the exception of
+    the first failing interface is raised.
+
+    :param dict args: the generator arguments
+    :param create_generator: a callable which is invoked with the generator
+      arguments and a `GeneratedFileDependencies` instance, it must return a
+      callable generating the files for an interface file and passing each
+      of them to `GeneratedFileDependencies.add`, when using multiple
+      processes it must be importable from the worker processes
+    :param list generator_files: additional files affecting the output of
+      the generator, see `GeneratedFileDependencies`
+    :param int jobs: the maximum number of processes, if None or 1 all
+      interfaces are processed within the current process
+    :returns: 0 on success
+    """
+    dependencies = GeneratedFileDependencies(
+        args, generator_files=generator_files)
+    interface_files = [
+        f for f in args.get('ros_interface_files', [])
+        if not dependencies.is_unchanged(f)]
+
+    # each interface is worth a separate process
+    results = process_in_parallel(
+        _generate_interface_in_worker, interface_files, jobs=jobs or 1,
+        min_items_per_job=1, initializer=_initialize_generator_worker,
+        initargs=(args, create_generator, generator_files))
+    errors = []
+    for interface_file, (interface, error) in zip(interface_files, results):
+        if error is None:
+            dependencies.add_interface(interface_file, interface)
+        else:
+            # the files generated so far must be generated again
+            dependencies.discard_interface(interface_file)
+            errors.append((interface_file, error))
+
+    for interface_file, error in errors:
+        print("Failed to generate the files for '%s': %s" %
+              (interface_file, error), file=sys.stderr)
+    # the successfully generated interfaces don't need to be generated again
+    dependencies.write()
+    if errors:
+        raise errors[0][1]
+    return 0
+
+
+# the generator and the dependencies of the process generating interfaces,
+# which is either a worker process or the current process
+_worker_generator = None
+_worker_dependencies = None
+
+
+def _initialize_generator_worker(args, create_generator, generator_files):
+    global _worker_generator
+    global _worker_dependencies
+    _worker_dependencies = GeneratedFileDependencies(
+        args, generator_files=generator_files)
+    _worker_generator = create_generator(args, _worker_dependencies)
+
+
+def _generate_interface_in_worker(interface_file):
+    _worker_generator(interface_file)
+    return _worker_dependencies.get_interface(interface_file)
+
+
+# the parse function for each interface file extension
+INTERFACE_FILE_PARSERS = {
+    '.msg': parse_message_file,
+    '.srv': parse_service_file,
+    '.action': parse_action_file,
+}
+
+# the specifications parsed in this process by package name and absolute
+# path, each with the modification time of the file when it was parsed
+_interface_specifications = {}
+
+
+def parse_interface_file(pkg_name, interface_file):
+    """
+    Parse a .msg, .srv or .action file at most once per process.
+
+    Generators running in the same process share the parsed
+    specification as long as the file hasn't been modified, so it must not
+    be changed by the caller.
+
+    :param str pkg_name: the name of the package containing the file
+    :param str interface_file: the path of the interface file
+    :returns: the `MessageSpecification`, `ServiceSpecification` or
+      `ActionSpecification`
+    """
+    extension = os.path.splitext(interface_file)[1]
+    assert extension in INTERFACE_FILE_PARSERS, \
+        "Unsupported interface file extension '%s'" % extension
+    key = (pkg_name, os.path.abspath(interface_file))
+    mtime = os.path.getmtime(interface_file)
+    cached = _interface_specifications.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    spec = INTERFACE_FILE_PARSERS[extension](pkg_name, interface_file)
+    _interface_specifications[key] = (mtime, spec)
+    return spec
+
+
+def get_generate_function(generator):
+    """
+    Get the generate function of a generator.
+
+    :param str generator: the module and the name of the function separated
+      by a colon, e.g. `rosidl_generator_c:generate_c`
+    :returns: the function which is invoked with the path of a generator
+      arguments file
+    """
+    module_name, _, function_name = generator.partition(':')
+    assert function_name, \
+        "The generator '%s' must contain a colon" % generator
+    return getattr(import_module(module_name), function_name)
+
+
+def generate_interfaces(generators):
+    """
+    Invoke multiple generators in this process.
+
+    Since all generators use `parse_interface_file` each interface file is
+    only parsed once, independent of the number of generators.
+
+    :param generators: an iterable of tuples containing a generate function
+      (or the name of the function as accepted by `get_generate_function`)
+      and the path of the generator arguments file passed to it
+    :returns: the first non-zero return code of the generators, otherwise 0
+    """
+    rc = 0
+    for generate, generator_arguments_file in generators:
+        if isinstance(generate, str):
+            generate = get_generate_function(generate)
+        generator_rc = generate(generator_arguments_file)
+        if generator_rc and not rc:
+            rc = generator_rc
+    return rc
 
 
 def read_generator_arguments(input_file):
@@ -76,36 +607,170 @@ def get_newest_modification_time(target_dependencies):
     return newest_timestamp
 
 
-def expand_template(template_file, data, output_file, minimum_timestamp=None):
-    output = StringIO()
-    interpreter = em.Interpreter(
-        output=output,
-        options={
-            em.BUFFERED_OPT: True,
-            em.RAW_OPT: True,
-        },
-        globals=data,
-    )
+# the number of template cache lookups which did or didn't find a template
+TemplateCacheInfo = namedtuple('TemplateCacheInfo', ['hits', 'misses'])
+
+# the tokens of each scanned template by absolute path, each with the
+# modification time of the file when it was scanned
+_template_tokens = {}
+_template_cache_info = {'hits': 0, 'misses': 0}
+
+# the interpreter reused for all expansions in this process
+_interpreter = None
+
+
+def get_template_cache_info():
+    """Get the number of hits and misses of the template cache."""
+    return TemplateCacheInfo(**_template_cache_info)
+
+
+def clear_template_cache():
+    """Clear the template cache and reset the hit and miss counts."""
+    _template_tokens.clear()
+    _template_cache_info.update(hits=0, misses=0)
+
+
+def _get_template_tokens(template_file):
+    key = os.path.abspath(template_file)
+    mtime = os.path.getmtime(template_file)
+    cached = _template_tokens.get(key)
+    if cached is not None and cached[0] == mtime:
+        _template_cache_info['hits'] += 1
+        return cached[1]
+    _template_cache_info['misses'] += 1
+
     with open(template_file, 'r') as h:
+        content = h.read()
+    # same as em.Interpreter.file: a bangpath is treated as a comment
+    if content.startswith(em.BANGPATH):
+        content = em.DEFAULT_PREFIX + '#' + content[len(em.BANGPATH):]
+    scanner = em.Scanner(em.DEFAULT_PREFIX, content)
+    tokens = []
+    while True:
         try:
-            interpreter.file(h)
-        except Exception:
-            if os.path.exists(output_file):
-                os.remove(output_file)
-            print("Exception when expanding '%s' into '%s'" %
-                  (template_file, output_file), file=sys.stderr)
-            raise
+            token = scanner.one()
+        except em.TransientParseError:
+            # same as em.Interpreter.safe: try again with a terminator once
+            # and treat another transient parse error as a real one
+            buffer = scanner.rest()
+            if not buffer or buffer[-1] == '\n':
+                raise
+            scanner.feed(em.DEFAULT_PREFIX + '\n')
+            token = scanner.one()
+        if token is None:
+            break
+        tokens.append(token)
+
+    _template_tokens[key] = (mtime, tokens)
+    return tokens
+
+
+def _get_interpreter(output, data):
+    global _interpreter
+    _install_stdout_proxy()
+    if _interpreter is None:
+        _interpreter = em.Interpreter(
+            output=output,
+            options={
+                em.BUFFERED_OPT: True,
+                em.RAW_OPT: True,
+            },
+            globals=data,
+        )
+        # shut down while the stdout proxy of EmPy is still installed
+        atexit.register(_shutdown_interpreter)
+    else:
+        # discard any state left over by the previous expansion
+        _interpreter.output = output
+        _interpreter.reset()
+        _interpreter.setGlobals(data)
+    return _interpreter
+
+
+def _install_stdout_proxy():
+    # EmPy wraps sys.stdout once per process and refuses to continue if
+    # sys.stdout has been replaced since, e.g. while capturing the output,
+    # therefore wrap the current sys.stdout instead
+    if not hasattr(sys.stdout, '_testProxy'):
+        em.Interpreter._wasProxyInstalled = False
+    em.Interpreter.installProxy(None)
+
+
+def _shutdown_interpreter():
+    global _interpreter
+    if _interpreter is not None:
+        _install_stdout_proxy()
+        _interpreter.shutdown()
+        _interpreter = None
+
+
+def expand_template(template_file, data, output_file, minimum_timestamp=None, cache_key=None):
+    """
+    Expand an EmPy template into a file.
+
+    Each template file is only read and scanned once per process (as long as
+    it isn't modified), the resulting tokens are run with a reused
+    interpreter.
+
+    If a cache key is passed and the output cache is enabled (see
+    `rosidl_cmake.output_cache.get_output_cache`) the file is created from
+    the cache entry without expanding the template if possible, otherwise
+    the expanded content is stored in the cache.
+    Errors accessing the cache are reported but don't fail the expansion.
+
+    An existing file with the same content is left untouched (including its
+    timestamp unless it is older than the minimum timestamp), otherwise the
+    file is replaced atomically so that it is never partially written.
+
+    :param str template_file: the path of the template
+    :param dict data: the globals available to the template, the dictionary
+      is modified by the expansion
+    :param str output_file: the path of the generated file
+    :param float minimum_timestamp: the file is rewritten if it is older
+      even if the content is the same
+    :param str cache_key: the key of the generated file in the output cache
+      as returned by `GeneratedFileDependencies.get_output_cache_key`
+    """
+    cache = get_output_cache() if cache_key is not None else None
+    if cache is not None:
+        try:
+            if cache.materialize(cache_key, output_file, minimum_timestamp):
+                return
+        except OSError as e:
+            print("Failed to get '%s' from the output cache: %s" %
+                  (output_file, e), file=sys.stderr)
+
+    output = StringIO()
+    try:
+        tokens = _get_template_tokens(template_file)
+        interpreter = _get_interpreter(output, data)
+        interpreter.pushContext(template_file)
+        for token in tokens:
+            token.run(interpreter, None)
+        interpreter.popContext()
+    except Exception:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        print("Exception when expanding '%s' into '%s'" %
+              (template_file, output_file), file=sys.stderr)
+        raise
     content = output.getvalue()
-    interpreter.shutdown()
+
+    if cache is not None:
+        try:
+            cache.store(cache_key, content)
+        except OSError as e:
+            print("Failed to store '%s' in the output cache: %s" %
+                  (output_file, e), file=sys.stderr)
 
     # only overwrite file if necessary
     # which is either when the timestamp is too old or when the content is different
+    data = encode_file_content(content)
     if os.path.exists(output_file):
         timestamp = os.path.getmtime(output_file)
         if minimum_timestamp is None or timestamp > minimum_timestamp:
-            with open(output_file, 'r') as h:
-                if h.read() == content:
-                    return
+            if is_file_content_equal(output_file, data):
+                return
     else:
         # create folder if necessary
         try:
@@ -113,5 +778,5 @@ def expand_template(template_file, data, output_file, minimum_timestamp=None):
         except FileExistsError:
             pass
 
-    with open(output_file, 'w') as h:
-        h.write(content)
+    # replacing the file also never modifies a file hardlinked from the cache
+    write_file_atomically(output_file, data)
@@ -0,0 +1,130 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import binascii
+import hashlib
+from io import BytesIO
+from io import TextIOWrapper
+import os
+
+# the size of the chunks when comparing the content of a file
+_CHUNK_SIZE = 64 * 1024
+
+# the digest of the content of files read or written by this process by
+# absolute path, each with the stat result identifying the file version
+_file_digests = {}
+
+
+def encode_file_content(content):
+    """
+    Encode text the same way as writing it to a file opened in text mode.
+
+    :param str content: the text
+    :returns: the bytes
+    """
+    buffer = BytesIO()
+    h = TextIOWrapper(buffer)
+    h.write(content)
+    h.flush()
+    h.detach()
+    return buffer.getvalue()
+
+
+def create_temporary_file(path):
+    """
+    Create a new file in the same directory as a path.
+
+    The file is created with the same permissions as `open` would use.
+
+    :param str path: the path which the file will replace
+    :returns: a tuple containing the file descriptor open for writing and
+      the path of the temporary file
+    """
+    tmp_file = os.path.join(
+        os.path.dirname(path), '.%s.%s.tmp' % (
+            os.path.basename(path),
+            binascii.hexlify(os.urandom(8)).decode()))
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    return fd, tmp_file
+
+
+def write_file_atomically(path, data):
+    """
+    Write a file by replacing it with a completely written temporary file.
+
+    Readers, e.g. concurrent or interrupted builds, never see a partially
+    written file.
+
+    :param str path: the path of the file
+    :param bytes data: the content of the file
+    """
+    fd, tmp_file = create_temporary_file(path)
+    try:
+        with open(fd, 'wb') as h:
+            h.write(data)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    _record_file_digest(path, hashlib.sha256(data).digest())
+
+
+def is_file_content_equal(path, data):
+    """
+    Check if a file has a specific content.
+
+    Files which differ in size aren't read at all.
+    If the file has been read or written before by this process and hasn't
+    changed since then the recorded digest of its content is compared,
+    otherwise the file is compared in chunks without reading it completely.
+
+    :param str path: the path of the file
+    :param bytes data: the expected content
+    :returns: True if the file exists and has the same content
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != len(data):
+        return False
+    key = os.path.abspath(path)
+    recorded = _file_digests.get(key)
+    if recorded is not None and recorded[0] == _get_stat_key(stat):
+        return recorded[1] == hashlib.sha256(data).digest()
+
+    view = memoryview(data)
+    offset = 0
+    with open(path, 'rb') as h:
+        while True:
+            chunk = h.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            if view[offset:offset + len(chunk)] != chunk:
+                return False
+            offset += len(chunk)
+    if offset != len(data):
+        return False
+    _file_digests[key] = (_get_stat_key(stat), hashlib.sha256(data).digest())
+    return True
+
+
+def _record_file_digest(path, digest):
+    _file_digests[os.path.abspath(path)] = (
+        _get_stat_key(os.stat(path)), digest)
+
+
+def _get_stat_key(stat):
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,111 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# This module must only import modules from the standard library since it is
+# being loaded by the generator scripts without importing the rosidl_cmake
+# package, it must also be importable on platforms without Unix domain
+# sockets.
+
+import importlib.util
+import json
+import os
+import socket
+import sys
+
+# the environment variable containing the socket path of the generator server
+GENERATOR_SERVER_SOCKET_ENVIRONMENT_VARIABLE = 'ROSIDL_GENERATOR_SERVER_SOCKET'
+
+
+def get_generator_server_socket():
+    """
+    Get the socket path of the generator server.
+
+    :returns: the value of the environment variable
+      `GENERATOR_SERVER_SOCKET_ENVIRONMENT_VARIABLE`, None if not set
+    """
+    return os.environ.get(GENERATOR_SERVER_SOCKET_ENVIRONMENT_VARIABLE) or None
+
+
+def get_module_file(module_name):
+    """
+    Get the file of a module without importing it.
+
+    :param str module_name: the name of a top-level module
+    :returns: the absolute path, None if the module can't be found
+    """
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or spec.origin is None:
+        return None
+    return os.path.abspath(spec.origin)
+
+
+def request_generation(generator, generator_arguments_file, jobs=None, socket_path=None):
+    """
+    Request a running generator server to invoke a generator.
+
+    The generator is invoked with the environment and the working directory
+    of the caller.
+    The output of the generator is being forwarded to stdout and stderr.
+
+    :param str generator: the module and the name of the generate function
+      separated by a colon, e.g. `rosidl_generator_c:generate_c`
+    :param str generator_arguments_file: the path of the generator arguments
+    :param int jobs: the maximum number of processes
+    :param str socket_path: the socket path of the server, if None the path
+      from `get_generator_server_socket` is used
+    :returns: the return code of the generator, None if no server is
+      available or if it can't be used and the caller should invoke the
+      generator itself
+    """
+    if socket_path is None:
+        socket_path = get_generator_server_socket()
+    if socket_path is None or not os.path.exists(socket_path):
+        return None
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    request = {
+        'generator': generator,
+        # the server must use the same generator module as the caller would
+        'generator_file': get_module_file(generator.partition(':')[0]),
+        'generator_arguments_file': os.path.abspath(generator_arguments_file),
+        'jobs': jobs,
+        'environment': dict(os.environ),
+        'cwd': os.getcwd(),
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(socket_path)
+            s.sendall(json.dumps(request).encode() + b'\n')
+            s.shutdown(socket.SHUT_WR)
+            data = b''
+            while True:
+                chunk = s.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        response = json.loads(data.decode())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(response, dict) or response.get('rc') is None:
+        return None
+
+    if response.get('stdout'):
+        print(response['stdout'], end='')
+    if response.get('stderr'):
+        print(response['stderr'], end='', file=sys.stderr)
+    return response['rc']
@@ -0,0 +1,185 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from io import StringIO
+import json
+import os
+import socketserver
+import sys
+import traceback
+
+from rosidl_cmake import get_generate_function
+
+# the generate functions which the generator server invokes on request
+GENERATOR_ENTRY_POINTS = (
+    'rosidl_generator_c:generate_c',
+    'rosidl_generator_cpp:generate_cpp',
+)
+
+# the modules which invalidate the server when modified
+_SERVER_MODULE_NAMES = ('em', 'lark')
+_SERVER_MODULE_PREFIXES = ('rosidl_', 'lark.')
+
+
+class _GeneratorRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode())
+        except ValueError:
+            return
+        response = self.server.handle_generation(request)
+        self.wfile.write(json.dumps(response).encode())
+
+
+class GeneratorServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """
+    Invoke generators on request from a single long-lived process.
+
+    The generator modules are imported once when the server starts and
+    each request is processed concurrently in a forked child process.
+    Therefore the environment and the working directory of each client can
+    be applied without affecting other requests.
+    Only the imported modules are shared between requests, the templates
+    scanned and the interface files parsed while processing a request are
+    discarded together with the child process.
+    Only the generate functions in `generators` are invoked.
+    When any of the imported Python modules is modified the server declines
+    all further requests and shuts down.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, socket_path, generators=GENERATOR_ENTRY_POINTS):
+        """
+        Constructor.
+
+        :param str socket_path: the path of the Unix domain socket
+        :param generators: the generate functions which are invoked on
+          request, see `rosidl_cmake.generator_client.request_generation`
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _GeneratorRequestHandler)
+        self.socket_path = socket_path
+        self.generators = tuple(generators)
+        self.stale = False
+        self._module_mtimes = {}
+
+        for generator in self.generators:
+            try:
+                get_generate_function(generator)
+            except ImportError:
+                # the generator isn't available or fails to be imported
+                # until the request is being processed
+                pass
+        self._record_module_mtimes()
+
+    def verify_request(self, request, client_address):
+        # the connection is closed without a response
+        # and the client invokes the generator itself
+        if self.stale or self._is_stale():
+            self.stale = True
+            return False
+        return True
+
+    def handle_generation(self, request):
+        """
+        Invoke the generator of a request.
+
+        This must only be called in the child process handling the request
+        since the environment and the working directory are being changed.
+
+        :param dict request: the request sent by
+          `rosidl_cmake.generator_client.request_generation`
+        :returns: a dictionary containing the return code and the output on
+          stdout and stderr, the return code is None if the request has been
+          declined
+        """
+        if request.get('generator') not in self.generators:
+            return {'rc': None}
+        try:
+            os.chdir(request['cwd'])
+        except (KeyError, OSError):
+            return {'rc': None}
+        os.environ.clear()
+        os.environ.update(request.get('environment', {}))
+
+        stdout = StringIO()
+        stderr = StringIO()
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                generate = get_generate_function(request['generator'])
+                module = sys.modules[generate.__module__]
+                if request.get('generator_file') != \
+                        os.path.abspath(module.__file__):
+                    return {'rc': None}
+                rc = generate(
+                    request['generator_arguments_file'],
+                    jobs=request.get('jobs'))
+        except Exception:
+            traceback.print_exc(file=stderr)
+            rc = 1
+        return {
+            'rc': rc or 0,
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+        }
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def _get_module_files(self):
+        for name, module in list(sys.modules.items()):
+            if name not in _SERVER_MODULE_NAMES and \
+                    not name.startswith(_SERVER_MODULE_PREFIXES):
+                continue
+            module_file = getattr(module, '__file__', None)
+            if module_file is not None and os.path.exists(module_file):
+                yield module_file
+
+    def _record_module_mtimes(self):
+        for module_file in self._get_module_files():
+            if module_file not in self._module_mtimes:
+                self._module_mtimes[module_file] = \
+                    os.path.getmtime(module_file)
+
+    def _is_stale(self):
+        for module_file, mtime in self._module_mtimes.items():
+            try:
+                if os.path.getmtime(module_file) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+
+def serve(socket_path, generators=GENERATOR_ENTRY_POINTS):
+    """
+    Run a generator server until it becomes stale or is interrupted.
+
+    :param str socket_path: the path of the Unix domain socket
+    :param generators: the generate functions which are invoked on request
+    """
+    with GeneratorServer(socket_path, generators=generators) as server:
+        try:
+            while not server.stale:
+                server.handle_request()
+                server.collect_children()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,359 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import pkgutil
+import platform
+import shutil
+import struct
+import sys
+import time
+
+import em
+
+from rosidl_cmake.file_utils import create_temporary_file
+from rosidl_cmake.file_utils import encode_file_content
+from rosidl_cmake.file_utils import is_file_content_equal
+from rosidl_cmake.file_utils import write_file_atomically
+
+# the environment variable containing the directory of the output cache
+OUTPUT_CACHE_DIR_ENVIRONMENT_VARIABLE = 'ROSIDL_GENERATOR_CACHE_DIR'
+
+# the environment variable containing the maximum size of the output cache
+OUTPUT_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE = 'ROSIDL_GENERATOR_CACHE_MAX_SIZE'
+
+# the environment variable enabling hardlinks from the output cache
+OUTPUT_CACHE_HARDLINK_ENVIRONMENT_VARIABLE = 'ROSIDL_GENERATOR_CACHE_HARDLINK'
+
+# the default maximum size of the output cache in bytes
+DEFAULT_OUTPUT_CACHE_MAX_SIZE = 1024 ** 3
+
+_SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# the cache is shrunk to this fraction of the maximum size when exceeding it
+_CLEANUP_RATIO = 0.9
+
+# the suffix of the file next to each entry whose modification time is the
+# last time the entry has been used
+_LAST_USE_SUFFIX = '.used'
+
+# the output cache of this process and the environment it was created for
+_output_cache = None
+_output_cache_environment = None
+
+_code_fingerprint = None
+
+
+def parse_size(value):
+    """
+    Parse a size in bytes with an optional K, M or G suffix, e.g. `5G`.
+
+    :param str value: the size
+    :returns: the number of bytes
+    :raises: ValueError if the value isn't a valid size
+    """
+    value = value.strip().upper()
+    factor = _SIZE_SUFFIXES.get(value[-1:], 1)
+    if factor != 1:
+        value = value[:-1]
+    size = int(value) * factor
+    if size <= 0:
+        raise ValueError("The size '%s' must be positive" % value)
+    return size
+
+
+def get_output_cache():
+    """
+    Get the output cache configured through the environment.
+
+    The cache is enabled by setting `OUTPUT_CACHE_DIR_ENVIRONMENT_VARIABLE`.
+    The maximum size and the use of hardlinks are configured through
+    `OUTPUT_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE` and
+    `OUTPUT_CACHE_HARDLINK_ENVIRONMENT_VARIABLE`.
+
+    :returns: the `OutputCache` instance of this process, None if disabled
+    """
+    global _output_cache
+    global _output_cache_environment
+    environment = tuple(os.environ.get(name) for name in (
+        OUTPUT_CACHE_DIR_ENVIRONMENT_VARIABLE,
+        OUTPUT_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE,
+        OUTPUT_CACHE_HARDLINK_ENVIRONMENT_VARIABLE))
+    if environment != _output_cache_environment:
+        cache_dir, max_size, hardlink = environment
+        _output_cache = None
+        if cache_dir:
+            try:
+                max_size = parse_size(max_size) if max_size \
+                    else DEFAULT_OUTPUT_CACHE_MAX_SIZE
+            except ValueError:
+                print("Ignoring invalid value '%s' of '%s'" %
+                      (max_size, OUTPUT_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE),
+                      file=sys.stderr)
+                max_size = DEFAULT_OUTPUT_CACHE_MAX_SIZE
+            _output_cache = OutputCache(
+                cache_dir, max_size=max_size,
+                hardlink=hardlink not in (None, '', '0'))
+        _output_cache_environment = environment
+    return _output_cache
+
+
+def get_code_fingerprint():
+    """
+    Get a hash of everything besides the inputs affecting generated files.
+
+    This includes the Python files of all importable `rosidl_*` packages
+    (since templates import functions from other generators), the EmPy
+    version as well as the platform (since some generators calculate the
+    layout of C types for the host ABI).
+    The fingerprint is only calculated once per process.
+
+    :returns: a hex digest
+    """
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        h = hashlib.sha256()
+        h.update(repr((
+            em.__version__, sys.platform, platform.machine(),
+            struct.calcsize('P'))).encode())
+        packages = sorted(
+            (module_info.name, module_info.module_finder.path)
+            for module_info in pkgutil.iter_modules()
+            if module_info.ispkg and module_info.name.startswith('rosidl_'))
+        seen = set()
+        for name, path in packages:
+            # only the first package of each name on the path is importable
+            if name in seen:
+                continue
+            seen.add(name)
+            package_dir = os.path.join(path, name)
+            for dirpath, dirnames, filenames in os.walk(package_dir):
+                dirnames[:] = sorted(
+                    d for d in dirnames if d != '__pycache__')
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1] not in ('.py', '.lark'):
+                        continue
+                    filepath = os.path.join(dirpath, filename)
+                    h.update(os.path.relpath(filepath, path).encode() + b'\0')
+                    with open(filepath, 'rb') as f:
+                        h.update(hashlib.sha256(f.read()).digest())
+        _code_fingerprint = h.hexdigest()
+    return _code_fingerprint
+
+
+class OutputCache:
+    """
+    A content-addressed cache of generated files shared across build trees.
+
+    Each entry is stored under a key which is a hash of all inputs of the
+    generated file.
+    Outputs are materialized from the cache by copying or, if enabled, by
+    hardlinking.
+    Hardlinked files share their inode with the cache entry and must be
+    replaced rather than modified in place.
+
+    The least recently used entries are removed when the cache exceeds its
+    maximum size.
+    The last use of each entry is tracked by the modification time of a
+    separate file since the entry itself shares its modification time with
+    hardlinked outputs and the access time might not be updated.
+    Concurrent processes track the size independently, so the limit is only
+    approximate.
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_OUTPUT_CACHE_MAX_SIZE, hardlink=False):
+        """
+        Constructor.
+
+        :param str cache_dir: the directory containing the cache entries
+        :param int max_size: the maximum size of all entries in bytes
+        :param bool hardlink: a flag if outputs should be hardlinked to the
+          cache entries instead of copied
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hardlink = hardlink
+        # the size of all entries, determined when the first entry is stored
+        self._size = None
+
+    def get_entry_path(self, key):
+        """
+        Get the path of the cache entry of a key.
+
+        :param str key: the hex digest of the inputs
+        :returns: the path, whether the entry exists or not
+        """
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def materialize(self, key, output_file, minimum_timestamp=None):
+        """
+        Create or update a generated file from the cache entry of a key.
+
+        An existing file with the same content and a timestamp newer than the
+        minimum timestamp is left untouched.
+
+        :param str key: the hex digest of the inputs
+        :param str output_file: the path of the generated file
+        :param float minimum_timestamp: the file is rewritten if it is older
+          even if the content is the same
+        :returns: True if the entry exists and the file has been created,
+          False if the entry doesn't exist
+        """
+        entry_path = self.get_entry_path(key)
+        try:
+            entry_stat = os.stat(entry_path)
+        except OSError:
+            return False
+        self._mark_used(entry_path)
+
+        try:
+            output_stat = os.stat(output_file)
+        except OSError:
+            output_stat = None
+        if output_stat is not None and (
+            minimum_timestamp is None or
+            output_stat.st_mtime > minimum_timestamp
+        ):
+            if os.path.samestat(entry_stat, output_stat):
+                return True
+            with open(entry_path, 'rb') as h:
+                data = h.read()
+            if is_file_content_equal(output_file, data):
+                return True
+
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        fd, tmp_file = create_temporary_file(output_file)
+        try:
+            # a hardlink would be older than the minimum timestamp and
+            # updating it would affect the outputs of other build trees
+            if self.hardlink and (
+                minimum_timestamp is None or
+                entry_stat.st_mtime > minimum_timestamp
+            ):
+                os.close(fd)
+                fd = self._link(entry_path, tmp_file)
+            if fd is not None:
+                with open(fd, 'wb') as h, open(entry_path, 'rb') as src:
+                    shutil.copyfileobj(src, h)
+            os.replace(tmp_file, output_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        return True
+
+    def store(self, key, content):
+        """
+        Store the content of a generated file in the cache.
+
+        :param str key: the hex digest of the inputs
+        :param str content: the content of the generated file
+        """
+        entry_path = self.get_entry_path(key)
+        if os.path.exists(entry_path):
+            self._mark_used(entry_path)
+            return
+        entry_dir = os.path.dirname(entry_path)
+        os.makedirs(entry_dir, exist_ok=True)
+        data = encode_file_content(content)
+        write_file_atomically(entry_path, data)
+        self._mark_used(entry_path)
+        size = len(data)
+
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._get_entries())
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self.cleanup()
+
+    def cleanup(self, max_size=None):
+        """
+        Remove the least recently used entries exceeding a size.
+
+        :param int max_size: the size to shrink the cache to, if None a
+          fraction of the maximum size to avoid a cleanup for every new entry
+        """
+        if max_size is None:
+            max_size = int(self.max_size * _CLEANUP_RATIO)
+        entries = sorted(self._get_entries())
+        size = sum(entry_size for _, _, entry_size in entries)
+        for _, entry_path, entry_size in entries:
+            if size <= max_size:
+                break
+            for path in (entry_path, entry_path + _LAST_USE_SUFFIX):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # removed concurrently by another process
+                    pass
+            size -= entry_size
+        self._size = size
+
+    def _link(self, entry_path, tmp_file):
+        # replace the temporary file with a hardlink to the entry, if that
+        # fails recreate it and return its file descriptor for copying
+        os.remove(tmp_file)
+        try:
+            os.link(entry_path, tmp_file)
+        except OSError:
+            # e.g. the file system doesn't support hardlinks or the output
+            # is on a different device than the cache
+            return os.open(
+                tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        return None
+
+    def _mark_used(self, entry_path):
+        last_use_path = entry_path + _LAST_USE_SUFFIX
+        now = time.time()
+        try:
+            os.utime(last_use_path, (now, now))
+        except FileNotFoundError:
+            try:
+                open(last_use_path, 'a').close()
+            except OSError:
+                pass
+        except OSError:
+            # e.g. a read-only cache
+            pass
+
+    def _get_entries(self):
+        # tuples of the time of the last use, path and size of all entries
+        try:
+            subdirs = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        for subdir in subdirs:
+            try:
+                entries = os.scandir(os.path.join(self.cache_dir, subdir))
+            except NotADirectoryError:
+                continue
+            with entries:
+                stats = {}
+                for entry in entries:
+                    if entry.name.startswith('.') or not entry.is_file():
+                        continue
+                    try:
+                        stats[entry.name] = (entry.path, entry.stat())
+                    except FileNotFoundError:
+                        continue
+            for name, (path, stat) in stats.items():
+                if name.endswith(_LAST_USE_SUFFIX):
+                    continue
+                last_use = stats.get(name + _LAST_USE_SUFFIX)
+                # entries stored by older versions have no last use yet
+                last_use_time = last_use[1].st_mtime \
+                    if last_use is not None else stat.st_mtime
+                yield last_use_time, path, stat.st_size
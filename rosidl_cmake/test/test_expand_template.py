@@ -0,0 +1,149 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from rosidl_cmake import clear_template_cache
+from rosidl_cmake import expand_template
+from rosidl_cmake import get_template_cache_info
+from rosidl_cmake import TemplateCacheInfo
+from rosidl_cmake.output_cache import OUTPUT_CACHE_DIR_ENVIRONMENT_VARIABLE
+
+
+@pytest.fixture(autouse=True)
+def template_cache(monkeypatch):
+    monkeypatch.delenv(OUTPUT_CACHE_DIR_ENVIRONMENT_VARIABLE, raising=False)
+    clear_template_cache()
+    yield
+    clear_template_cache()
+
+
+def _write_file(path, content, mtime):
+    with open(path, 'w') as h:
+        h.write(content)
+    os.utime(path, (mtime, mtime))
+
+
+def _read_file(path):
+    with open(path, 'r') as h:
+        return h.read()
+
+
+def test_template_cache(tmpdir):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(template_file, 'Hello @(name)!\n', 1000000000)
+    output_file = str(tmpdir.join('foo'))
+
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    assert _read_file(output_file) == 'Hello foo!\n'
+    assert get_template_cache_info() == TemplateCacheInfo(hits=0, misses=1)
+
+    expand_template(template_file, {'name': 'bar'}, output_file)
+    assert _read_file(output_file) == 'Hello bar!\n'
+    assert get_template_cache_info() == TemplateCacheInfo(hits=1, misses=1)
+
+    # a modified template is scanned again
+    _write_file(template_file, 'Bye @(name)!\n', 1000000001)
+    expand_template(template_file, {'name': 'bar'}, output_file)
+    assert _read_file(output_file) == 'Bye bar!\n'
+    assert get_template_cache_info() == TemplateCacheInfo(hits=1, misses=2)
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    assert _read_file(output_file) == 'Bye foo!\n'
+    assert get_template_cache_info() == TemplateCacheInfo(hits=2, misses=2)
+
+
+def test_clear_template_cache(tmpdir):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(template_file, 'Hello @(name)!\n', 1000000000)
+    output_file = str(tmpdir.join('foo'))
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    assert get_template_cache_info() == TemplateCacheInfo(hits=1, misses=1)
+
+    clear_template_cache()
+    assert get_template_cache_info() == TemplateCacheInfo(hits=0, misses=0)
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    assert get_template_cache_info() == TemplateCacheInfo(hits=0, misses=1)
+
+
+def test_template_bangpath(tmpdir):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(template_file, '#!/usr/bin/env empy\n@(1 + 2)\n', 1000000000)
+    output_file = str(tmpdir.join('foo'))
+    expand_template(template_file, {}, output_file)
+    assert _read_file(output_file) == '3\n'
+
+
+def test_reused_interpreter_globals(tmpdir):
+    define_file = str(tmpdir.join('define.em'))
+    _write_file(define_file, "@{leaked = 'value'}@(name)\n", 1000000000)
+    use_file = str(tmpdir.join('use.em'))
+    _write_file(use_file, '@(leaked)\n', 1000000000)
+    output_file = str(tmpdir.join('output'))
+
+    data = {'name': 'foo'}
+    expand_template(define_file, data, output_file)
+    assert _read_file(output_file) == 'foo\n'
+    # the globals defined by the template end up in the passed dictionary
+    assert data['leaked'] == 'value'
+
+    # but aren't visible to the following expansions
+    with pytest.raises(NameError):
+        expand_template(use_file, {}, output_file)
+    assert not os.path.exists(output_file)
+    expand_template(use_file, {'leaked': 'passed'}, output_file)
+    assert _read_file(output_file) == 'passed\n'
+
+
+def test_reused_interpreter_after_error(tmpdir):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(
+        template_file, 'before\n@[if fail]@(undefined)@[end if]after\n',
+        1000000000)
+    output_file = str(tmpdir.join('foo'))
+
+    with pytest.raises(NameError):
+        expand_template(template_file, {'fail': True}, output_file)
+    # no output of the failed expansion remains
+    expand_template(template_file, {'fail': False}, output_file)
+    assert _read_file(output_file) == 'before\nafter\n'
+
+
+def test_unchanged_output(tmpdir):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(template_file, 'Hello @(name)!\n', 1000000000)
+    output_file = str(tmpdir.join('foo'))
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    os.utime(output_file, (1000000001, 1000000001))
+    inode = os.stat(output_file).st_ino
+
+    # an output with the same content isn't touched
+    expand_template(template_file, {'name': 'foo'}, output_file)
+    assert os.stat(output_file).st_ino == inode
+    assert os.path.getmtime(output_file) == 1000000001
+
+    # unless it is older than the minimum timestamp
+    expand_template(
+        template_file, {'name': 'foo'}, output_file,
+        minimum_timestamp=1000000002)
+    assert os.path.getmtime(output_file) > 1000000002
+
+    # a changed output is replaced
+    inode = os.stat(output_file).st_ino
+    expand_template(template_file, {'name': 'bar'}, output_file)
+    assert _read_file(output_file) == 'Hello bar!\n'
+    assert os.stat(output_file).st_ino != inode
+    assert sorted(os.listdir(str(tmpdir))) == ['foo', 'foo.em']
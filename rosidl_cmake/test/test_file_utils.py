@@ -0,0 +1,112 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from rosidl_cmake import file_utils
+from rosidl_cmake.file_utils import create_temporary_file
+from rosidl_cmake.file_utils import encode_file_content
+from rosidl_cmake.file_utils import is_file_content_equal
+from rosidl_cmake.file_utils import write_file_atomically
+
+
+def _read_file(path):
+    with open(path, 'rb') as h:
+        return h.read()
+
+
+def test_encode_file_content(tmpdir):
+    content = 'foo\nbar\n'
+    path = str(tmpdir.join('foo'))
+    with open(path, 'w') as h:
+        h.write(content)
+    assert encode_file_content(content) == _read_file(path)
+
+
+def test_create_temporary_file(tmpdir):
+    path = str(tmpdir.join('foo'))
+    fd, tmp_file = create_temporary_file(path)
+    os.close(fd)
+    assert os.path.dirname(tmp_file) == str(tmpdir)
+    assert os.path.basename(tmp_file).startswith('.foo.')
+    fd, other_tmp_file = create_temporary_file(path)
+    os.close(fd)
+    assert other_tmp_file != tmp_file
+
+
+def test_write_file_atomically(tmpdir):
+    path = str(tmpdir.join('foo'))
+    write_file_atomically(path, b'foo\n')
+    assert _read_file(path) == b'foo\n'
+
+    # the file is replaced rather than modified in place, so a hardlink to
+    # the previous file, e.g. from the output cache, keeps its content
+    link = str(tmpdir.join('link'))
+    os.link(path, link)
+    inode = os.stat(path).st_ino
+    write_file_atomically(path, b'bar\n')
+    assert _read_file(path) == b'bar\n'
+    assert os.stat(path).st_ino != inode
+    assert _read_file(link) == b'foo\n'
+    assert sorted(os.listdir(str(tmpdir))) == ['foo', 'link']
+
+
+def test_write_file_atomically_error(tmpdir, monkeypatch):
+    path = str(tmpdir.join('foo'))
+    write_file_atomically(path, b'foo\n')
+
+    # no temporary file is left if writing fails
+    with pytest.raises(TypeError):
+        write_file_atomically(path, 'not bytes')
+
+    def replace(src, dst):
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(os, 'replace', replace)
+    with pytest.raises(PermissionError):
+        write_file_atomically(path, b'bar\n')
+
+    assert _read_file(path) == b'foo\n'
+    assert os.listdir(str(tmpdir)) == ['foo']
+
+
+def test_is_file_content_equal(tmpdir, monkeypatch):
+    monkeypatch.setattr(file_utils, '_file_digests', {})
+    path = str(tmpdir.join('foo'))
+    assert not is_file_content_equal(path, b'foo\n')
+
+    with open(path, 'wb') as h:
+        h.write(b'foo\n')
+    assert is_file_content_equal(path, b'foo\n')
+    assert not is_file_content_equal(path, b'bar\n')
+    assert not is_file_content_equal(path, b'foo\nbar\n')
+
+    # the digest recorded when writing the file is used as long as the file
+    # doesn't change
+    write_file_atomically(path, b'bar\n')
+    assert is_file_content_equal(path, b'bar\n')
+    with open(path, 'wb') as h:
+        h.write(b'baz\n')
+    os.utime(path, (1000000000, 1000000000))
+    assert not is_file_content_equal(path, b'bar\n')
+    assert is_file_content_equal(path, b'baz\n')
+
+    # files larger than a chunk are compared in chunks
+    data = b'x' * (file_utils._CHUNK_SIZE + 1)
+    write_file_atomically(path, data)
+    monkeypatch.setattr(file_utils, '_file_digests', {})
+    assert is_file_content_equal(path, data)
+    assert not is_file_content_equal(path, data[:-1] + b'y')
@@ -0,0 +1,161 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+import rosidl_cmake
+from rosidl_cmake import GeneratedFileDependencies
+from rosidl_cmake import generate_interface_files
+from rosidl_cmake import output_cache
+from rosidl_cmake import parse_interface_file
+from rosidl_cmake.output_cache import get_code_fingerprint
+
+
+def _write_file(path, content):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as h:
+        h.write(content)
+
+
+def _generate(args, msg_file):
+    dependencies = GeneratedFileDependencies(args)
+    template_file = args['target_dependencies'][0]
+    generated_file = os.path.join(args['output_dir'], 'foo.h')
+    dependencies.add(
+        generated_file, template_file, msg_file,
+        parse_interface_file(args['package_name'], msg_file))
+    _write_file(generated_file, 'generated\n')
+    dependencies.write()
+
+
+def _create_generator(args, dependencies):
+    def generate(interface_file):
+        name = os.path.splitext(os.path.basename(interface_file))[0]
+        spec = parse_interface_file(args['package_name'], interface_file)
+        for suffix in ('.h', '.c'):
+            generated_file = os.path.join(args['output_dir'], name + suffix)
+            dependencies.add(
+                generated_file, args['target_dependencies'][0],
+                interface_file, spec)
+            _write_file(generated_file, 'generated\n')
+            if name == 'Bad':
+                raise ValueError('Failed to generate ' + generated_file)
+    return generate
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_generate_interface_files_error(tmpdir, capsys, jobs):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(template_file, '@(spec)\n')
+    interface_files = [
+        str(tmpdir.join('msg', name + '.msg')) for name in ('Bad', 'Foo')]
+    for interface_file in interface_files:
+        _write_file(interface_file, 'bool foo\n')
+    args = {
+        'package_name': 'pkg',
+        'ros_interface_files': interface_files,
+        'output_dir': str(tmpdir.join('output')),
+        'target_dependencies': [template_file] + interface_files,
+    }
+
+    # the other interfaces are still generated before raising the error
+    with pytest.raises(ValueError) as e:
+        generate_interface_files(args, _create_generator, jobs=jobs)
+    assert 'Bad.h' in str(e.value)
+    assert "Failed to generate the files for '%s'" % interface_files[0] in \
+        capsys.readouterr().err
+    assert os.path.exists(str(tmpdir.join('output', 'Foo.c')))
+
+    # only the successfully generated interfaces are recorded
+    dependencies = GeneratedFileDependencies(args)
+    assert not dependencies.is_unchanged(interface_files[0])
+    assert dependencies.is_unchanged(interface_files[1])
+
+
+def test_is_unchanged(tmpdir, monkeypatch):
+    msg_file = str(tmpdir.join('msg', 'Foo.msg'))
+    _write_file(msg_file, 'bool foo\n')
+    template_file = str(tmpdir.join('foo.h.em'))
+    _write_file(template_file, '@(spec)\n')
+    args = {
+        'package_name': 'pkg',
+        'ros_interface_files': [msg_file],
+        'output_dir': str(tmpdir.join('output')),
+        'target_dependencies': [template_file, msg_file],
+    }
+    _generate(args, msg_file)
+    assert GeneratedFileDependencies(args).is_unchanged(msg_file)
+
+    # a change to any generator module invalidates the manifest
+    monkeypatch.setattr(
+        rosidl_cmake, 'get_code_fingerprint', lambda: 'modified')
+    assert not GeneratedFileDependencies(args).is_unchanged(msg_file)
+    _generate(args, msg_file)
+    assert GeneratedFileDependencies(args).is_unchanged(msg_file)
+
+    _write_file(template_file, '@(spec) \n')
+    assert not GeneratedFileDependencies(args).is_unchanged(msg_file)
+
+
+def test_code_fingerprint(tmpdir, monkeypatch):
+    module_file = str(tmpdir.join('rosidl_fingerprint_test', 'foo.py'))
+    _write_file(module_file, 'FOO = 1\n')
+    _write_file(str(tmpdir.join('rosidl_fingerprint_test', '__init__.py')), '')
+    monkeypatch.syspath_prepend(str(tmpdir))
+
+    monkeypatch.setattr(output_cache, '_code_fingerprint', None)
+    fingerprint = get_code_fingerprint()
+    # the fingerprint is only calculated once per process
+    _write_file(module_file, 'FOO = 2\n')
+    assert get_code_fingerprint() == fingerprint
+
+    monkeypatch.setattr(output_cache, '_code_fingerprint', None)
+    assert get_code_fingerprint() != fingerprint
+
+
+def test_depfile(tmpdir):
+    template_file = str(tmpdir.join('foo.em'))
+    _write_file(template_file, '@(spec)\n')
+    interface_files = [
+        str(tmpdir.join('msg', name + '.msg')) for name in ('Bar', 'Foo')]
+    for interface_file in interface_files:
+        _write_file(interface_file, 'bool foo\n')
+    depfile = str(tmpdir.join('generator.d'))
+    args = {
+        'package_name': 'pkg',
+        'ros_interface_files': interface_files,
+        'output_dir': str(tmpdir.join('output')),
+        'target_dependencies': [template_file] + interface_files,
+        'depfile': depfile,
+    }
+
+    # a single rule for the first generated file lists all dependencies
+    generate_interface_files(args, _create_generator)
+    with open(depfile, 'r') as h:
+        lines = h.read().splitlines()
+    assert len(lines) == 1
+    target, dependencies = lines[0].split(': ')
+    assert target == str(tmpdir.join('output', 'Bar.h'))
+    dependencies = dependencies.split(' ')
+    assert dependencies.count(template_file) == 1
+    assert dependencies[-2:] == interface_files
+
+    # the build tool can pass its own path of the first output
+    args['depfile_target'] = 'output/Bar.h'
+    generate_interface_files(args, _create_generator)
+    with open(depfile, 'r') as h:
+        assert h.read().startswith('output/Bar.h: ')
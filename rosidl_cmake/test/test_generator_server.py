@@ -0,0 +1,195 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+from threading import Thread
+import time
+
+import pytest
+
+from rosidl_cmake import generator_client
+from rosidl_cmake.generator_client import request_generation
+
+GENERATOR_MODULE = """
+import importlib.util
+import json
+import os
+import sys
+import time
+
+
+def generate(generator_arguments_file, jobs=None):
+    with open(generator_arguments_file, 'r') as h:
+        args = json.load(h)
+    if 'started' in args:
+        open(args['started'], 'w').close()
+    if 'wait_for' in args:
+        deadline = time.time() + 30
+        while not os.path.exists(args['wait_for']) and time.time() < deadline:
+            time.sleep(0.01)
+    if 'create' in args:
+        open(args['create'], 'w').close()
+    print(json.dumps({
+        'cwd': os.getcwd(),
+        'foo': os.environ.get('ROSIDL_GENERATOR_SERVER_TEST'),
+        'waited': os.path.exists(args.get('wait_for', '')),
+    }))
+    print('generated', file=sys.stderr)
+    return 0
+
+
+def not_whitelisted(generator_arguments_file, jobs=None):
+    print('must not be invoked')
+    return 0
+"""
+
+GENERATOR = 'rosidl_generator_server_test:generate'
+
+
+@pytest.fixture
+def server(tmpdir, monkeypatch):
+    module_dir = str(tmpdir.join('modules'))
+    os.makedirs(module_dir)
+    module_file = os.path.join(module_dir, 'rosidl_generator_server_test.py')
+    with open(module_file, 'w') as h:
+        h.write(GENERATOR_MODULE)
+    # the client compares the generator module with the one of the server
+    monkeypatch.syspath_prepend(module_dir)
+
+    socket_path = str(tmpdir.join('socket'))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [module_dir] + [p for p in sys.path if p])
+    env['ROSIDL_GENERATOR_SERVER_TEST'] = 'server'
+    process = subprocess.Popen(
+        [sys.executable, '-c',
+         'from rosidl_cmake.generator_server import serve; '
+         'serve(%r, generators=[%r])' % (socket_path, GENERATOR)],
+        env=env, cwd=str(tmpdir.join('modules')))
+    # the socket file exists shortly before the server is listening
+    deadline = time.time() + 30
+    while True:
+        assert process.poll() is None, 'The generator server failed to start'
+        assert time.time() < deadline, 'The generator server did not start'
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(socket_path)
+            break
+        except OSError:
+            time.sleep(0.01)
+
+    yield process, socket_path, module_file
+
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+    process.wait(timeout=30)
+
+
+def _write_arguments_file(path, args):
+    with open(path, 'w') as h:
+        json.dump(args, h)
+    return path
+
+
+def test_request_generation(tmpdir, monkeypatch, capsys, server):
+    _, socket_path, _ = server
+    arguments_file = _write_arguments_file(str(tmpdir.join('args.json')), {})
+
+    # the generator uses the environment and the working directory of the
+    # client and its output is being forwarded
+    for value in ('foo', 'bar'):
+        client_dir = str(tmpdir.join(value))
+        os.makedirs(client_dir)
+        monkeypatch.chdir(client_dir)
+        monkeypatch.setenv('ROSIDL_GENERATOR_SERVER_TEST', value)
+        assert request_generation(
+            GENERATOR, arguments_file, socket_path=socket_path) == 0
+        captured = capsys.readouterr()
+        output = json.loads(captured.out)
+        assert output['cwd'] == client_dir
+        assert output['foo'] == value
+        assert captured.err == 'generated\n'
+
+    # only whitelisted generators are invoked
+    assert request_generation(
+        'rosidl_generator_server_test:not_whitelisted', arguments_file,
+        socket_path=socket_path) is None
+    assert capsys.readouterr().out == ''
+
+
+def test_concurrent_requests(tmpdir, capsys, server):
+    _, socket_path, _ = server
+    started_file = str(tmpdir.join('started'))
+    marker_file = str(tmpdir.join('marker'))
+    waiting_arguments_file = _write_arguments_file(
+        str(tmpdir.join('waiting.json')),
+        {'started': started_file, 'wait_for': marker_file})
+    creating_arguments_file = _write_arguments_file(
+        str(tmpdir.join('creating.json')), {'create': marker_file})
+
+    # the first request only finishes after the second one has been processed
+    results = []
+    thread = Thread(target=lambda: results.append(request_generation(
+        GENERATOR, waiting_arguments_file, socket_path=socket_path)))
+    thread.start()
+    deadline = time.time() + 30
+    while not os.path.exists(started_file) and time.time() < deadline:
+        time.sleep(0.01)
+    assert request_generation(
+        GENERATOR, creating_arguments_file, socket_path=socket_path) == 0
+    thread.join()
+    assert results == [0]
+    # the waiting request saw the result of the other one
+    outputs = [
+        json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(output['waited'] for output in outputs) == [False, True]
+
+
+def test_stale_server(tmpdir, server):
+    process, socket_path, module_file = server
+    arguments_file = _write_arguments_file(str(tmpdir.join('args.json')), {})
+    assert request_generation(
+        GENERATOR, arguments_file, socket_path=socket_path) == 0
+
+    # a modified module makes the server decline the request and shut down
+    mtime = os.path.getmtime(module_file) + 1
+    os.utime(module_file, (mtime, mtime))
+    assert request_generation(
+        GENERATOR, arguments_file, socket_path=socket_path) is None
+    assert process.wait(timeout=30) == 0
+    assert not os.path.exists(socket_path)
+
+
+def test_client_without_unix_sockets(tmpdir, monkeypatch):
+    # the generator scripts load the client without importing the package,
+    # on platforms without Unix domain sockets it must not be used
+    monkeypatch.setitem(sys.modules, 'rosidl_cmake', None)
+    monkeypatch.delattr(socket, 'AF_UNIX')
+    spec = importlib.util.spec_from_file_location(
+        'rosidl_cmake_generator_server_client', generator_client.__file__)
+    client = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(client)
+
+    socket_path = str(tmpdir.join('socket'))
+    open(socket_path, 'w').close()
+    monkeypatch.setenv(
+        client.GENERATOR_SERVER_SOCKET_ENVIRONMENT_VARIABLE, socket_path)
+    arguments_file = _write_arguments_file(str(tmpdir.join('args.json')), {})
+    assert client.request_generation(GENERATOR, arguments_file) is None
@@ -0,0 +1,135 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import os
+
+import pytest
+
+from rosidl_cmake import output_cache
+from rosidl_cmake.output_cache import OutputCache
+from rosidl_cmake.output_cache import parse_size
+
+KEYS = ['%02x' % i + '0' * 62 for i in range(4)]
+
+
+def _read_file(path):
+    with open(path, 'r') as h:
+        return h.read()
+
+
+def _set_last_use(cache, key, timestamp):
+    last_use_path = cache.get_entry_path(key) + output_cache._LAST_USE_SUFFIX
+    os.utime(last_use_path, (timestamp, timestamp))
+
+
+def test_parse_size():
+    assert parse_size('1024') == 1024
+    assert parse_size('2k') == 2 * 1024
+    assert parse_size(' 3M ') == 3 * 1024 ** 2
+    assert parse_size('5G') == 5 * 1024 ** 3
+    for value in ('', 'G', 'foo', '0', '-1K'):
+        with pytest.raises(ValueError):
+            parse_size(value)
+
+
+def test_store_and_materialize(tmpdir):
+    cache = OutputCache(str(tmpdir.join('cache')))
+    output_file = str(tmpdir.join('output', 'foo.h'))
+    assert not cache.materialize(KEYS[0], output_file)
+    assert not os.path.exists(output_file)
+
+    cache.store(KEYS[0], 'foo\n')
+    assert cache.materialize(KEYS[0], output_file)
+    assert _read_file(output_file) == 'foo\n'
+    # the output is a copy by default
+    assert not os.path.samefile(cache.get_entry_path(KEYS[0]), output_file)
+
+    # an output with the same content is left untouched
+    os.utime(output_file, (1000000000, 1000000000))
+    output_stat = os.stat(output_file)
+    assert cache.materialize(KEYS[0], output_file)
+    assert os.stat(output_file).st_ino == output_stat.st_ino
+    assert os.path.getmtime(output_file) == 1000000000
+
+    # unless it is older than the minimum timestamp
+    assert cache.materialize(
+        KEYS[0], output_file, minimum_timestamp=1000000001)
+    assert os.path.getmtime(output_file) > 1000000001
+
+    # an output with different content is replaced
+    cache.store(KEYS[1], 'bar\n')
+    assert cache.materialize(KEYS[1], output_file)
+    assert _read_file(output_file) == 'bar\n'
+    assert os.listdir(os.path.dirname(output_file)) == ['foo.h']
+
+
+def test_materialize_hardlink(tmpdir, monkeypatch):
+    cache = OutputCache(str(tmpdir.join('cache')), hardlink=True)
+    cache.store(KEYS[0], 'foo\n')
+    entry_path = cache.get_entry_path(KEYS[0])
+    output_file = str(tmpdir.join('output', 'foo.h'))
+    assert cache.materialize(KEYS[0], output_file)
+    assert os.path.samefile(entry_path, output_file)
+
+    # the shared timestamp of a hardlink must not be updated, so outputs
+    # which need to be newer than the minimum timestamp are copied
+    other_output_file = str(tmpdir.join('output', 'bar.h'))
+    assert cache.materialize(
+        KEYS[0], other_output_file,
+        minimum_timestamp=os.path.getmtime(entry_path))
+    assert not os.path.samefile(entry_path, other_output_file)
+    assert _read_file(other_output_file) == 'foo\n'
+
+    # outputs are copied if hardlinks aren't supported
+    def link(src, dst):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(os, 'link', link)
+    cache.store(KEYS[1], 'baz\n')
+    assert cache.materialize(KEYS[1], output_file)
+    assert not os.path.samefile(cache.get_entry_path(KEYS[1]), output_file)
+    assert _read_file(output_file) == 'baz\n'
+    assert sorted(os.listdir(os.path.dirname(output_file))) == \
+        ['bar.h', 'foo.h']
+
+
+def test_cleanup(tmpdir):
+    cache = OutputCache(str(tmpdir.join('cache')))
+    for i, key in enumerate(KEYS[:3]):
+        cache.store(key, 'x' * 9 + '\n')
+        _set_last_use(cache, key, 1000000000 + i)
+
+    # materializing an entry marks it as the most recently used one
+    assert cache.materialize(KEYS[0], str(tmpdir.join('output')))
+    cache.cleanup(max_size=20)
+    assert os.path.exists(cache.get_entry_path(KEYS[0]))
+    assert not os.path.exists(cache.get_entry_path(KEYS[1]))
+    assert not os.path.exists(
+        cache.get_entry_path(KEYS[1]) + output_cache._LAST_USE_SUFFIX)
+    assert os.path.exists(cache.get_entry_path(KEYS[2]))
+
+
+def test_store_exceeding_max_size(tmpdir):
+    cache = OutputCache(str(tmpdir.join('cache')), max_size=30)
+    for i, key in enumerate(KEYS[:3]):
+        cache.store(key, 'x' * 9 + '\n')
+        _set_last_use(cache, key, 1000000000 + i)
+    assert all(os.path.exists(cache.get_entry_path(key)) for key in KEYS[:3])
+
+    # the least recently used entries are removed until the size is below
+    # a fraction of the maximum size
+    cache.store(KEYS[3], 'x' * 9 + '\n')
+    assert [os.path.exists(cache.get_entry_path(key)) for key in KEYS] == \
+        [False, False, True, True]
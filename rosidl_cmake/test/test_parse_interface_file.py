@@ -0,0 +1,74 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import pytest
+
+from rosidl_cmake import parse_interface_file
+from rosidl_parser import MessageSpecification
+from rosidl_parser import ServiceSpecification
+
+
+def _write_file(path, content, mtime):
+    with open(path, 'w') as h:
+        h.write(content)
+    os.utime(path, (mtime, mtime))
+
+
+def test_parse_interface_file(tmpdir):
+    msg_file = str(tmpdir.join('msg', 'Foo.msg'))
+    os.makedirs(os.path.dirname(msg_file))
+    _write_file(msg_file, 'bool foo\n', 1000000000)
+
+    spec = parse_interface_file('pkg', msg_file)
+    assert isinstance(spec, MessageSpecification)
+    assert [f.name for f in spec.fields] == ['foo']
+
+    # the file is only parsed once
+    assert parse_interface_file('pkg', msg_file) is spec
+    assert parse_interface_file(
+        'pkg', os.path.join(str(tmpdir), 'msg', '..', 'msg', 'Foo.msg')) is spec
+
+    # the specification depends on the package name
+    other_spec = parse_interface_file('other_pkg', msg_file)
+    assert other_spec is not spec
+    assert other_spec.base_type.pkg_name == 'other_pkg'
+
+    # a modified file is parsed again
+    _write_file(msg_file, 'bool foo\nint32 bar\n', 1000000001)
+    modified_spec = parse_interface_file('pkg', msg_file)
+    assert modified_spec is not spec
+    assert [f.name for f in modified_spec.fields] == ['foo', 'bar']
+    assert parse_interface_file('pkg', msg_file) is modified_spec
+
+
+def test_parse_interface_file_service(tmpdir):
+    srv_file = str(tmpdir.join('Bar.srv'))
+    _write_file(srv_file, 'bool foo\n---\nint32 bar\n', 1000000000)
+    spec = parse_interface_file('pkg', srv_file)
+    assert isinstance(spec, ServiceSpecification)
+    assert parse_interface_file('pkg', srv_file) is spec
+
+
+def test_parse_interface_file_errors(tmpdir):
+    msg_file = str(tmpdir.join('Foo.msg'))
+    _write_file(msg_file, 'bool foo\nbool foo\n', 1000000000)
+    # invalid files are not cached
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            parse_interface_file('pkg', msg_file)
+
+    with pytest.raises(AssertionError):
+        parse_interface_file('pkg', str(tmpdir.join('Foo.idl')))
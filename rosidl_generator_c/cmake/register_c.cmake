@@ -28,7 +28,10 @@ macro(rosidl_generator_c_extras BIN GENERATOR_FILES TEMPLATE_DIR)
   set(rosidl_generator_c_BIN "${BIN}")
 
   normalize_path(GENERATOR_FILES "${GENERATOR_FILES}")
-  set(rosidl_generator_c_GENERATOR_FILES "${GENERATOR_FILES}")
+  # the layout module calculates the static asserts in the struct headers
+  get_filename_component(_generator_dir "${GENERATOR_FILES}" DIRECTORY)
+  set(rosidl_generator_c_GENERATOR_FILES
+    "${GENERATOR_FILES}" "${_generator_dir}/layout.py")
 
   normalize_path(TEMPLATE_DIR "${TEMPLATE_DIR}")
   set(rosidl_generator_c_TEMPLATE_DIR "${TEMPLATE_DIR}")
@@ -10,6 +10,10 @@
 @#  - subfolder (string)
 @#    The subfolder / subnamespace of the message
 @#    Could be 'msg', 'srv' or 'action'
+@#  - max_serialized_size (int)
+@#    The maximum CDR serialized size of the message, None if unbounded
+@#  - layout (rosidl_generator_c.layout.Layout)
+@#    The layout of the message struct calculated for the host ABI
 @#  - get_header_filename_from_msg_name (function)
 @#######################################################################
 @
@@ -17,6 +21,8 @@
 from rosidl_generator_c import msg_type_to_c
 from rosidl_generator_c import MSG_TYPE_TO_C
 from rosidl_generator_c import primitive_value_to_c
+from rosidl_generator_c.layout import get_static_asserts
+from rosidl_generator_c.layout import HOST_UINTPTR_MAX
 
 header_guard_parts = [
     spec.base_type.pkg_name, subfolder,
@@ -144,6 +150,19 @@ enum
 };
 @[  end for]@
 
+@[end if]@
+@
+@#######################################################################
+@# Constant for the maximum serialized size of bounded messages
+@#######################################################################
+@# the value of an enum must be representable as an int
+@[if max_serialized_size is not None and max_serialized_size <= 2147483647]@
+// the maximum size of the message serialized with CDR
+enum
+{
+  @(msg_typename)__MAX_SERIALIZED_SIZE = @(max_serialized_size)
+};
+
 @[end if]@
 @
 @#######################################################################
@@ -160,6 +179,19 @@ typedef struct @(msg_typename)
 @[end if]@
 } @(msg_typename);
 
+@#######################################################################
+@# Static assertions of the struct layout
+@#######################################################################
+// the layout of the struct as calculated by the generator, only checked by
+// the generated C sources if they are compiled for the ABI of the generator
+#if defined(ROSIDL_GENERATOR_C_HOST_ABI) && !defined(__cplusplus) && \
+  defined(__STDC_VERSION__) && __STDC_VERSION__ >= 201112L && \
+  UINTPTR_MAX == @('0x%xu' % HOST_UINTPTR_MAX)
+@[for static_assert in get_static_asserts(layout, msg_typename)]@
+@(static_assert)
+@[end for]@
+#endif
+
 @#######################################################################
 @# Struct for an array of messages
 @#######################################################################
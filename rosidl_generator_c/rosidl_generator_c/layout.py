@@ -0,0 +1,228 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+import ctypes
+
+from rosidl_parser.definition import Array
+from rosidl_parser.definition import BaseString
+from rosidl_parser.definition import BasicType
+from rosidl_parser.definition import EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME
+from rosidl_parser.definition import NamespacedType
+from rosidl_parser.definition import Sequence
+
+# the ctypes type with the same C representation for each basic type
+BASIC_TYPE_TO_CTYPE = {
+    'short': ctypes.c_int16,
+    'unsigned short': ctypes.c_uint16,
+    'long': ctypes.c_int32,
+    'unsigned long': ctypes.c_uint32,
+    'long long': ctypes.c_int64,
+    'unsigned long long': ctypes.c_uint64,
+    'float': ctypes.c_float,
+    'double': ctypes.c_double,
+    'long double': ctypes.c_longdouble,
+    'char': ctypes.c_byte,
+    'wchar': ctypes.c_uint16,
+    'boolean': ctypes.c_bool,
+    'octet': ctypes.c_uint8,
+    'int8': ctypes.c_int8,
+    'uint8': ctypes.c_uint8,
+    'int16': ctypes.c_int16,
+    'uint16': ctypes.c_uint16,
+    'int32': ctypes.c_int32,
+    'uint32': ctypes.c_uint32,
+    'int64': ctypes.c_int64,
+    'uint64': ctypes.c_uint64,
+}
+
+
+# the value of UINTPTR_MAX for the host ABI, used to guard the static asserts
+HOST_UINTPTR_MAX = (1 << (8 * ctypes.sizeof(ctypes.c_void_p))) - 1
+
+
+class Layout:
+    """The size, alignment and member offsets of a C type for the host ABI."""
+
+    __slots__ = ('size', 'alignment', 'member_offsets')
+
+    def __init__(self, size, alignment, member_offsets=None):
+        """
+        Constructor.
+
+        :param int size: the size in bytes as returned by `sizeof`
+        :param int alignment: the alignment in bytes as returned by `alignof`
+        :param OrderedDict member_offsets: the offset in bytes of each member
+          by name as returned by `offsetof`, None if the type isn't a struct
+        """
+        self.size = size
+        self.alignment = alignment
+        self.member_offsets = member_offsets
+
+
+def get_ctype_layout(ctype):
+    return Layout(ctypes.sizeof(ctype), ctypes.alignment(ctype))
+
+
+def get_struct_layout(member_layouts):
+    """
+    Get the layout of a C struct, padding each member to its alignment.
+
+    :param member_layouts: an iterable of tuples containing the member name
+      and the `Layout` of the member type
+    :returns: the `Layout` of the struct
+    """
+    offset = 0
+    alignment = 1
+    member_offsets = OrderedDict()
+    for name, layout in member_layouts:
+        offset = _align(offset, layout.alignment)
+        member_offsets[name] = offset
+        offset += layout.size
+        alignment = max(alignment, layout.alignment)
+    return Layout(_align(offset, alignment), alignment, member_offsets)
+
+
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+# rosidl_generator_c__String as well as all sequence structs
+_SEQUENCE_LAYOUT = get_struct_layout([
+    ('data', get_ctype_layout(ctypes.c_void_p)),
+    ('size', get_ctype_layout(ctypes.c_size_t)),
+    ('capacity', get_ctype_layout(ctypes.c_size_t)),
+])
+
+# the struct of a message without fields contains a single bool
+_EMPTY_STRUCT_MEMBER_NAME = '_dummy'
+
+
+class LayoutCalculator:
+    """
+    Calculate the layout of the C structs generated by rosidl_generator_c.
+
+    Namespaced types are resolved through the added structures.
+    The layout of each type is only calculated once.
+    """
+
+    def __init__(self, structures=None, get_structure=None):
+        """
+        Constructor.
+
+        :param structures: an iterable of `Structure` instances
+        :param get_structure: an optional callable which is invoked with a
+          `NamespacedType` which hasn't been added and returns the
+          `Structure` or None
+        """
+        self._structures = {}
+        self._get_structure = get_structure
+        self._layouts = {}
+        for structure in structures or []:
+            self.add_structure(structure)
+
+    def add_structure(self, structure):
+        """
+        Add a structure to resolve namespaced types with.
+
+        :param Structure structure: the structure
+        """
+        self._structures[structure.type] = structure
+
+    def get_structure(self, type_):
+        """
+        Get the structure of a namespaced type.
+
+        :param NamespacedType type_: the type
+        :returns: the `Structure`
+        :raises: ValueError if the structure is unknown
+        """
+        structure = self._structures.get(type_)
+        if structure is None and self._get_structure is not None:
+            structure = self._get_structure(type_)
+            if structure is not None:
+                self.add_structure(structure)
+        if structure is None:
+            raise ValueError(
+                "Unknown structure '{type_name}'".format(
+                    type_name='/'.join(type_.namespaces + [type_.name])))
+        return structure
+
+    def get_layout(self, type_):
+        """
+        Get the layout of the C representation of a type.
+
+        :param AbstractType type_: the type
+        :returns: the `Layout`
+        """
+        layout = self._layouts.get(type_)
+        if layout is None:
+            layout = self._calculate_layout(type_)
+            self._layouts[type_] = layout
+        return layout
+
+    def _calculate_layout(self, type_):
+        if isinstance(type_, BasicType):
+            return get_ctype_layout(BASIC_TYPE_TO_CTYPE[type_.type])
+
+        if isinstance(type_, (BaseString, Sequence)):
+            return _SEQUENCE_LAYOUT
+
+        if isinstance(type_, Array):
+            layout = self.get_layout(type_.basetype)
+            return Layout(layout.size * type_.size, layout.alignment)
+
+        if isinstance(type_, NamespacedType):
+            structure = self.get_structure(type_)
+            member_names = [member.name for member in structure.members]
+            if member_names in ([], [EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME]):
+                return get_struct_layout([(
+                    _EMPTY_STRUCT_MEMBER_NAME,
+                    get_ctype_layout(ctypes.c_bool))])
+            return get_struct_layout(
+                (member.name, self.get_layout(member.type))
+                for member in structure.members)
+
+        assert False, "Unsupported type '{type_}'".format_map(locals())
+
+
+def get_c_typename(type_):
+    """Get the name of the generated C struct for a namespaced type."""
+    return '__'.join(type_.namespaces + [type_.name])
+
+
+def get_static_asserts(layout, typename):
+    """
+    Get C static assertions checking the layout of a struct.
+
+    Since the layout is calculated for the host ABI the assertions must only
+    be used when the code is being compiled for the same ABI.
+
+    :param Layout layout: the layout of the struct
+    :param str typename: the name of the C struct
+    :returns: a list of C statements
+    """
+    asserts = [
+        '_Static_assert(sizeof({typename}) == {size}, '
+        '"Unexpected size of {typename}");'.format(
+            typename=typename, size=layout.size),
+        '_Static_assert(_Alignof({typename}) == {alignment}, '
+        '"Unexpected alignment of {typename}");'.format(
+            typename=typename, alignment=layout.alignment),
+    ]
+    for name, offset in layout.member_offsets.items():
+        asserts.append(
+            '_Static_assert(offsetof({typename}, {name}) == {offset}, '
+            '"Unexpected offset of {typename}.{name}");'.format_map(locals()))
+    return asserts
@@ -0,0 +1,190 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ctypes
+
+import pytest
+
+from rosidl_generator_c.layout import get_c_typename
+from rosidl_generator_c.layout import get_static_asserts
+from rosidl_generator_c.layout import Layout
+from rosidl_generator_c.layout import LayoutCalculator
+from rosidl_parser.definition import Array
+from rosidl_parser.definition import BasicType
+from rosidl_parser.definition import BoundedSequence
+from rosidl_parser.definition import EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME
+from rosidl_parser.definition import Member
+from rosidl_parser.definition import NamespacedType
+from rosidl_parser.definition import String
+from rosidl_parser.definition import Structure
+from rosidl_parser.definition import UnboundedSequence
+
+INNER_TYPE = NamespacedType(['pkg', 'msg'], 'Inner')
+OUTER_TYPE = NamespacedType(['pkg', 'msg'], 'Outer')
+EMPTY_TYPE = NamespacedType(['pkg', 'msg'], 'Empty')
+
+
+# the C structs as generated by msg__struct.h.em as a reference
+class _CSequence(ctypes.Structure):
+    _fields_ = [
+        ('data', ctypes.c_void_p),
+        ('size', ctypes.c_size_t),
+        ('capacity', ctypes.c_size_t),
+    ]
+
+
+class _CInner(ctypes.Structure):
+    _fields_ = [
+        ('a', ctypes.c_uint8),
+        ('b', ctypes.c_double),
+        ('c', ctypes.c_int16),
+    ]
+
+
+class _COuter(ctypes.Structure):
+    _fields_ = [
+        ('flag', ctypes.c_bool),
+        ('inner', _CInner),
+        ('values', ctypes.c_int16 * 3),
+        ('inners', _CInner * 2),
+        ('name', _CSequence),
+        ('bounded', _CSequence),
+        ('unbounded', _CSequence),
+    ]
+
+
+def _get_calculator(get_structure=None):
+    return LayoutCalculator(
+        structures=[
+            Structure(INNER_TYPE, members=[
+                Member(BasicType('uint8'), 'a'),
+                Member(BasicType('double'), 'b'),
+                Member(BasicType('int16'), 'c'),
+            ]),
+            Structure(OUTER_TYPE, members=[
+                Member(BasicType('boolean'), 'flag'),
+                Member(INNER_TYPE, 'inner'),
+                Member(Array(BasicType('int16'), 3), 'values'),
+                Member(Array(INNER_TYPE, 2), 'inners'),
+                Member(String(), 'name'),
+                Member(BoundedSequence(BasicType('uint8'), 5), 'bounded'),
+                Member(UnboundedSequence(INNER_TYPE), 'unbounded'),
+            ]),
+        ],
+        get_structure=get_structure)
+
+
+def _assert_layout(layout, ctype):
+    assert layout.size == ctypes.sizeof(ctype)
+    assert layout.alignment == ctypes.alignment(ctype)
+    assert list(layout.member_offsets.items()) == [
+        (name, getattr(ctype, name).offset) for name, _ in ctype._fields_]
+
+
+def test_basic_layout():
+    calculator = _get_calculator()
+    for typename, ctype in [
+        ('boolean', ctypes.c_bool),
+        ('uint8', ctypes.c_uint8),
+        ('int16', ctypes.c_int16),
+        ('uint32', ctypes.c_uint32),
+        ('int64', ctypes.c_int64),
+        ('double', ctypes.c_double),
+    ]:
+        layout = calculator.get_layout(BasicType(typename))
+        assert layout.size == ctypes.sizeof(ctype)
+        assert layout.alignment == ctypes.alignment(ctype)
+        assert layout.member_offsets is None
+
+    _assert_layout(calculator.get_layout(INNER_TYPE), _CInner)
+
+
+def test_array_layout():
+    calculator = _get_calculator()
+    layout = calculator.get_layout(Array(BasicType('int16'), 3))
+    assert layout.size == 3 * ctypes.sizeof(ctypes.c_int16)
+    assert layout.alignment == ctypes.alignment(ctypes.c_int16)
+
+    layout = calculator.get_layout(Array(INNER_TYPE, 2))
+    assert layout.size == 2 * ctypes.sizeof(_CInner)
+    assert layout.alignment == ctypes.alignment(_CInner)
+
+    # strings and sequences are structs with a pointer, a size and a capacity
+    for type_ in (
+        String(), BoundedSequence(BasicType('uint8'), 5),
+        UnboundedSequence(INNER_TYPE)
+    ):
+        layout = calculator.get_layout(type_)
+        assert layout.size == ctypes.sizeof(_CSequence)
+        assert layout.alignment == ctypes.alignment(_CSequence)
+
+
+def test_nested_layout():
+    calculator = _get_calculator()
+    _assert_layout(calculator.get_layout(OUTER_TYPE), _COuter)
+    # the layout of each type is only calculated once
+    assert calculator.get_layout(OUTER_TYPE) is \
+        calculator.get_layout(OUTER_TYPE)
+
+
+def test_nested_layout_get_structure():
+    requested_types = []
+
+    def get_structure(type_):
+        requested_types.append(type_)
+        if type_ == EMPTY_TYPE:
+            return Structure(EMPTY_TYPE)
+        return None
+
+    calculator = _get_calculator(get_structure=get_structure)
+    layout = calculator.get_layout(Array(EMPTY_TYPE, 4))
+    assert layout.size == 4 * ctypes.sizeof(ctypes.c_bool)
+    calculator.get_layout(EMPTY_TYPE)
+    assert requested_types == [EMPTY_TYPE]
+
+    unknown_type = NamespacedType(['pkg', 'msg'], 'Unknown')
+    with pytest.raises(ValueError) as e:
+        calculator.get_layout(unknown_type)
+    assert 'pkg/msg/Unknown' in str(e.value)
+
+
+@pytest.mark.parametrize('members', [
+    [],
+    [Member(BasicType('uint8'), EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME)],
+])
+def test_empty_struct_layout(members):
+    # the struct of a message without fields contains a single bool
+    calculator = LayoutCalculator(structures=[Structure(EMPTY_TYPE, members)])
+    layout = calculator.get_layout(EMPTY_TYPE)
+    assert layout.size == ctypes.sizeof(ctypes.c_bool)
+    assert layout.alignment == ctypes.alignment(ctypes.c_bool)
+    assert list(layout.member_offsets.items()) == [('_dummy', 0)]
+
+
+def test_get_c_typename():
+    assert get_c_typename(OUTER_TYPE) == 'pkg__msg__Outer'
+
+
+def test_get_static_asserts():
+    layout = Layout(16, 8, {'a': 0, 'b': 8})
+    assert get_static_asserts(layout, 'pkg__msg__Foo') == [
+        '_Static_assert(sizeof(pkg__msg__Foo) == 16, '
+        '"Unexpected size of pkg__msg__Foo");',
+        '_Static_assert(_Alignof(pkg__msg__Foo) == 8, '
+        '"Unexpected alignment of pkg__msg__Foo");',
+        '_Static_assert(offsetof(pkg__msg__Foo, a) == 0, '
+        '"Unexpected offset of pkg__msg__Foo.a");',
+        '_Static_assert(offsetof(pkg__msg__Foo, b) == 8, '
+        '"Unexpected offset of pkg__msg__Foo.b");',
+    ]
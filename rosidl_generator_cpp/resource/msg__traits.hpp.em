@@ -10,6 +10,8 @@
 @#  - subfolder (string)
 @#    The subfolder / subnamespace of the message
 @#    Either 'msg' or 'srv'
+@#  - max_serialized_size (int)
+@#    The maximum CDR serialized size of the message, None if unbounded
 @#  - get_header_filename_from_msg_name (function)
 @#######################################################################
 @
@@ -26,6 +28,8 @@ header_guard_variable = '__'.join([x.upper() for x in header_guard_parts]) + '_'
 cpp_namespace = '%s::%s::' % (spec.base_type.pkg_name, subfolder)
 }@
 #include <stdint.h>
+
+#include <cstddef>
 #include <type_traits>
 
 namespace rosidl_generator_traits
@@ -43,6 +47,10 @@ struct has_fixed_size : std::false_type {};
 template<typename T>
 struct has_bounded_size : std::false_type {};
 
+// only defined for messages with a bounded size
+template<typename T>
+struct max_serialized_size;
+
 #endif  // __ROSIDL_GENERATOR_CPP_TRAITS
 
 #include "@(spec.base_type.pkg_name)/@(subfolder)/@(get_header_filename_from_msg_name(spec.base_type.type))__struct.hpp"
@@ -100,6 +108,13 @@ template<>
 struct has_bounded_size<@(cpp_namespace)@(spec.base_type.type)>
   : std::integral_constant<bool, @(bounded_template_string)> {};
 
+@[if max_serialized_size is not None]@
+// the maximum size of the message serialized with CDR
+template<>
+struct max_serialized_size<@(cpp_namespace)@(spec.base_type.type)>
+  : std::integral_constant<std::size_t, @(max_serialized_size)u> {};
+@[end if]@
+
 template<>
 inline const char * data_type<@(cpp_namespace)@(spec.base_type.type)>()
 {
@@ -38,6 +38,10 @@ struct has_fixed_size : std::false_type {};
 template<typename T>
 struct has_bounded_size : std::false_type {};
 
+// only defined for messages with a bounded size
+template<typename T>
+struct max_serialized_size;
+
 #endif  // __ROSIDL_GENERATOR_CPP_TRAITS
 
 template<>
@@ -16,86 +16,110 @@ import os
 
 from rosidl_cmake import convert_camel_case_to_lower_case_underscore
 from rosidl_cmake import expand_template
-from rosidl_cmake import get_newest_modification_time
+from rosidl_cmake import generate_interface_files
+from rosidl_cmake import get_max_serialized_size_calculator
+from rosidl_cmake import parse_interface_file
 from rosidl_cmake import read_generator_arguments
-from rosidl_parser import parse_action_file
-from rosidl_parser import parse_message_file
-from rosidl_parser import parse_service_file
+from rosidl_parser.definition import NamespacedType
 
 
-def generate_cpp(generator_arguments_file):
+def generate_cpp(generator_arguments_file, jobs=None):
     args = read_generator_arguments(generator_arguments_file)
-
-    template_dir = args['template_dir']
-    mapping_msgs = {
-        os.path.join(template_dir, 'msg.hpp.em'): '%s.hpp',
-        os.path.join(template_dir, 'msg__struct.hpp.em'): '%s__struct.hpp',
-        os.path.join(template_dir, 'msg__traits.hpp.em'): '%s__traits.hpp',
-    }
-
-    mapping_srvs = {
-        os.path.join(template_dir, 'srv.hpp.em'): '%s.hpp',
-        os.path.join(template_dir, 'srv__struct.hpp.em'): '%s__struct.hpp',
-        os.path.join(template_dir, 'srv__traits.hpp.em'): '%s__traits.hpp',
-    }
-
-    mapping_actions = {
-        os.path.join(template_dir, 'action.hpp.em'): '%s.hpp',
-        os.path.join(template_dir, 'action__struct.hpp.em'): '%s__struct.hpp',
-    }
-
-    for template_file in mapping_msgs.keys():
-        assert os.path.exists(template_file), 'Could not find template: ' + template_file
-    for template_file in mapping_srvs.keys():
-        assert os.path.exists(template_file), 'Could not find template: ' + template_file
-    for template_file in mapping_actions.keys():
-        assert os.path.exists(template_file), 'Could not find template: ' + template_file
-
-    functions = {
-        'get_header_filename_from_msg_name': convert_camel_case_to_lower_case_underscore,
-    }
-    latest_target_timestamp = get_newest_modification_time(args['target_dependencies'])
-
-    for ros_interface_file in args['ros_interface_files']:
+    return generate_interface_files(
+        args, _CppGenerator, generator_files=[__file__], jobs=jobs)
+
+
+class _CppGenerator:
+    """Generate the C++ files for a single interface file."""
+
+    def __init__(self, args, dependencies):
+        self.args = args
+        self.dependencies = dependencies
+
+        template_dir = args['template_dir']
+        self.mapping_msgs = {
+            os.path.join(template_dir, 'msg.hpp.em'): '%s.hpp',
+            os.path.join(template_dir, 'msg__struct.hpp.em'): '%s__struct.hpp',
+            os.path.join(template_dir, 'msg__traits.hpp.em'): '%s__traits.hpp',
+        }
+
+        self.mapping_srvs = {
+            os.path.join(template_dir, 'srv.hpp.em'): '%s.hpp',
+            os.path.join(template_dir, 'srv__struct.hpp.em'): '%s__struct.hpp',
+            os.path.join(template_dir, 'srv__traits.hpp.em'): '%s__traits.hpp',
+        }
+
+        self.mapping_actions = {
+            os.path.join(template_dir, 'action.hpp.em'): '%s.hpp',
+            os.path.join(template_dir, 'action__struct.hpp.em'): '%s__struct.hpp',
+        }
+
+        for template_file in self.mapping_msgs.keys():
+            assert os.path.exists(template_file), 'Could not find template: ' + template_file
+        for template_file in self.mapping_srvs.keys():
+            assert os.path.exists(template_file), 'Could not find template: ' + template_file
+        for template_file in self.mapping_actions.keys():
+            assert os.path.exists(template_file), 'Could not find template: ' + template_file
+
+        self.functions = {
+            'get_header_filename_from_msg_name': convert_camel_case_to_lower_case_underscore,
+        }
+        self.max_serialized_size_calculator = get_max_serialized_size_calculator(
+            args['package_name'], args['ros_interface_files'],
+            args.get('ros_interface_dependencies', []))
+
+    def __call__(self, ros_interface_file):
         extension = os.path.splitext(ros_interface_file)[1]
         subfolder = os.path.basename(os.path.dirname(ros_interface_file))
         if extension == '.msg':
-            spec = parse_message_file(args['package_name'], ros_interface_file)
-            for template_file, generated_filename in mapping_msgs.items():
-                data = {'spec': spec, 'subfolder': subfolder}
-                data.update(functions)
+            spec = parse_interface_file(self.args['package_name'], ros_interface_file)
+            max_serialized_size = \
+                self.max_serialized_size_calculator.get_max_serialized_size(
+                    NamespacedType(
+                        [spec.base_type.pkg_name, subfolder], spec.base_type.type))
+            for template_file, generated_filename in self.mapping_msgs.items():
+                data = {
+                    'spec': spec,
+                    'subfolder': subfolder,
+                    'max_serialized_size': max_serialized_size,
+                }
+                data.update(self.functions)
                 generated_file = os.path.join(
-                    args['output_dir'], subfolder, generated_filename %
+                    self.args['output_dir'], subfolder, generated_filename %
                     convert_camel_case_to_lower_case_underscore(spec.base_type.type))
+                minimum_timestamp = self.dependencies.add(
+                    generated_file, template_file, ros_interface_file, spec)
                 expand_template(
-                    template_file, data, generated_file,
-                    minimum_timestamp=latest_target_timestamp)
+                    template_file, data, generated_file, minimum_timestamp=minimum_timestamp,
+                    cache_key=self.dependencies.get_output_cache_key(generated_file))
 
         elif extension == '.srv':
-            spec = parse_service_file(args['package_name'], ros_interface_file)
-            for template_file, generated_filename in mapping_srvs.items():
+            spec = parse_interface_file(self.args['package_name'], ros_interface_file)
+            for template_file, generated_filename in self.mapping_srvs.items():
                 data = {'spec': spec, 'subfolder': subfolder}
-                data.update(functions)
+                data.update(self.functions)
                 generated_file = os.path.join(
-                    args['output_dir'], subfolder, generated_filename %
+                    self.args['output_dir'], subfolder, generated_filename %
                     convert_camel_case_to_lower_case_underscore(spec.srv_name))
+                minimum_timestamp = self.dependencies.add(
+                    generated_file, template_file, ros_interface_file, spec)
                 expand_template(
-                    template_file, data, generated_file,
-                    minimum_timestamp=latest_target_timestamp)
+                    template_file, data, generated_file, minimum_timestamp=minimum_timestamp,
+                    cache_key=self.dependencies.get_output_cache_key(generated_file))
 
         elif extension == '.action':
-            spec = parse_action_file(args['package_name'], ros_interface_file)
-            for template_file, generated_filename in mapping_actions.items():
+            spec = parse_interface_file(self.args['package_name'], ros_interface_file)
+            for template_file, generated_filename in self.mapping_actions.items():
                 data = {'spec': spec, 'subfolder': subfolder}
-                data.update(functions)
+                data.update(self.functions)
                 generated_file = os.path.join(
-                    args['output_dir'], subfolder, generated_filename %
+                    self.args['output_dir'], subfolder, generated_filename %
                     convert_camel_case_to_lower_case_underscore(spec.action_name))
+                minimum_timestamp = self.dependencies.add(
+                    generated_file, template_file, ros_interface_file, spec)
                 expand_template(
-                    template_file, data, generated_file,
-                    minimum_timestamp=latest_target_timestamp)
-
-    return 0
+                    template_file, data, generated_file, minimum_timestamp=minimum_timestamp,
+                    cache_key=self.dependencies.get_output_cache_key(generated_file))
 
 
 MSG_TYPE_TO_CPP = {
@@ -14,6 +14,7 @@
 
 from collections import OrderedDict
 import pathlib
+import weakref
 
 
 """Basic types as defined by the IDL specification."""
@@ -49,14 +50,82 @@ ACTION_RESULT_SERVICE_SUFFIX = '_Result'
 ACTION_FEEDBACK_MESSAGE_SUFFIX = '_Feedback'
 ACTION_WRAPPER_TYPE_SUFFIX = '_Action'
 
+# the member added to structures which don't have any members since IDL
+# doesn't allow empty structures
+EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME = 'structure_needs_at_least_one_member'
 
-class AbstractType:
-    """The base class for all types."""
 
-    __slots__ = ()
+class _InternedType(type):
+    """
+    Metaclass of the immutable types returning shared instances.
+
+    Constructing a type which is equal to an existing instance returns that
+    instance instead, e.g. all `BasicType('uint8')` are the same object.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        # the names of all slots of the class hierarchy which identify a type
+        fields = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots, )
+            fields += [s for s in slots if s != '__weakref__']
+        cls._fields = tuple(fields)
+
+    def __call__(cls, *args, **kwargs):
+        return _intern_type(super().__call__(*args, **kwargs))
+
+
+_interned_types = weakref.WeakValueDictionary()
+
+
+def _intern_type(type_):
+    return _interned_types.setdefault(type_._get_key(), type_)
+
+
+def _create_type(cls, values):
+    # recreate an interned type when unpickling
+    type_ = cls.__new__(cls)
+    for field, value in zip(cls._fields, values):
+        object.__setattr__(type_, field, value)
+    return _intern_type(type_)
+
+
+class AbstractType(metaclass=_InternedType):
+    """
+    The base class for all types.
+
+    Types are immutable and hashable, equal types share the same instance.
+    """
+
+    __slots__ = ('__weakref__', )
 
     def __eq__(self, other):
-        return type(self) == type(other)
+        return self is other or (
+            type(self) is type(other) and self._get_key() == other._get_key())
+
+    def __hash__(self):
+        return hash(self._get_key())
+
+    def __setattr__(self, name, value):
+        # each attribute can only be set once by the constructor
+        if hasattr(self, name):
+            raise AttributeError(
+                "'{type_}' object is immutable".format(
+                    type_=type(self).__name__))
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            "'{type_}' object is immutable".format(type_=type(self).__name__))
+
+    def __reduce__(self):
+        return _create_type, (type(self), self._get_key()[1:])
+
+    def _get_key(self):
+        return (type(self), ) + tuple(getattr(self, f) for f in self._fields)
 
 
 class BaseType(AbstractType):
@@ -80,9 +149,6 @@ class BasicType(BaseType):
         assert typename in BASIC_TYPES
         self.type = typename
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.type == other.type
-
 
 class NamedType(BaseType):
     """A type identified by the name."""
@@ -98,14 +164,11 @@ class NamedType(BaseType):
         super().__init__()
         self.name = name
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.name == other.name
-
 
 class NamespacedType(BaseType):
     """A type identified by a name in a namespaced scope."""
 
-    __slots__ = ('namespaces', 'name')
+    __slots__ = ('_namespaces', 'name')
 
     def __init__(self, namespaces, name):
         """
@@ -116,12 +179,20 @@ class NamespacedType(BaseType):
         :param str name: the name of the type within that scope
         """
         super().__init__()
-        self.namespaces = namespaces
+        self._namespaces = tuple(namespaces)
         self.name = name
 
-    def __eq__(self, other):
-        return super().__eq__(other) and \
-            self.namespaces == other.namespaces and self.name == other.name
+    @property
+    def namespaces(self):
+        """
+        Get the names of the nested namespaces.
+
+        The type is immutable, each access returns a new list which can be
+        modified without affecting the type.
+
+        :returns: a list of str
+        """
+        return list(self._namespaces)
 
 
 class BaseString(BaseType):
@@ -138,10 +209,6 @@ class BaseString(BaseType):
         """
         self.maximum_size = maximum_size
 
-    def __eq__(self, other):
-        return super().__eq__(other) and \
-            self.maximum_size == other.maximum_size
-
 
 class String(BaseString):
     """A 8-bit string type."""
@@ -190,9 +257,6 @@ class NestedType(AbstractType):
         assert isinstance(basetype, BaseType), basetype
         self.basetype = basetype
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.basetype == other.basetype
-
 
 class Array(NestedType):
     """An array type with a static size."""
@@ -209,9 +273,6 @@ class Array(NestedType):
         super().__init__(basetype)
         self.size = size
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.size == other.size
-
 
 class Sequence(NestedType):
     """The base class of sequence types."""
@@ -252,9 +313,6 @@ class BoundedSequence(Sequence):
         assert isinstance(upper_bound, int)
         self.upper_bound = upper_bound
 
-    def __eq__(self, other):
-        return super().__eq__(other) and self.upper_bound == other.upper_bound
-
 
 class Annotation:
     """An annotation identified by a name with an arbitrary value."""
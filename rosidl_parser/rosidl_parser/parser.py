@@ -12,14 +12,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import hashlib
+from io import BytesIO
 import os
+import pickle
+import re
 import sys
+import tempfile
 
+import lark
 from lark import Lark
 from lark.lexer import Token
-from lark.reconstruct import Reconstructor
 from lark.tree import Tree
+from lark.visitors import Interpreter
 
+from rosidl_adapter.parallel import process_in_parallel
 from rosidl_parser.definition import AbstractType
 from rosidl_parser.definition import Action
 from rosidl_parser.definition import ACTION_FEEDBACK_MESSAGE_SUFFIX
@@ -47,26 +55,371 @@ from rosidl_parser.definition import UnboundedSequence
 from rosidl_parser.definition import WString
 
 grammar_file = os.path.join(os.path.dirname(__file__), 'grammar.lark')
-with open(grammar_file, mode='r', encoding='utf-8') as h:
-    grammar = h.read()
 
-parser = Lark(grammar, start='specification')
-reconstructor = Reconstructor(parser)
+# the supported Lark parsing algorithms, the first one being the default
+PARSER_TYPES = ('lalr', 'earley')
+
+# the Earley parser is only a fallback in case the LALR parser fails to parse
+# a valid input, it can be selected with the environment variable
+# ROSIDL_PARSER_TYPE
+DEFAULT_PARSER_TYPE = os.environ.get('ROSIDL_PARSER_TYPE', PARSER_TYPES[0])
+
+# the compiled parser is only cached on disk if a directory is set with this
+# environment variable
+CACHE_DIR_ENVIRONMENT_VARIABLE = 'ROSIDL_PARSER_CACHE_DIR'
+
+# the parse results of .idl files are only cached if a directory is passed
+# explicitly or set with this environment variable
+IDL_CACHE_DIR_ENVIRONMENT_VARIABLE = 'ROSIDL_PARSER_IDL_CACHE_DIR'
+IDL_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE = 'ROSIDL_PARSER_IDL_CACHE_MAX_SIZE'
+
+# the default upper bound in bytes for the size of the cached parse results
+DEFAULT_IDL_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+_grammar = None
+_parsers = {}
+_reconstructor = None
+_extraction_digest = None
+
+
+def get_grammar():
+    """Get the content of the grammar file."""
+    global _grammar
+    if _grammar is None:
+        with open(grammar_file, mode='r', encoding='utf-8') as h:
+            _grammar = h.read()
+    return _grammar
+
+
+def get_cache_dir():
+    """
+    Get the directory of the on-disk cache for the compiled parser.
+
+    :returns: the path of the directory, or None if caching is disabled
+    """
+    return os.environ.get(CACHE_DIR_ENVIRONMENT_VARIABLE) or None
+
+
+def get_parser(parser_type=None):
+    """
+    Get the Lark parser for a specific parsing algorithm.
+
+    The parser is only created on first use and then reused within the
+    process.
+
+    :param str parser_type: one of the `PARSER_TYPES`, if None the
+      `DEFAULT_PARSER_TYPE` is being used
+    :returns: the Lark parser
+    """
+    if parser_type is None:
+        parser_type = DEFAULT_PARSER_TYPE
+    assert parser_type in PARSER_TYPES, \
+        "Unknown parser type '{parser_type}'".format_map(locals())
+    if parser_type not in _parsers:
+        _parsers[parser_type] = create_parser(
+            parser_type, cache_dir=get_cache_dir())
+    return _parsers[parser_type]
+
+
+def get_reconstructor():
+    """Get a Lark reconstructor for the default parser."""
+    global _reconstructor
+    if _reconstructor is None:
+        from lark.reconstruct import Reconstructor
+        _reconstructor = Reconstructor(get_parser())
+    return _reconstructor
+
+
+def create_parser(parser_type, cache_dir=None):
+    """
+    Create a Lark parser, reusing the compiled grammar from a cache if possible.
+
+    Only the LALR parser can be stored with `Lark.save()`, the Earley parser
+    is always created from the grammar.
+    Lark versions older than 0.8 don't support saving a parser, in which
+    case the cache isn't used either.
+    The cache file is keyed by the grammar, the Lark version, the Python
+    version and the parser type.
+    A missing or unreadable cache file is (re)created.
+
+    :param str parser_type: one of the `PARSER_TYPES`
+    :param str cache_dir: the directory of the on-disk cache, or None to
+      always compile the grammar
+    :returns: the Lark parser
+    """
+    grammar = get_grammar()
+    cache_file = None
+    if cache_dir is not None and parser_type == 'lalr' and \
+            hasattr(Lark, 'save') and hasattr(Lark, 'load'):
+        cache_file = os.path.join(
+            cache_dir, 'parser-{parser_type}-{digest}.pickle'.format(
+                parser_type=parser_type,
+                digest=_get_parser_digest(grammar, parser_type)))
+        try:
+            with open(cache_file, 'rb') as h:
+                return Lark.load(h)
+        except FileNotFoundError:
+            pass
+        except Exception as e:  # noqa: F841
+            # a corrupted cache file is being replaced below
+            print(
+                "Failed to load the cached parser '{cache_file}': {e}"
+                .format_map(locals()), file=sys.stderr)
+
+    kwargs = {}
+    if parser_type == 'lalr':
+        # the dynamic lexer of the Earley parser doesn't support a post lexer
+        # and doesn't need one since it considers both ways to split ">>"
+        kwargs['postlex'] = _TemplateClosingPostLex()
+    parser = Lark(
+        grammar, start='specification', parser=parser_type, **kwargs)
+
+    if cache_file is not None:
+        output = BytesIO()
+        parser.save(output)
+        _write_cache_file(cache_file, output.getvalue())
+    return parser
+
+
+class _TemplateClosingPostLex:
+    """
+    Split ">>" tokens within angle brackets into two ">" tokens.
+
+    The lexer of the LALR parser always matches the longest terminal, a
+    nested template type like `sequence<string<5>>` would therefore end with
+    a shift operator.
+    Like in C++11 a ">>" within angle brackets closes two of them instead,
+    unless it is enclosed in parentheses.
+    """
+
+    always_accept = ()
+
+    def process(self, stream):
+        # the currently open angle brackets and parentheses
+        brackets = []
+        for token in stream:
+            if token.type == '_RIGHT_SHIFT' and brackets[-1:] == ['<']:
+                yield Token(
+                    '_RIGHT_ANGLE', '>', token.end_pos - 2, token.end_line,
+                    token.end_column - 2, token.end_line,
+                    token.end_column - 1, token.end_pos - 1)
+                yield Token(
+                    '_RIGHT_ANGLE', '>', token.end_pos - 1, token.end_line,
+                    token.end_column - 1, token.end_line, token.end_column,
+                    token.end_pos)
+                del brackets[-2:]
+                continue
+            if token.value in ('<', '('):
+                brackets.append(token.value)
+            elif token.value in ('>', ')') and brackets:
+                brackets.pop()
+            yield token
+
+
+def _get_parser_digest(grammar, parser_type):
+    h = hashlib.sha256()
+    for part in (
+        grammar, lark.__version__, '%d.%d' % sys.version_info[:2], parser_type
+    ):
+        h.update(part.encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _write_cache_file(cache_file, data):
+    # write to a temporary file first and rename it afterwards to never
+    # expose a partially written file to concurrent processes
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(
+            dir=os.path.dirname(cache_file), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as h:
+                h.write(data)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+    except OSError:
+        # the cache is optional, e.g. the directory might not be writable
+        pass
+
+
+def get_idl_cache_dir():
+    """
+    Get the directory of the on-disk cache for parse results.
+
+    :returns: the path of the directory, or None if caching is disabled
+    """
+    return os.environ.get(IDL_CACHE_DIR_ENVIRONMENT_VARIABLE) or None
+
+
+def get_idl_cache_max_size():
+    """Get the upper bound in bytes for the size of the cached parse results."""
+    max_size = os.environ.get(IDL_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE)
+    if not max_size:
+        return DEFAULT_IDL_CACHE_MAX_SIZE
+    return int(max_size)
+
 
+def parse_idl_file(locator, png_file=None, parser_type=None, cache_dir=None):
+    """
+    Parse an .idl file.
 
-def parse_idl_file(locator, png_file=None):
+    If a cache directory is being used the extracted content is stored in a
+    file keyed by the content of the .idl file, the grammar, the code
+    extracting the content, the Lark and Python version and the parser type.
+    The least recently used cache files are removed when the total size
+    exceeds `get_idl_cache_max_size()`.
+
+    :param locator: the `IdlLocator` of the file
+    :param str png_file: the path of an image to render the parse tree to,
+      the cache is not being used when it is set
+    :param str parser_type: one of the `PARSER_TYPES`, if None the
+      `DEFAULT_PARSER_TYPE` is being used
+    :param str cache_dir: the directory of the on-disk cache, if None the
+      result of `get_idl_cache_dir()` is being used
+    :returns: the `IdlFile`
+    """
     string = locator.get_absolute_path().read_text()
+
+    if cache_dir is None:
+        cache_dir = get_idl_cache_dir()
+    cache_file = None
+    if cache_dir and not png_file:
+        cache_file = os.path.join(
+            cache_dir, 'idl-{digest}.pickle'.format(
+                digest=_get_idl_digest(string, parser_type)))
+        content = _load_cached_content(cache_file)
+        if content is not None:
+            return IdlFile(locator, content)
+
     try:
-        content = parse_idl_string(string, png_file=png_file)
+        content = parse_idl_string(
+            string, png_file=png_file, parser_type=parser_type)
     except Exception as e:
         print(str(e), str(locator.get_absolute_path()), file=sys.stderr)
         raise
+
+    if cache_file is not None:
+        _write_cache_file(
+            cache_file, pickle.dumps(content, pickle.HIGHEST_PROTOCOL))
+        _evict_cache_files(cache_dir, 'idl-', get_idl_cache_max_size())
     return IdlFile(locator, content)
 
 
-def parse_idl_string(idl_string, png_file=None):
-    global parser
-    tree = parser.parse(idl_string)
+def parse_idl_files(locators, jobs=None, parser_type=None, cache_dir=None):
+    """
+    Parse multiple .idl files, in parallel if it is worth it.
+
+    The files are distributed across a pool of processes, see
+    `rosidl_adapter.parallel.process_in_parallel`.
+
+    Errors are being reported for each file like in `parse_idl_file`.
+    If any file fails to parse the exception of the first failing file is
+    being raised after all files have been processed.
+
+    :param locators: an iterable of `IdlLocator` instances
+    :param int jobs: the maximum number of processes, if None the number of
+      CPUs is being used
+    :param str parser_type: one of the `PARSER_TYPES`, if None the
+      `DEFAULT_PARSER_TYPE` is being used
+    :param str cache_dir: the directory of the on-disk cache, see
+      `parse_idl_file`
+    :returns: a list of `IdlFile` instances in the order of the locators
+    """
+    results = process_in_parallel(
+        functools.partial(
+            parse_idl_file, parser_type=parser_type, cache_dir=cache_dir),
+        locators, jobs=jobs)
+    # the error and the path have already been printed by parse_idl_file
+    for _, error in results:
+        if error is not None:
+            raise error
+    return [result for result, _ in results]
+
+
+def _get_idl_digest(idl_string, parser_type):
+    if parser_type is None:
+        parser_type = DEFAULT_PARSER_TYPE
+    h = hashlib.sha256()
+    for part in (
+        _get_parser_digest(get_grammar(), parser_type),
+        _get_extraction_digest(), idl_string
+    ):
+        h.update(part.encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _get_extraction_digest():
+    # changes to the extraction code or the definition classes invalidate
+    # the cached parse results
+    global _extraction_digest
+    if _extraction_digest is None:
+        from rosidl_parser import definition
+        h = hashlib.sha256()
+        for module_file in (__file__, definition.__file__):
+            with open(module_file, 'rb') as h_module:
+                h.update(h_module.read())
+        _extraction_digest = h.hexdigest()
+    return _extraction_digest
+
+
+def _load_cached_content(cache_file):
+    try:
+        with open(cache_file, 'rb') as h:
+            content = pickle.load(h)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # noqa: F841
+        # a corrupted cache file is being replaced by the caller
+        print(
+            "Failed to load the cached parse result '{cache_file}': {e}"
+            .format_map(locals()), file=sys.stderr)
+        return None
+    if not isinstance(content, IdlContent):
+        return None
+    # mark the cache file as recently used for the eviction
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+    return content
+
+
+def _evict_cache_files(cache_dir, prefix, max_size):
+    # remove the least recently used cache files until the total size is
+    # within the limit, other processes might remove the same files
+    # concurrently
+    entries = []
+    total_size = 0
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if not entry.name.startswith(prefix) or \
+                        not entry.name.endswith('.pickle'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+                total_size += stat.st_size
+    except OSError:
+        return
+    for _, path, size in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_size -= size
+
+
+def parse_idl_string(idl_string, png_file=None, parser_type=None):
+    tree = get_parser(parser_type).parse(idl_string)
 
     if png_file:
         try:
@@ -81,51 +434,21 @@ def parse_idl_string(idl_string, png_file=None):
 
 
 def extract_content_from_ast(tree):
-    content = IdlContent()
+    extractor = _ContentExtractor()
+    extractor.visit(tree)
 
-    include_directives = tree.find_data('include_directive')
-    for include_directive in include_directives:
-        assert len(include_directive.children) == 1
-        child = include_directive.children[0]
-        assert child.data in ('h_char_sequence', 'q_char_sequence')
-        include_token = next(child.scan_values(_find_tokens(None)))
-        content.elements.append(Include(include_token.value))
-
-    const_dcls = tree.find_data('const_dcl')
-    for const_dcl in const_dcls:
-        const_type = next(const_dcl.find_data('const_type'))
-        const_expr = next(const_dcl.find_data('const_expr'))
-        content.elements.append(Constant(
-            get_first_identifier_value(const_dcl),
-            get_abstract_type_from_const_expr(const_type),
-            get_const_expr_value(const_expr)))
-
-    typedefs = {}
-    typedef_dcls = tree.find_data('typedef_dcl')
-    for typedef_dcl in typedef_dcls:
-        assert len(typedef_dcl.children) == 1
-        child = typedef_dcl.children[0]
-        assert 'type_declarator' == child.data
-        assert len(child.children) == 2
-        abstract_type = get_abstract_type(child.children[0])
-        child = child.children[1]
-        assert 'any_declarators' == child.data
-        assert len(child.children) == 1, 'Only support single typedefs atm'
-        child = child.children[0]
-        identifier = get_first_identifier_value(child)
-        abstract_type = get_abstract_type_optionally_as_array(
-            abstract_type, child)
-        if identifier in typedefs:
-            assert typedefs[identifier] == abstract_type
-        else:
-            typedefs[identifier] = abstract_type
+    content = IdlContent()
+    content.elements += extractor.includes
+    content.elements += extractor.constants
+    typedefs = extractor.typedefs
 
-    struct_defs = list(tree.find_data('struct_def'))
+    # pairs of the module names and the struct_def node
+    struct_defs = extractor.struct_defs
     if len(struct_defs) == 1:
         msg = Message(Structure(NamespacedType(
-            namespaces=get_module_identifier_values(tree, struct_defs[0]),
-            name=get_first_identifier_value(struct_defs[0]))))
-        add_message_members(msg, struct_defs[0])
+            namespaces=struct_defs[0][0],
+            name=get_identifier_value(struct_defs[0][1]))))
+        add_message_members(msg, struct_defs[0][1])
         resolve_typedefed_names(msg.structure, typedefs)
         # TODO move "global" constants/enums within a "matching" namespace into the message
         msg.constants.update({c.name: c for c in content.elements if isinstance(c, Constant)})
@@ -134,20 +457,20 @@ def extract_content_from_ast(tree):
 
     elif len(struct_defs) == 2:
         request = Message(Structure(NamespacedType(
-            namespaces=get_module_identifier_values(tree, struct_defs[0]),
-            name=get_first_identifier_value(struct_defs[0]))))
+            namespaces=struct_defs[0][0],
+            name=get_identifier_value(struct_defs[0][1]))))
         assert request.structure.type.name.endswith(
             SERVICE_REQUEST_MESSAGE_SUFFIX)
-        add_message_members(request, struct_defs[0])
+        add_message_members(request, struct_defs[0][1])
         resolve_typedefed_names(request.structure, typedefs)
         # TODO move "global" constants/enums within a "matching" namespace into the request message
 
         response = Message(Structure(NamespacedType(
-            namespaces=get_module_identifier_values(tree, struct_defs[1]),
-            name=get_first_identifier_value(struct_defs[1]))))
+            namespaces=struct_defs[1][0],
+            name=get_identifier_value(struct_defs[1][1]))))
         assert response.structure.type.name.endswith(
             SERVICE_RESPONSE_MESSAGE_SUFFIX)
-        add_message_members(response, struct_defs[1])
+        add_message_members(response, struct_defs[1][1])
         resolve_typedefed_names(response.structure, typedefs)
         # TODO move "global" constants/enums within a "matching" namespace into the response msg
 
@@ -168,21 +491,21 @@ def extract_content_from_ast(tree):
 
     elif len(struct_defs) == 3:
         goal_request = Message(Structure(NamespacedType(
-            namespaces=get_module_identifier_values(tree, struct_defs[0]),
-            name=get_first_identifier_value(struct_defs[0]))))
+            namespaces=struct_defs[0][0],
+            name=get_identifier_value(struct_defs[0][1]))))
         assert goal_request.structure.type.name.endswith(
             ACTION_GOAL_SERVICE_SUFFIX + SERVICE_REQUEST_MESSAGE_SUFFIX)
-        add_message_members(goal_request, struct_defs[0])
+        add_message_members(goal_request, struct_defs[0][1])
         resolve_typedefed_names(goal_request.structure, typedefs)
         # TODO move "global" constants/enums within a "matching" namespace into
         # the goal request message
 
         result_response = Message(Structure(NamespacedType(
-            namespaces=get_module_identifier_values(tree, struct_defs[1]),
-            name=get_first_identifier_value(struct_defs[1]))))
+            namespaces=struct_defs[1][0],
+            name=get_identifier_value(struct_defs[1][1]))))
         assert result_response.structure.type.name.endswith(
             ACTION_RESULT_SERVICE_SUFFIX + SERVICE_RESPONSE_MESSAGE_SUFFIX)
-        add_message_members(result_response, struct_defs[1])
+        add_message_members(result_response, struct_defs[1][1])
         resolve_typedefed_names(result_response.structure, typedefs)
         # TODO move "global" constants/enums within a "matching" namespace into
         # the result response message
@@ -198,11 +521,11 @@ def extract_content_from_ast(tree):
         assert goal_request_basename == result_response_basename
 
         feedback_message = Message(Structure(NamespacedType(
-            namespaces=get_module_identifier_values(tree, struct_defs[2]),
-            name=get_first_identifier_value(struct_defs[2]))))
+            namespaces=struct_defs[2][0],
+            name=get_identifier_value(struct_defs[2][1]))))
         assert feedback_message.structure.type.name.endswith(
             ACTION_FEEDBACK_MESSAGE_SUFFIX)
-        add_message_members(feedback_message, struct_defs[2])
+        add_message_members(feedback_message, struct_defs[2][1])
         resolve_typedefed_names(feedback_message.structure, typedefs)
         # TODO move "global" constants/enums within a "matching" namespace into
         # the feedback message
@@ -237,19 +560,132 @@ def resolve_typedefed_names(structure, typedefs):
                 if isinstance(typedefed_type.basetype, NamedType):
                     assert typedefed_type.basetype.name in typedefs, \
                         'Unknown named type: ' + typedefed_type.basetype.name
-                    typedefed_type.basetype = \
-                        typedefs[typedefed_type.basetype.name]
+                    typedefed_type = get_nested_type_with_basetype(
+                        typedefed_type,
+                        typedefs[typedefed_type.basetype.name])
 
             if isinstance(member.type, NestedType):
-                member.type.basetype = typedefed_type
+                member.type = get_nested_type_with_basetype(
+                    member.type, typedefed_type)
             else:
                 member.type = typedefed_type
 
 
-def get_first_identifier_value(tree):
-    """Get the value of the first identifier token for a node."""
-    identifier_token = next(tree.scan_values(_find_tokens('IDENTIFIER')))
-    return identifier_token.value
+def get_nested_type_with_basetype(nested_type, basetype):
+    """Get a nested type like the passed one but with a different base type."""
+    if isinstance(nested_type, Array):
+        return Array(basetype, nested_type.size)
+    if isinstance(nested_type, BoundedSequence):
+        return BoundedSequence(basetype, nested_type.upper_bound)
+    if isinstance(nested_type, UnboundedSequence):
+        return UnboundedSequence(basetype)
+    assert False, 'Unsupported nested type: ' + str(nested_type)
+
+
+class _ContentExtractor(Interpreter):
+    """
+    Collect the top-level definitions of a specification in a single pass.
+
+    The visitor descends top-down into nested modules while keeping track of
+    the module names and only visits the nodes which carry definitions.
+    Members of structures are extracted from the collected struct_def nodes
+    afterwards, without searching the tree again.
+    """
+
+    def __init__(self):
+        self.includes = []
+        self.constants = []
+        self.typedefs = {}
+        self.struct_defs = []
+        self._module_names = []
+
+    def module_dcl(self, tree):
+        self._module_names.append(get_identifier_value(tree))
+        for child in tree.children:
+            if isinstance(child, Tree) and child.data == 'definition':
+                self.visit(child)
+        self._module_names.pop()
+
+    def include_directive(self, tree):
+        assert len(tree.children) == 1
+        child = tree.children[0]
+        assert child.data in ('h_char_sequence', 'q_char_sequence')
+        include_token = next(child.scan_values(_find_tokens(None)))
+        self.includes.append(Include(include_token.value))
+
+    def const_dcl(self, tree):
+        const_type = get_child(tree, 'const_type')
+        const_expr = get_child(tree, 'const_expr')
+        self.constants.append(Constant(
+            get_identifier_value(tree),
+            get_abstract_type_from_const_expr(const_type),
+            get_const_expr_value(const_expr)))
+
+    def typedef_dcl(self, tree):
+        assert len(tree.children) == 1
+        child = tree.children[0]
+        assert 'type_declarator' == child.data
+        assert len(child.children) == 2
+        abstract_type = get_abstract_type(child.children[0])
+        child = child.children[1]
+        assert 'any_declarators' == child.data
+        assert len(child.children) == 1, 'Only support single typedefs atm'
+        child = child.children[0]
+        identifier = get_declarator_identifier_value(child)
+        abstract_type = get_abstract_type_optionally_as_array(
+            abstract_type, child)
+        if identifier in self.typedefs:
+            assert self.typedefs[identifier] == abstract_type
+        else:
+            self.typedefs[identifier] = abstract_type
+
+    def struct_def(self, tree):
+        self.struct_defs.append((list(self._module_names), tree))
+
+
+def get_child(tree, data):
+    """Get the first direct child node with a specific rule name."""
+    for child in tree.children:
+        if isinstance(child, Tree) and child.data == data:
+            return child
+    assert False, 'Unsupported tree: ' + str(tree)
+
+
+def get_identifier_value(tree):
+    """Get the value of the identifier token being a direct child of a node."""
+    for child in tree.children:
+        if isinstance(child, Token) and child.type == 'IDENTIFIER':
+            return child.value
+    assert False, 'Unsupported tree: ' + str(tree)
+
+
+def get_declarator_identifier_value(declarator):
+    """Get the identifier of a (any_)declarator node."""
+    assert len(declarator.children) == 1
+    return get_identifier_value(declarator.children[0])
+
+
+def get_scoped_name_identifier_values(scoped_name):
+    """
+    Get the identifiers of a scoped name.
+
+    :returns: a tuple of the list of identifiers and a flag if the scoped name
+      contains a separator
+    """
+    identifiers = []
+    has_separator = False
+    while True:
+        children = scoped_name.children
+        assert isinstance(children[-1], Token)
+        identifiers.insert(0, children[-1].value)
+        if len(children) == 1:
+            break
+        if children[-2].data == 'scoped_name_separator':
+            has_separator = True
+        if children[0].data != 'scoped_name':
+            break
+        scoped_name = children[0]
+    return identifiers, has_separator
 
 
 def _find_tokens(token_type):
@@ -260,26 +696,6 @@ def _find_tokens(token_type):
     return find
 
 
-def get_module_identifier_values(tree, target):
-    """Get all module names between a tree node and a specific target node."""
-    path = _find_path(tree, target)
-    modules = [n for n in path if n.data == 'module_dcl']
-    return [
-        get_first_identifier_value(n) for n in modules]
-
-
-def _find_path(node, target):
-    if node == target:
-        return [node]
-    for c in node.children:
-        if not isinstance(c, Tree):
-            continue
-        tail = _find_path(c, target)
-        if tail is not None:
-            return [node] + tail
-    return None
-
-
 def get_abstract_type_from_const_expr(const_expr):
     assert len(const_expr.children) == 1
     child = const_expr.children[0]
@@ -304,38 +720,30 @@ def get_abstract_type_optionally_as_array(abstract_type, declarator):
     assert len(declarator.children) == 1
     child = declarator.children[0]
     if child.data == 'array_declarator':
-        fixed_array_sizes = list(child.find_data('fixed_array_size'))
+        fixed_array_sizes = [
+            c for c in child.children
+            if isinstance(c, Tree) and c.data == 'fixed_array_size']
         assert len(fixed_array_sizes) == 1, \
             'Unsupported multidimensional array: ' + str(declarator)
-        positive_int_const = next(
-            fixed_array_sizes[0].find_data('positive_int_const'))
+        positive_int_const = get_child(
+            fixed_array_sizes[0], 'positive_int_const')
         size = get_positive_int_const(positive_int_const)
         abstract_type = Array(abstract_type, size)
     return abstract_type
 
 
 def add_message_members(msg, tree):
-    members = tree.find_data('member')
-    for member in members:
-        # the find_data methods seems to traverse the tree in post order
-        # the highest type_spec in the subtree is therefore the last item
-        type_specs = list(member.find_data('type_spec'))
-        type_spec = type_specs[-1]
-        abstract_type = get_abstract_type_from_type_spec(type_spec)
-        declarators = member.find_data('declarator')
+    for member in tree.children:
+        if not isinstance(member, Tree) or member.data != 'member':
+            continue
+        abstract_type = get_abstract_type_from_type_spec(
+            get_child(member, 'type_spec'))
         annotations = get_annotations(member)
-        for declarator in declarators:
-            assert len(declarator.children) == 1
-            child = declarator.children[0]
-            if child.data == 'array_declarator':
-                fixed_array_sizes = list(child.find_data('fixed_array_size'))
-                assert len(fixed_array_sizes) == 1, \
-                    'Unsupported multidimensional array: ' + str(member)
-                positive_int_const = next(
-                    fixed_array_sizes[0].find_data('positive_int_const'))
-                size = get_positive_int_const(positive_int_const)
-                abstract_type = Array(abstract_type, size)
-            m = Member(abstract_type, get_first_identifier_value(declarator))
+        for declarator in get_child(member, 'declarators').children:
+            m = Member(
+                get_abstract_type_optionally_as_array(
+                    abstract_type, declarator),
+                get_declarator_identifier_value(declarator))
             m.annotations += annotations
             msg.structure.members.append(m)
 
@@ -376,11 +784,10 @@ def get_abstract_type(tree):
             return BasicType(BASE_TYPE_SPEC_TO_IDL_TYPE[child.data])
 
         if 'scoped_name' == child.data:
-            scoped_name_separators = list(
-                child.find_data('scoped_name_separator'))
-            if not scoped_name_separators:
-                return NamedType(get_first_identifier_value(child))
-            identifiers = list(child.scan_values(_find_tokens('IDENTIFIER')))
+            identifiers, has_separator = \
+                get_scoped_name_identifier_values(child)
+            if not has_separator:
+                return NamedType(identifiers[0])
             assert len(identifiers) > 1
             return NamespacedType(identifiers[:-1], identifiers[-1])
 
@@ -391,14 +798,13 @@ def get_abstract_type(tree):
         child = tree.children[0]
 
         if 'sequence_type' == child.data:
-            # the find_data methods seems to traverse the tree in post order
-            # the highest type_spec in the subtree is therefore the last item
-            type_specs = list(child.find_data('type_spec'))
-            type_spec = type_specs[-1]
-            basetype = get_abstract_type_from_type_spec(type_spec)
-            positive_int_consts = list(child.find_data('positive_int_const'))
+            basetype = get_abstract_type_from_type_spec(
+                get_child(child, 'type_spec'))
+            positive_int_consts = [
+                c for c in child.children
+                if isinstance(c, Tree) and c.data == 'positive_int_const']
             if positive_int_consts:
-                upper_bound = get_positive_int_const(positive_int_consts[-1])
+                upper_bound = get_positive_int_const(positive_int_consts[0])
                 return BoundedSequence(basetype, upper_bound)
             else:
                 return UnboundedSequence(basetype)
@@ -448,22 +854,25 @@ def get_positive_int_const(positive_int_const):
 
 def get_annotations(tree):
     annotations = []
-    annotation_appls = tree.find_data('annotation_appl')
-    for annotation_appl in annotation_appls:
-        params = list(annotation_appl.find_data('annotation_appl_param'))
-        if params:
-            value = {}
-            for param in params:
-                const_expr = next(param.find_data('const_expr'))
-                value[get_first_identifier_value(param)] = \
-                    get_const_expr_value(const_expr)
-        elif len(annotation_appl.children) == 1:
+    for annotation_appl in tree.children:
+        if not isinstance(annotation_appl, Tree) or \
+                annotation_appl.data != 'annotation_appl':
+            continue
+        identifiers, _ = get_scoped_name_identifier_values(
+            get_child(annotation_appl, 'scoped_name'))
+        if len(annotation_appl.children) == 1:
             value = None
         else:
-            const_expr = next(annotation_appl.find_data('const_expr'))
-            value = get_const_expr_value(const_expr)
-        annotations.append(
-            Annotation(get_first_identifier_value(annotation_appl), value))
+            params = get_child(annotation_appl, 'annotation_appl_params')
+            if params.children[0].data == 'annotation_appl_param':
+                value = {}
+                for param in params.children:
+                    value[get_identifier_value(param)] = \
+                        get_const_expr_value(get_child(param, 'const_expr'))
+            else:
+                value = get_const_expr_value(
+                    get_child(params, 'const_expr'))
+        annotations.append(Annotation(identifiers[0], value))
 
     return annotations
 
@@ -520,22 +929,22 @@ def get_decimal_literal_value(decimal_literal):
 def get_floating_pt_literal_value(floating_pt_literal):
     value = ''
     for child in floating_pt_literal.children:
-        if isinstance(child, Token):
-            value += child.value
-        elif child.data == 'floating_pt_literal_dot':
-            value += '.'
-        elif child.data == 'floating_pt_literal_e':
-            value += 'e'
-        else:
-            assert False, 'Unsupported tree: ' + str(floating_pt_literal)
+        assert isinstance(child, Token), \
+            'Unsupported tree: ' + str(floating_pt_literal)
+        value += child.value
     return float(value)
 
 
+# an escape sequence consists of a backslash and at least one character
+ESCAPE_SEQUENCE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+
 def get_string_literal_value(string_literal):
-    value = ''
-    for child in string_literal.children:
-        if child.value == r'\"':
-            value += '"'
-        else:
-            value += child.value
-    return value
+    assert len(string_literal.children) == 1
+    token = string_literal.children[0]
+    assert token.value[0] == '"' and token.value[-1] == '"', \
+        'Unsupported tree: ' + str(string_literal)
+    # only escaped double quotes are being unescaped
+    return ESCAPE_SEQUENCE_PATTERN.sub(
+        lambda match: '"' if match.group(1) == '"' else match.group(0),
+        token.value[1:-1])
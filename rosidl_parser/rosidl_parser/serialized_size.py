@@ -0,0 +1,201 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from rosidl_parser.definition import Array
+from rosidl_parser.definition import BasicType
+from rosidl_parser.definition import BoundedSequence
+from rosidl_parser.definition import EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME
+from rosidl_parser.definition import Member
+from rosidl_parser.definition import NamespacedType
+from rosidl_parser.definition import String
+from rosidl_parser.definition import UnboundedSequence
+from rosidl_parser.definition import WString
+
+# the size in bytes of each basic type serialized with CDR
+BASIC_TYPE_CDR_SIZES = {
+    'short': 2,
+    'unsigned short': 2,
+    'long': 4,
+    'unsigned long': 4,
+    'long long': 8,
+    'unsigned long long': 8,
+    'float': 4,
+    'double': 8,
+    'long double': 16,
+    'char': 1,
+    'wchar': 2,
+    'boolean': 1,
+    'octet': 1,
+    'int8': 1,
+    'uint8': 1,
+    'int16': 2,
+    'uint16': 2,
+    'int32': 4,
+    'uint32': 4,
+    'int64': 8,
+    'uint64': 8,
+}
+
+# primitive values are aligned to their size but at most to 8 bytes
+CDR_MAX_ALIGNMENT = 8
+
+# the length of strings and sequences is serialized as an uint32
+CDR_LENGTH_SIZE = 4
+
+
+_EMPTY_STRUCTURE_MEMBER = Member(
+    BasicType('boolean'), EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME)
+
+
+class MaxSerializedSizeCalculator:
+    """
+    Calculate the maximum CDR serialized size of types.
+
+    The serialized size of a type with only fixed size and bounded members
+    has an upper bound.
+    Since the padding depends on the position in the serialized stream the
+    size is calculated (and cached) for each offset modulo the maximum
+    alignment.
+    Namespaced types are resolved through the added structures.
+    """
+
+    def __init__(self, structures=None, get_structure=None):
+        """
+        Constructor.
+
+        :param structures: an iterable of `Structure` instances
+        :param get_structure: an optional callable which is invoked with a
+          `NamespacedType` which hasn't been added and returns the
+          `Structure` or None
+        """
+        self._structures = {}
+        self._get_structure = get_structure
+        self._sizes = {}
+        for structure in structures or []:
+            self.add_structure(structure)
+
+    def add_structure(self, structure):
+        """
+        Add a structure to resolve namespaced types with.
+
+        :param Structure structure: the structure
+        """
+        self._structures[structure.type] = structure
+
+    def get_structure(self, type_):
+        """
+        Get the structure of a namespaced type.
+
+        :param NamespacedType type_: the type
+        :returns: the `Structure`
+        :raises: ValueError if the structure is unknown
+        """
+        structure = self._structures.get(type_)
+        if structure is None and self._get_structure is not None:
+            structure = self._get_structure(type_)
+            if structure is not None:
+                self.add_structure(structure)
+        if structure is None:
+            raise ValueError(
+                "Unknown structure '{type_name}'".format(
+                    type_name='/'.join(type_.namespaces + [type_.name])))
+        return structure
+
+    def get_max_serialized_size(self, type_, offset=0):
+        """
+        Get the maximum size of a serialized value of a type.
+
+        :param AbstractType type_: the type
+        :param int offset: the position in the serialized stream (after the
+          encapsulation header) at which the value starts
+        :returns: the size in bytes including all padding, or None if the
+          type has no upper bound
+        """
+        key = (type_, offset % CDR_MAX_ALIGNMENT)
+        try:
+            return self._sizes[key]
+        except KeyError:
+            pass
+        size = self._calculate_max_serialized_size(
+            type_, offset % CDR_MAX_ALIGNMENT)
+        self._sizes[key] = size
+        return size
+
+    def _calculate_max_serialized_size(self, type_, offset):
+        if isinstance(type_, BasicType):
+            size = BASIC_TYPE_CDR_SIZES[type_.type]
+            return _get_padding(offset, size) + size
+
+        if isinstance(type_, (String, WString)):
+            if type_.maximum_size is None:
+                return None
+            end = _align(offset, CDR_LENGTH_SIZE) + CDR_LENGTH_SIZE
+            if isinstance(type_, String):
+                # including the terminating null character
+                end += type_.maximum_size + 1
+            else:
+                end += type_.maximum_size * BASIC_TYPE_CDR_SIZES['wchar']
+            return end - offset
+
+        if isinstance(type_, Array):
+            return self._get_elements_size(type_.basetype, type_.size, offset)
+
+        if isinstance(type_, BoundedSequence):
+            start = _align(offset, CDR_LENGTH_SIZE) + CDR_LENGTH_SIZE
+            size = self._get_elements_size(
+                type_.basetype, type_.upper_bound, start)
+            if size is None:
+                return None
+            return start + size - offset
+
+        if isinstance(type_, UnboundedSequence):
+            return None
+
+        if isinstance(type_, NamespacedType):
+            members = self.get_structure(type_).members
+            if not members:
+                # like in the .idl files a structure without members
+                # contains a placeholder member
+                members = [_EMPTY_STRUCTURE_MEMBER]
+            end = offset
+            for member in members:
+                size = self.get_max_serialized_size(member.type, end)
+                if size is None:
+                    return None
+                end += size
+            return end - offset
+
+        assert False, "Unsupported type '{type_}'".format_map(locals())
+
+    def _get_elements_size(self, basetype, count, offset):
+        if isinstance(basetype, BasicType):
+            # after aligning the first element all elements are contiguous
+            size = BASIC_TYPE_CDR_SIZES[basetype.type]
+            return _get_padding(offset, size) + count * size
+
+        end = offset
+        for _ in range(count):
+            size = self.get_max_serialized_size(basetype, end)
+            if size is None:
+                return None
+            end += size
+        return end - offset
+
+
+def _get_padding(offset, size):
+    return _align(offset, min(size, CDR_MAX_ALIGNMENT)) - offset
+
+
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
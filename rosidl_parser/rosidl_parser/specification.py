@@ -0,0 +1,246 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from rosidl_adapter.msg import MSG_TYPE_TO_IDL
+from rosidl_adapter.parser import ActionSpecification
+from rosidl_adapter.parser import MessageSpecification
+from rosidl_adapter.parser import ServiceSpecification
+from rosidl_parser.definition import Action
+from rosidl_parser.definition import Annotation
+from rosidl_parser.definition import Array
+from rosidl_parser.definition import BasicType
+from rosidl_parser.definition import BoundedSequence
+from rosidl_parser.definition import Constant
+from rosidl_parser.definition import EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME
+from rosidl_parser.definition import IdlContent
+from rosidl_parser.definition import Include
+from rosidl_parser.definition import Member
+from rosidl_parser.definition import Message
+from rosidl_parser.definition import NamespacedType
+from rosidl_parser.definition import Service
+from rosidl_parser.definition import String
+from rosidl_parser.definition import Structure
+from rosidl_parser.definition import UnboundedSequence
+
+
+def get_definition_type(type_):
+    """
+    Get the definition type of a field type.
+
+    :param rosidl_adapter.parser.Type type_: the field type
+    :returns: the `AbstractType`
+    """
+    if not type_.is_primitive_type():
+        basetype = NamespacedType([type_.pkg_name, 'msg'], type_.type)
+    elif type_.type == 'string':
+        basetype = String(maximum_size=type_.string_upper_bound)
+    else:
+        basetype = BasicType(MSG_TYPE_TO_IDL[type_.type])
+
+    if not type_.is_array:
+        return basetype
+    if type_.is_fixed_size_array():
+        return Array(basetype, type_.array_size)
+    if type_.is_upper_bound:
+        return BoundedSequence(basetype, type_.array_size)
+    return UnboundedSequence(basetype)
+
+
+def get_definition_structure(msg, subfolder='msg'):
+    """
+    Get the definition structure of a message specification.
+
+    :param rosidl_adapter.parser.MessageSpecification msg: the message
+    :param str subfolder: the namespace of the message within the package,
+      e.g. 'srv' for service request and response messages
+    :returns: the `Structure`
+    """
+    return Structure(
+        NamespacedType([msg.base_type.pkg_name, subfolder], msg.msg_name),
+        members=[
+            Member(get_definition_type(field.type), field.name)
+            for field in msg.fields])
+
+
+# the number of implicit fields at the beginning of the messages of an action
+# which aren't part of the .idl file (goal request, goal response, result
+# request, result response, feedback)
+_ACTION_IMPLICIT_FIELD_COUNTS = (1, 2, 1, 1, 1)
+
+
+def get_definition_value(type_, value):
+    """
+    Get the value of a constant or default value as parsed from a .idl file.
+
+    The value is the same as the one of the .idl file generated by
+    `rosidl_adapter`, e.g. array values are represented as a string.
+
+    :param type_: the `rosidl_adapter.parser.Type` or the name of a
+      primitive type
+    :param value: the value of the constant or the default value
+    :returns: the value
+    """
+    if not isinstance(type_, str) and type_.is_array:
+        elements = [repr(v) for v in value]
+        while len(elements) < 2:
+            elements.append('')
+        return '(%s)' % ', '.join(elements)
+    typename = type_ if isinstance(type_, str) else type_.type
+    if typename == 'bool':
+        return bool(value)
+    if typename == 'string':
+        # escape sequences are being interpreted when writing the .idl file
+        return value.encode().decode('unicode_escape')
+    return value
+
+
+def get_definition_message(msg, subfolder='msg'):
+    """
+    Get the definition message of a message specification.
+
+    The message is the same as the one parsed from the .idl file generated
+    by `rosidl_adapter` without writing and parsing the file.
+
+    :param rosidl_adapter.parser.MessageSpecification msg: the message
+    :param str subfolder: the namespace of the message within the package
+    :returns: the `Message`
+    """
+    message = _get_definition_message(msg, subfolder)
+    for constant in get_definition_constants(msg):
+        message.constants[constant.name] = constant
+    return message
+
+
+def _get_definition_message(msg, subfolder, implicit_field_count=0):
+    # the messages of services and actions don't contain the constants
+    structure = Structure(
+        NamespacedType([msg.base_type.pkg_name, subfolder], msg.msg_name))
+    for field in msg.fields[implicit_field_count:]:
+        member = Member(get_definition_type(field.type), field.name)
+        if field.default_value is not None:
+            member.annotations.append(Annotation('default', {
+                'value': get_definition_value(
+                    field.type, field.default_value)}))
+        if 'unit' in field.annotations:
+            member.annotations.append(Annotation('unit', {
+                'value': get_definition_value(
+                    'string', field.annotations['unit'])}))
+        structure.members.append(member)
+    if not structure.members:
+        structure.members.append(Member(
+            BasicType('boolean'), EMPTY_STRUCTURE_REQUIRED_MEMBER_NAME))
+    return Message(structure)
+
+
+def get_definition_constants(msg):
+    """
+    Get the definition constants of a message specification.
+
+    :param rosidl_adapter.parser.MessageSpecification msg: the message
+    :returns: a list of `Constant` instances
+    """
+    return [
+        Constant(
+            constant.name,
+            String() if constant.type == 'string'
+            else BasicType(MSG_TYPE_TO_IDL[constant.type]),
+            get_definition_value(constant.type, constant.value))
+        for constant in msg.constants]
+
+
+def get_definition_service(srv, subfolder='srv'):
+    """
+    Get the definition service of a service specification.
+
+    :param rosidl_adapter.parser.ServiceSpecification srv: the service
+    :param str subfolder: the namespace of the service within the package
+    :returns: the `Service`
+    """
+    return Service(
+        NamespacedType([srv.pkg_name, subfolder], srv.srv_name),
+        _get_definition_message(srv.request, subfolder),
+        _get_definition_message(srv.response, subfolder))
+
+
+def get_definition_action(action, subfolder='action'):
+    """
+    Get the definition action of an action specification.
+
+    The fields added implicitly by `rosidl_adapter.parser` are skipped since
+    the `Action` derives them itself.
+
+    :param rosidl_adapter.parser.ActionSpecification action: the action
+    :param str subfolder: the namespace of the action within the package
+    :returns: the `Action`
+    """
+    return Action(
+        NamespacedType([action.pkg_name, subfolder], action.action_name),
+        _get_definition_message(
+            action.goal_service.request, subfolder,
+            implicit_field_count=_ACTION_IMPLICIT_FIELD_COUNTS[0]),
+        _get_definition_message(
+            action.result_service.response, subfolder,
+            implicit_field_count=_ACTION_IMPLICIT_FIELD_COUNTS[3]),
+        _get_definition_message(
+            action.feedback, subfolder,
+            implicit_field_count=_ACTION_IMPLICIT_FIELD_COUNTS[4]))
+
+
+def get_idl_content(spec):
+    """
+    Get the content of the .idl file generated for an interface specification.
+
+    The content is the same as `rosidl_parser.parser.parse_idl_file` returns
+    for the .idl file generated by `rosidl_adapter` but without rendering the
+    file and parsing it again.
+
+    :param spec: the `MessageSpecification`, `ServiceSpecification` or
+      `ActionSpecification`
+    :returns: the `IdlContent`
+    """
+    if isinstance(spec, MessageSpecification):
+        messages = [spec]
+        fields = list(spec.fields)
+        element = get_definition_message(spec)
+    elif isinstance(spec, ServiceSpecification):
+        messages = [spec.request, spec.response]
+        fields = spec.request.fields + spec.response.fields
+        element = get_definition_service(spec)
+    elif isinstance(spec, ActionSpecification):
+        messages = [
+            spec.goal_service.request, spec.result_service.response,
+            spec.feedback]
+        fields = []
+        for msg, implicit_field_count in zip((
+            spec.goal_service.request, spec.goal_service.response,
+            spec.result_service.request, spec.result_service.response,
+            spec.feedback,
+        ), _ACTION_IMPLICIT_FIELD_COUNTS):
+            fields += msg.fields[implicit_field_count:]
+        element = get_definition_action(spec)
+    else:
+        assert False, 'Unknown specification type: %s' % type(spec)
+
+    include_files = set()
+    for field in fields:
+        if not field.type.is_primitive_type():
+            include_files.add('{type_.pkg_name}/msg/{type_.type}.idl'.format(
+                type_=field.type))
+
+    content = IdlContent()
+    content.elements += [Include(f) for f in sorted(include_files)]
+    for msg in messages:
+        content.elements += get_definition_constants(msg)
+    content.elements.append(element)
+    return content
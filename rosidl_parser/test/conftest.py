@@ -0,0 +1,27 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from rosidl_parser.parser import CACHE_DIR_ENVIRONMENT_VARIABLE
+
+
+@pytest.fixture(autouse=True, scope='session')
+def parser_cache_dir(tmp_path_factory):
+    # use the on-disk cache of the parser without sharing it across sessions
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(
+            CACHE_DIR_ENVIRONMENT_VARIABLE,
+            str(tmp_path_factory.mktemp('rosidl_parser_cache')))
+        yield
@@ -0,0 +1,75 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+import pytest
+
+from rosidl_parser.definition import Array
+from rosidl_parser.definition import BasicType
+from rosidl_parser.definition import BoundedSequence
+from rosidl_parser.definition import NamespacedType
+from rosidl_parser.definition import String
+from rosidl_parser.definition import UnboundedSequence
+from rosidl_parser.definition import WString
+
+
+def test_interned_types():
+    assert BasicType('uint8') is BasicType('uint8')
+    assert BasicType('uint8') is not BasicType('int8')
+    assert NamespacedType(['builtin_interfaces', 'msg'], 'Time') is \
+        NamespacedType(('builtin_interfaces', 'msg'), 'Time')
+    assert String() is String(maximum_size=None)
+    assert String(5) is not String()
+    assert String(5) is not WString(5)
+    assert Array(BasicType('int16'), 5) is Array(BasicType('int16'), 5)
+    assert Array(BasicType('int16'), 5) != Array(BasicType('int16'), 6)
+    assert UnboundedSequence(String()) is UnboundedSequence(String())
+    assert BoundedSequence(String(), 3) != UnboundedSequence(String())
+
+
+def test_hashable_types():
+    types = {
+        BasicType('uint8'): 'uint8',
+        NamespacedType(['pkg', 'msg'], 'Foo'): 'Foo',
+        BoundedSequence(NamespacedType(['pkg', 'msg'], 'Foo'), 3): 'Foo[<=3]',
+    }
+    assert types[BasicType('uint8')] == 'uint8'
+    assert types[NamespacedType(['pkg', 'msg'], 'Foo')] == 'Foo'
+    assert types[BoundedSequence(
+        NamespacedType(['pkg', 'msg'], 'Foo'), 3)] == 'Foo[<=3]'
+    assert Array(BasicType('uint8'), 3) not in types
+
+
+def test_immutable_types():
+    type_ = NamespacedType(['pkg', 'msg'], 'Foo')
+    assert type_.namespaces == ['pkg', 'msg']
+    with pytest.raises(AttributeError):
+        type_.name = 'Bar'
+    with pytest.raises(AttributeError):
+        type_.namespaces = ['pkg', 'srv']
+    # modifying the returned list doesn't affect the type
+    type_.namespaces.append('detail')
+    assert type_.namespaces + ['Foo'] == ['pkg', 'msg', 'Foo']
+    assert type_ is NamespacedType(['pkg', 'msg'], 'Foo')
+    with pytest.raises(AttributeError):
+        del type_.name
+    with pytest.raises(AttributeError):
+        Array(type_, 3).basetype = BasicType('uint8')
+    assert type_.name == 'Foo'
+
+
+def test_pickled_types():
+    type_ = BoundedSequence(NamespacedType(['pkg', 'msg'], 'Foo'), 3)
+    assert pickle.loads(pickle.dumps(type_)) is type_
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import pathlib
 
+from lark import Lark
+from lark.tree import Tree
 import pytest
 
 from rosidl_parser.definition import Action
@@ -29,7 +32,16 @@ from rosidl_parser.definition import Service
 from rosidl_parser.definition import String
 from rosidl_parser.definition import UnboundedSequence
 from rosidl_parser.definition import WString
+from rosidl_parser.parser import _ContentExtractor
+from rosidl_parser.parser import CACHE_DIR_ENVIRONMENT_VARIABLE
+from rosidl_parser.parser import create_parser
+from rosidl_parser.parser import extract_content_from_ast
+from rosidl_parser.parser import get_cache_dir
+from rosidl_parser.parser import get_parser
+from rosidl_parser.parser import IDL_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE
 from rosidl_parser.parser import parse_idl_file
+from rosidl_parser.parser import parse_idl_files
+from rosidl_parser.parser import PARSER_TYPES
 
 MESSAGE_IDL_LOCATOR = IdlLocator(
     pathlib.Path(__file__).parent, pathlib.Path('msg') / 'MyMessage.idl')
@@ -39,9 +51,231 @@ ACTION_IDL_LOCATOR = IdlLocator(
     pathlib.Path(__file__).parent, pathlib.Path('action') / 'MyAction.idl')
 
 
-@pytest.fixture(scope='module')
-def message_idl_file():
-    return parse_idl_file(MESSAGE_IDL_LOCATOR)
+@pytest.mark.parametrize(
+    'locator', [MESSAGE_IDL_LOCATOR, SERVICE_IDL_LOCATOR, ACTION_IDL_LOCATOR])
+def test_parser_types_equivalence(locator):
+    idl_string = locator.get_absolute_path().read_text()
+    trees = [
+        get_parser(parser_type).parse(idl_string)
+        for parser_type in PARSER_TYPES]
+    for tree in trees[1:]:
+        assert tree == trees[0]
+
+
+@pytest.mark.parametrize('parser_type', PARSER_TYPES)
+@pytest.mark.parametrize('type_string', [
+    'sequence<string<5>>',
+    'sequence<sequence<short>>',
+    'sequence<sequence<string<5>>>',
+    'sequence<string<5> >',
+    'sequence<string<(16 >> 2)>>',
+])
+def test_parser_nested_templates(parser_type, type_string):
+    idl_string = 'module pkg { module msg { struct Foo { %s bar; }; }; };' % \
+        type_string
+    tree = get_parser(parser_type).parse(idl_string)
+    assert len(list(tree.find_data('sequence_type'))) == \
+        type_string.count('sequence')
+    assert tree == get_parser(PARSER_TYPES[0]).parse(idl_string)
+
+
+@pytest.mark.parametrize('parser_type', PARSER_TYPES)
+def test_parser_shift_operator(parser_type):
+    idl_string = \
+        'module pkg { module msg { module Foo_Constants { ' \
+        'const short BAR = 16 >> 2; }; }; };'
+    tree = get_parser(parser_type).parse(idl_string)
+    assert len(list(tree.find_data('shift_expr'))) == 2
+
+
+def test_create_parser_cache(tmp_path, monkeypatch, capfd):
+    cache_dir = str(tmp_path)
+    idl_string = MESSAGE_IDL_LOCATOR.get_absolute_path().read_text()
+    parser = create_parser('lalr', cache_dir=cache_dir)
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+
+    # the cached parser is being loaded without compiling the grammar
+    class UncompilableLark(Lark):
+
+        def __init__(self, *args, **kwargs):
+            assert False, 'The grammar should not be compiled'
+
+    monkeypatch.setattr('rosidl_parser.parser.Lark', UncompilableLark)
+    cached_parser = create_parser('lalr', cache_dir=cache_dir)
+    assert cached_parser is not parser
+    assert cached_parser.parse(idl_string) == parser.parse(idl_string)
+    assert capfd.readouterr().err == ''
+    monkeypatch.undo()
+
+    # a corrupted cache file is being replaced
+    cache_file = os.path.join(cache_dir, cache_files[0])
+    with open(cache_file, 'wb') as h:
+        h.write(b'corrupted')
+    parser = create_parser('lalr', cache_dir=cache_dir)
+    assert parser.parse(idl_string) == cached_parser.parse(idl_string)
+    assert 'Failed to load the cached parser' in capfd.readouterr().err
+    assert os.listdir(cache_dir) == cache_files
+    assert os.path.getsize(cache_file) > len(b'corrupted')
+
+
+def test_create_parser_cache_earley(tmp_path):
+    # Lark can only store LALR parsers
+    parser = create_parser('earley', cache_dir=str(tmp_path))
+    assert parser.options.parser == 'earley'
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_create_parser_cache_unsupported(tmp_path, monkeypatch):
+    # Lark versions older than 0.8 can't save a parser
+    monkeypatch.delattr(Lark, 'save')
+    parser = create_parser('lalr', cache_dir=str(tmp_path))
+    assert parser.options.parser == 'lalr'
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_get_cache_dir(monkeypatch):
+    # the cache is opt-in to not write outside of the build directory
+    monkeypatch.delenv(CACHE_DIR_ENVIRONMENT_VARIABLE, raising=False)
+    assert get_cache_dir() is None
+    monkeypatch.setenv(CACHE_DIR_ENVIRONMENT_VARIABLE, '')
+    assert get_cache_dir() is None
+    monkeypatch.setenv(CACHE_DIR_ENVIRONMENT_VARIABLE, '/tmp/foo')
+    assert get_cache_dir() == '/tmp/foo'
+
+
+def _get_member_names(idl_file):
+    messages = idl_file.content.get_elements_of_type(Message)
+    return [m.name for m in messages[0].structure.members]
+
+
+def test_parse_idl_file_cache(tmpdir, monkeypatch):
+    cache_dir = str(tmpdir)
+    idl_file = parse_idl_file(MESSAGE_IDL_LOCATOR, cache_dir=cache_dir)
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+
+    cached_idl_file = parse_idl_file(MESSAGE_IDL_LOCATOR, cache_dir=cache_dir)
+    assert cached_idl_file.locator == MESSAGE_IDL_LOCATOR
+    assert cached_idl_file.content is not idl_file.content
+    assert _get_member_names(cached_idl_file) == _get_member_names(idl_file)
+    assert os.listdir(cache_dir) == cache_files
+
+    # a corrupted cache file is being replaced
+    cache_file = os.path.join(cache_dir, cache_files[0])
+    with open(cache_file, 'wb') as h:
+        h.write(b'corrupted')
+    idl_file = parse_idl_file(MESSAGE_IDL_LOCATOR, cache_dir=cache_dir)
+    assert _get_member_names(idl_file) == _get_member_names(cached_idl_file)
+    assert os.path.getsize(cache_file) > len(b'corrupted')
+
+    # the least recently used files are being evicted
+    os.utime(cache_file, (0, 0))
+    monkeypatch.setenv(
+        IDL_CACHE_MAX_SIZE_ENVIRONMENT_VARIABLE,
+        str(os.path.getsize(cache_file)))
+    parse_idl_file(SERVICE_IDL_LOCATOR, cache_dir=cache_dir)
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+    assert not os.path.exists(cache_file)
+
+
+@pytest.mark.parametrize('min_items_per_job', [1, 1000])
+def test_parse_idl_files(tmpdir, monkeypatch, capfd, min_items_per_job):
+    # a minimum of 1 enforces the process pool, 1000 the in-process fallback
+    monkeypatch.setattr(
+        'rosidl_adapter.parallel.MIN_ITEMS_PER_JOB', min_items_per_job)
+    locators = [
+        SERVICE_IDL_LOCATOR, MESSAGE_IDL_LOCATOR, ACTION_IDL_LOCATOR,
+        MESSAGE_IDL_LOCATOR]
+    idl_files = parse_idl_files(locators, jobs=2)
+    assert [i.locator.get_absolute_path() for i in idl_files] == \
+        [locator.get_absolute_path() for locator in locators]
+    assert len(idl_files[0].content.get_elements_of_type(Service)) == 1
+    assert len(idl_files[1].content.get_elements_of_type(Message)) == 1
+    assert len(idl_files[2].content.get_elements_of_type(Action)) == 1
+    assert _get_member_names(idl_files[3]) == _get_member_names(idl_files[1])
+
+    invalid_locators = [
+        IdlLocator(str(tmpdir), name) for name in ('Foo.idl', 'Bar.idl')]
+    for invalid_locator in invalid_locators:
+        invalid_locator.get_absolute_path().write_text('module invalid {')
+    with pytest.raises(Exception):
+        parse_idl_files(invalid_locators[:1] + locators + invalid_locators[1:], jobs=2)
+    # the other files are still parsed after the first failure
+    err = capfd.readouterr().err
+    for invalid_locator in invalid_locators:
+        assert str(invalid_locator.get_absolute_path()) in err
+
+
+def _get_message_idl_string(member_count):
+    members = ''.join(
+        '      @default (value={i})\n'
+        '      sequence<int32, 5> values{i};\n'
+        '      string<3> strings{i}[4];\n'.format(i=i)
+        for i in range(member_count))
+    return \
+        'module pkgname {\n' \
+        '  module msg {\n' \
+        '    struct Big {\n' + members + \
+        '    };\n' \
+        '  };\n' \
+        '};\n'
+
+
+def test_extract_content_scaling(monkeypatch):
+    visited_nodes = []
+    visit = _ContentExtractor.visit
+    iter_subtrees = Tree.iter_subtrees
+
+    def counting_visit(self, tree):
+        visited_nodes.append(tree)
+        return visit(self, tree)
+
+    def counting_iter_subtrees(self, *args, **kwargs):
+        for subtree in iter_subtrees(self, *args, **kwargs):
+            visited_nodes.append(subtree)
+            yield subtree
+
+    for member_count in (250, 2000):
+        tree = get_parser().parse(_get_message_idl_string(member_count))
+        tree_size = len(list(tree.iter_subtrees()))
+
+        with monkeypatch.context() as m:
+            m.setattr(_ContentExtractor, 'visit', counting_visit)
+            content = extract_content_from_ast(tree)
+            extractor_visits = len(visited_nodes)
+            m.setattr(Tree, 'iter_subtrees', counting_iter_subtrees)
+            visited_nodes.clear()
+            extract_content_from_ast(tree)
+            node_visits = len(visited_nodes)
+            visited_nodes.clear()
+
+        structure = content.get_elements_of_type(Message)[0].structure
+        assert structure.type.namespaces == ['pkgname', 'msg']
+        assert len(structure.members) == 2 * member_count
+        member = structure.members[-1]
+        assert member.name == 'strings{0}'.format(member_count - 1)
+        assert isinstance(member.type, Array)
+        assert member.type.size == 4
+        assert member.type.basetype.maximum_size == 3
+        assert not member.annotations
+        member = structure.members[-2]
+        assert member.name == 'values{0}'.format(member_count - 1)
+        assert member.type.upper_bound == 5
+        assert member.annotations[0].value == {'value': member_count - 1}
+
+        # the extractor only visits the nodes down to the struct definition
+        # independent of the number of members
+        assert extractor_visits == 10
+        # and each node is visited at most once when extracting the members
+        # instead of searching the whole tree for each of them
+        assert node_visits <= tree_size + extractor_visits
+
+
+@pytest.fixture(scope='module', params=PARSER_TYPES)
+def message_idl_file(request):
+    return parse_idl_file(MESSAGE_IDL_LOCATOR, parser_type=request.param)
 
 
 def test_message_parser(message_idl_file):
@@ -169,9 +403,9 @@ def test_message_parser_annotations(message_idl_file):
     assert structure.members[3].annotations[1].value['max'] == 10
 
 
-@pytest.fixture(scope='module')
-def service_idl_file():
-    return parse_idl_file(SERVICE_IDL_LOCATOR)
+@pytest.fixture(scope='module', params=PARSER_TYPES)
+def service_idl_file(request):
+    return parse_idl_file(SERVICE_IDL_LOCATOR, parser_type=request.param)
 
 
 def test_service_parser(service_idl_file):
@@ -186,9 +420,9 @@ def test_service_parser(service_idl_file):
     assert len(srv.response_message.structure.members) == 1
 
 
-@pytest.fixture(scope='module')
-def action_idl_file():
-    return parse_idl_file(ACTION_IDL_LOCATOR)
+@pytest.fixture(scope='module', params=PARSER_TYPES)
+def action_idl_file(request):
+    return parse_idl_file(ACTION_IDL_LOCATOR, parser_type=request.param)
 
 
 def test_action_parser(action_idl_file):
@@ -0,0 +1,116 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from rosidl_adapter.parser import parse_message_string
+from rosidl_parser.definition import Array
+from rosidl_parser.definition import BasicType
+from rosidl_parser.definition import BoundedSequence
+from rosidl_parser.definition import Member
+from rosidl_parser.definition import NamespacedType
+from rosidl_parser.definition import String
+from rosidl_parser.definition import Structure
+from rosidl_parser.definition import UnboundedSequence
+from rosidl_parser.definition import WString
+from rosidl_parser.serialized_size import MaxSerializedSizeCalculator
+from rosidl_parser.specification import get_definition_message
+from rosidl_parser.specification import get_definition_structure
+
+INNER_TYPE = NamespacedType(['pkg', 'msg'], 'Inner')
+OUTER_TYPE = NamespacedType(['pkg', 'msg'], 'Outer')
+
+
+def _get_calculator(get_structure=None):
+    return MaxSerializedSizeCalculator(
+        structures=[
+            Structure(INNER_TYPE, members=[
+                Member(BasicType('uint8'), 'a'),
+                Member(BasicType('double'), 'b'),
+            ]),
+            Structure(OUTER_TYPE, members=[
+                Member(BasicType('boolean'), 'flag'),
+                Member(Array(INNER_TYPE, 2), 'inners'),
+                Member(BoundedSequence(BasicType('int16'), 3), 'values'),
+                Member(String(maximum_size=5), 'name'),
+            ]),
+        ],
+        get_structure=get_structure)
+
+
+def test_basic_types():
+    calculator = _get_calculator()
+    assert calculator.get_max_serialized_size(BasicType('uint8')) == 1
+    assert calculator.get_max_serialized_size(BasicType('int32')) == 4
+    assert calculator.get_max_serialized_size(BasicType('int32'), 1) == 7
+    assert calculator.get_max_serialized_size(BasicType('double'), 4) == 12
+    assert calculator.get_max_serialized_size(BasicType('double'), 8) == 8
+
+
+def test_bounded_types():
+    calculator = _get_calculator()
+    # length, characters and terminating null
+    assert calculator.get_max_serialized_size(String(maximum_size=5)) == 10
+    assert calculator.get_max_serialized_size(WString(maximum_size=5)) == 14
+    assert calculator.get_max_serialized_size(
+        Array(BasicType('int64'), 3), 4) == 28
+    assert calculator.get_max_serialized_size(
+        BoundedSequence(BasicType('int64'), 3)) == 32
+    assert calculator.get_max_serialized_size(
+        Array(String(maximum_size=2), 2)) == 7 + 1 + 7
+
+
+def test_unbounded_types():
+    calculator = _get_calculator()
+    assert calculator.get_max_serialized_size(String()) is None
+    assert calculator.get_max_serialized_size(WString()) is None
+    assert calculator.get_max_serialized_size(
+        UnboundedSequence(BasicType('uint8'))) is None
+    assert calculator.get_max_serialized_size(
+        Array(String(), 3)) is None
+
+
+def test_nested_types():
+    calculator = _get_calculator()
+    assert calculator.get_max_serialized_size(INNER_TYPE) == 16
+    assert calculator.get_max_serialized_size(INNER_TYPE, 1) == 15
+    # flag (1), inners (15 + 16), values (4 + 3 * 2) and name (2 + 4 + 6)
+    assert calculator.get_max_serialized_size(OUTER_TYPE) == 54
+
+
+def test_get_structure():
+    requested_types = []
+
+    def get_structure(type_):
+        requested_types.append(type_)
+        return None
+
+    calculator = _get_calculator(get_structure)
+    type_ = NamespacedType(['other', 'msg'], 'Unknown')
+    with pytest.raises(ValueError):
+        calculator.get_max_serialized_size(Array(type_, 2))
+    assert requested_types == [type_]
+
+
+def test_empty_structure():
+    msg = parse_message_string('pkg', 'Empty', '')
+    message = get_definition_message(msg)
+    empty_type = message.structure.type
+    # the structure of the .msg file doesn't contain the placeholder member
+    # which is part of the structure of the .idl file
+    for structure in (get_definition_structure(msg), message.structure):
+        calculator = MaxSerializedSizeCalculator(structures=[structure])
+        assert calculator.get_max_serialized_size(empty_type) == 1
+        assert calculator.get_max_serialized_size(
+            Array(empty_type, 3)) == 3
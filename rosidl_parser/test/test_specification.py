@@ -0,0 +1,203 @@
+# Copyright 2018 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import os
+import pathlib
+
+import em
+import pytest
+
+from rosidl_adapter import convert_to_idl
+from rosidl_parser import parse_action_file
+from rosidl_parser import parse_message_file
+from rosidl_parser import parse_service_file
+from rosidl_parser.definition import AbstractType
+from rosidl_parser.definition import Action
+from rosidl_parser.definition import Constant
+from rosidl_parser.definition import IdlLocator
+from rosidl_parser.definition import Include
+from rosidl_parser.definition import Member
+from rosidl_parser.definition import Message
+from rosidl_parser.definition import Service
+from rosidl_parser.definition import String
+from rosidl_parser.definition import Structure
+from rosidl_parser.definition import UnboundedSequence
+from rosidl_parser.parser import parse_idl_file
+from rosidl_parser.parser import PARSER_TYPES
+from rosidl_parser.specification import get_definition_message
+from rosidl_parser.specification import get_idl_content
+
+INTERFACE_FILE_PARSERS = {
+    '.msg': parse_message_file,
+    '.srv': parse_service_file,
+    '.action': parse_action_file,
+}
+
+INTERFACES = {
+    'msg/Features.msg': (
+        '# a comment\n'
+        'bool BOOL_CONSTANT=true\n'
+        'int32 INT_CONSTANT=-42\n'
+        'float64 FLOAT_CONSTANT=1.5\n'
+        'string STRING_CONSTANT="foo\'bar"\n'
+        'bool a true\n'
+        'byte b 255\n'
+        'char c -1\n'
+        'float32 d 1.25  # [m/s]\n'
+        'int64 e -9223372036854775808\n'
+        'string f "Hello\\"World"\n'
+        'string<=5 g "abc"\n'
+        'string<=5[3] h ["a", "b\'c", "d"]\n'
+        'string<=5[<=10] i\n'
+        'int32[] j [1]\n'
+        'int32[3] k\n'
+        'uint8[<=2] l []\n'
+        'Other m\n'
+        'Other[2] n\n'
+        'other_pkg/Other[] o\n'
+        'other_pkg/Other[<=3] p\n'
+        'string<=5[] q ["a", "b"]\n'
+        'string<=5[<=3] r\n'),
+    'msg/Empty.msg': '',
+    'srv/Service.srv': (
+        'int8 REQUEST_CONSTANT=1\n'
+        'other_pkg/Other request\n'
+        '---\n'
+        'string RESPONSE_CONSTANT="bar"\n'
+        'bool[] response [true, false]\n'),
+    'action/Action.action': (
+        'int32 goal 5\n'
+        '---\n'
+        'Other[] result\n'
+        '---\n'
+        'float64 FEEDBACK_CONSTANT=0.5\n'
+        'string<=3 feedback\n'),
+    'action/EmptyAction.action': '---\n---\n',
+}
+
+# the interface files of other packages in the same source tree
+REPOSITORY_INTERFACE_FILES = sorted(
+    f
+    for subfolder, extension in (
+        ('msg', '.msg'), ('srv', '.srv'), ('action', '.action'))
+    for f in glob.glob(os.path.join(
+        os.path.dirname(__file__), '..', '..', '*', subfolder,
+        '*' + extension)))
+
+
+@pytest.fixture(autouse=True)
+def empy_stdout_proxy(monkeypatch):
+    # EmPy refuses to install its stdout proxy again after pytest replaced
+    # sys.stdout between tests
+    monkeypatch.setattr(em.Interpreter, '_wasProxyInstalled', False)
+
+
+def _get_comparable(value):
+    # a representation which can be compared since only types implement
+    # equality
+    if isinstance(value, AbstractType):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_get_comparable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _get_comparable(v) for k, v in value.items()}
+    if isinstance(value, Include):
+        return ('Include', value.locator)
+    if isinstance(value, Constant):
+        return ('Constant', value.name, value.type, value.value)
+    if isinstance(value, Member):
+        return ('Member', value.name, value.type, [
+            (a.name, a.value) for a in value.annotations])
+    if isinstance(value, Structure):
+        return ('Structure', value.type, _get_comparable(value.members))
+    if isinstance(value, Message):
+        return (
+            'Message', _get_comparable(value.structure),
+            _get_comparable(value.constants), value.enums)
+    if isinstance(value, Service):
+        return (
+            'Service', value.structure_type,
+            _get_comparable(value.request_message),
+            _get_comparable(value.response_message))
+    if isinstance(value, Action):
+        return (
+            'Action', value.structure_type,
+            _get_comparable(value.goal_request),
+            _get_comparable(value.result_response),
+            _get_comparable(value.feedback))
+    return value
+
+
+def _assert_equivalent(
+    package_dir, pkg_name, interface_file, output_dir, parser_type=None
+):
+    idl_file = convert_to_idl(
+        package_dir, pkg_name, interface_file, output_dir)
+    expected = parse_idl_file(
+        IdlLocator(output_dir, idl_file.relative_to(output_dir)),
+        parser_type=parser_type).content
+
+    spec = INTERFACE_FILE_PARSERS[interface_file.suffix](
+        pkg_name, str(package_dir / interface_file))
+    content = get_idl_content(spec)
+
+    assert _get_comparable(content.elements) == \
+        _get_comparable(expected.elements)
+
+
+@pytest.mark.parametrize('parser_type', PARSER_TYPES)
+@pytest.mark.parametrize('interface_file', sorted(INTERFACES.keys()))
+def test_get_idl_content(tmpdir, interface_file, parser_type):
+    package_dir = pathlib.Path(str(tmpdir)) / 'pkg'
+    path = package_dir / interface_file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(INTERFACES[interface_file])
+    _assert_equivalent(
+        package_dir, 'pkg', pathlib.Path(interface_file),
+        pathlib.Path(str(tmpdir)) / 'idl', parser_type=parser_type)
+
+
+@pytest.mark.parametrize(
+    'interface_file', REPOSITORY_INTERFACE_FILES,
+    ids=[os.path.basename(f) for f in REPOSITORY_INTERFACE_FILES])
+def test_get_idl_content_of_repository_interfaces(tmpdir, interface_file):
+    path = pathlib.Path(os.path.abspath(interface_file))
+    package_dir = path.parent.parent
+    _assert_equivalent(
+        package_dir, package_dir.name,
+        pathlib.Path(path.parent.name) / path.name,
+        pathlib.Path(str(tmpdir)))
+
+
+def test_get_definition_message(tmpdir):
+    path = pathlib.Path(str(tmpdir)) / 'Features.msg'
+    path.write_text(INTERFACES['msg/Features.msg'])
+    msg = get_definition_message(parse_message_file('pkg', str(path)))
+
+    assert msg.structure.type.namespaces == ['pkg', 'msg']
+    assert msg.structure.type.name == 'Features'
+    assert list(msg.constants.keys()) == [
+        'BOOL_CONSTANT', 'INT_CONSTANT', 'FLOAT_CONSTANT', 'STRING_CONSTANT']
+    assert msg.constants['STRING_CONSTANT'].type == String()
+    assert msg.constants['STRING_CONSTANT'].value == "foo'bar"
+
+    members = {m.name: m for m in msg.structure.members}
+    assert members['g'].type == String(maximum_size=5)
+    assert members['q'].type == UnboundedSequence(String(maximum_size=5))
+    assert members['h'].annotations[0].value == {
+        'value': "('a', \"b'c\", 'd')"}
+    assert members['j'].annotations[0].value == {'value': '(1, )'}
+    assert members['d'].annotations[1].name == 'unit'
+    assert members['d'].annotations[1].value == {'value': 'm/s'}
@@ -79,10 +79,48 @@ foreach(dep ${target_dependencies})
   endif()
 endforeach()
 
+set(_generated_outputs
+  ${_generated_msg_header_files} ${_generated_msg_source_files}
+  ${_generated_srv_header_files} ${_generated_srv_source_files}
+  ${_generated_action_header_files} ${_generated_action_source_files})
+
+# the generator writes the interface files of the dependencies which the
+# generated files actually use to a depfile
+# but only the Ninja generator supports depfiles for custom commands
+# since a single command generates all files it still reruns for any change of
+# its dependencies, the generator itself skips the unchanged interfaces based
+# on the manifest in its output directory
+set(_depfile "")
+set(_depfile_target "")
+set(_depfile_arguments "")
+set(_custom_command_dependencies ${target_dependencies})
+if(CMAKE_GENERATOR MATCHES "Ninja" AND NOT CMAKE_VERSION VERSION_LESS 3.7)
+  set(_depfile "${CMAKE_CURRENT_BINARY_DIR}/rosidl_typesupport_introspection_cpp.d")
+  set(_depfile_arguments DEPFILE "${_depfile}")
+  # Ninja requires the depfile to name the first output as in the build file,
+  # which is relative to the build directory unless CMake translates the
+  # depfile as with policy CMP0116
+  list(GET _generated_outputs 0 _depfile_target)
+  set(_depfile_policy "OLD")
+  if(POLICY CMP0116)
+    cmake_policy(GET CMP0116 _depfile_policy)
+  endif()
+  if(NOT _depfile_policy STREQUAL "NEW")
+    file(RELATIVE_PATH _depfile_target "${CMAKE_BINARY_DIR}" "${_depfile_target}")
+  endif()
+  # changes to interfaces of the dependencies which aren't used by any
+  # generated file don't need to rerun the generator
+  if(NOT "${_dependency_files}" STREQUAL "")
+    list(REMOVE_ITEM _custom_command_dependencies ${_dependency_files})
+  endif()
+endif()
+
 set(generator_arguments_file "${CMAKE_CURRENT_BINARY_DIR}/rosidl_typesupport_introspection_cpp__arguments.json")
 rosidl_write_generator_arguments(
   "${generator_arguments_file}"
   PACKAGE_NAME "${PROJECT_NAME}"
+  DEPFILE "${_depfile}"
+  DEPFILE_TARGET "${_depfile_target}"
   ROS_INTERFACE_FILES "${rosidl_generate_interfaces_IDL_FILES}"
   ROS_INTERFACE_DEPENDENCIES "${_dependencies}"
   OUTPUT_DIR "${_output_path}"
@@ -91,12 +129,11 @@ rosidl_write_generator_arguments(
 )
 
 add_custom_command(
-  OUTPUT ${_generated_msg_header_files} ${_generated_msg_source_files}
-    ${_generated_srv_header_files} ${_generated_srv_source_files}
-    ${_generated_action_header_files} ${_generated_action_source_files}
+  OUTPUT ${_generated_outputs}
   COMMAND ${PYTHON_EXECUTABLE} ${rosidl_typesupport_introspection_cpp_BIN}
   --generator-arguments-file "${generator_arguments_file}"
-  DEPENDS ${target_dependencies}
+  DEPENDS ${_custom_command_dependencies}
+  ${_depfile_arguments}
   COMMENT "Generating C++ introspection for ROS interfaces"
   VERBATIM
 )
@@ -16,76 +16,71 @@ import os
 
 from rosidl_cmake import convert_camel_case_to_lower_case_underscore
 from rosidl_cmake import expand_template
-from rosidl_cmake import extract_message_types
-from rosidl_cmake import get_newest_modification_time
+from rosidl_cmake import generate_interface_files
+from rosidl_cmake import parse_interface_file
 from rosidl_cmake import read_generator_arguments
 from rosidl_generator_cpp import MSG_TYPE_TO_CPP
-from rosidl_parser import parse_message_file
-from rosidl_parser import parse_service_file
-from rosidl_parser import validate_field_types
+from rosidl_parser import validate_all_field_types
 
 
-def generate_cpp(generator_arguments_file):
+def generate_cpp(generator_arguments_file, jobs=None):
     args = read_generator_arguments(generator_arguments_file)
+    return generate_interface_files(
+        args, _IntrospectionCppGenerator, generator_files=[__file__], jobs=jobs)
 
-    template_dir = args['template_dir']
-    mapping_msgs = {
-        os.path.join(template_dir, 'msg__rosidl_typesupport_introspection_cpp.hpp.em'):
-        '%s__rosidl_typesupport_introspection_cpp.hpp',
-        os.path.join(template_dir, 'msg__type_support.cpp.em'):
-        '%s__type_support.cpp',
-    }
-    mapping_srvs = {
-        os.path.join(template_dir, 'srv__rosidl_typesupport_introspection_cpp.hpp.em'):
-        '%s__rosidl_typesupport_introspection_cpp.hpp',
-        os.path.join(template_dir, 'srv__type_support.cpp.em'):
-        '%s__type_support.cpp',
-    }
 
-    for template_file in mapping_msgs.keys():
-        assert os.path.exists(template_file), 'Could not find template: ' + template_file
+class _IntrospectionCppGenerator:
+    """Generate the C++ introspection files for a single interface file."""
 
-    for template_file in mapping_srvs.keys():
-        assert os.path.exists(template_file), 'Could not find template: ' + template_file
+    def __init__(self, args, dependencies):
+        self.args = args
+        self.dependencies = dependencies
 
-    pkg_name = args['package_name']
-    known_msg_types = extract_message_types(
-        pkg_name, args['ros_interface_files'], args.get('ros_interface_dependencies', []))
+        template_dir = args['template_dir']
+        self.mapping_msgs = {
+            os.path.join(template_dir, 'msg__rosidl_typesupport_introspection_cpp.hpp.em'):
+            '%s__rosidl_typesupport_introspection_cpp.hpp',
+            os.path.join(template_dir, 'msg__type_support.cpp.em'):
+            '%s__type_support.cpp',
+        }
+        self.mapping_srvs = {
+            os.path.join(template_dir, 'srv__rosidl_typesupport_introspection_cpp.hpp.em'):
+            '%s__rosidl_typesupport_introspection_cpp.hpp',
+            os.path.join(template_dir, 'srv__type_support.cpp.em'):
+            '%s__type_support.cpp',
+        }
+        for template_file in list(self.mapping_msgs.keys()) + list(self.mapping_srvs.keys()):
+            assert os.path.exists(template_file), 'Could not find template: ' + template_file
 
-    functions = {
-        'get_header_filename_from_msg_name': convert_camel_case_to_lower_case_underscore,
-    }
-    latest_target_timestamp = get_newest_modification_time(args['target_dependencies'])
+        self.functions = {
+            'get_header_filename_from_msg_name': convert_camel_case_to_lower_case_underscore,
+        }
 
-    for ros_interface_file in args['ros_interface_files']:
+    def __call__(self, ros_interface_file):
         extension = os.path.splitext(ros_interface_file)[1]
         subfolder = os.path.basename(os.path.dirname(ros_interface_file))
         if extension == '.msg':
-            spec = parse_message_file(pkg_name, ros_interface_file)
-            validate_field_types(spec, known_msg_types)
-            for template_file, generated_filename in mapping_msgs.items():
-                generated_file = os.path.join(
-                    args['output_dir'], subfolder, generated_filename %
-                    convert_camel_case_to_lower_case_underscore(spec.base_type.type))
-
-                data = {'spec': spec, 'subfolder': subfolder, 'cpp_primitives': MSG_TYPE_TO_CPP}
-                data.update(functions)
-                expand_template(
-                    template_file, data, generated_file,
-                    minimum_timestamp=latest_target_timestamp)
-
+            mapping = self.mapping_msgs
         elif extension == '.srv':
-            spec = parse_service_file(pkg_name, ros_interface_file)
-            validate_field_types(spec, known_msg_types)
-            for template_file, generated_filename in mapping_srvs.items():
-                generated_file = os.path.join(
-                    args['output_dir'], subfolder, generated_filename %
-                    convert_camel_case_to_lower_case_underscore(spec.srv_name))
-
-                data = {'spec': spec, 'subfolder': subfolder}
-                data.update(functions)
-                expand_template(
-                    template_file, data, generated_file,
-                    minimum_timestamp=latest_target_timestamp)
+            mapping = self.mapping_srvs
+        else:
+            return
+        spec = parse_interface_file(self.args['package_name'], ros_interface_file)
+        # the unknown field types of each interface are reported together
+        # after all interfaces have been processed
+        validate_all_field_types([spec], self.dependencies.registry)
+        name = spec.base_type.type if extension == '.msg' else spec.srv_name
+        for template_file, generated_filename in mapping.items():
+            generated_file = os.path.join(
+                self.args['output_dir'], subfolder, generated_filename %
+                convert_camel_case_to_lower_case_underscore(name))
 
-    return 0
+            data = {'spec': spec, 'subfolder': subfolder}
+            if extension == '.msg':
+                data['cpp_primitives'] = MSG_TYPE_TO_CPP
+            data.update(self.functions)
+            minimum_timestamp = self.dependencies.add(
+                generated_file, template_file, ros_interface_file, spec)
+            expand_template(
+                template_file, data, generated_file, minimum_timestamp=minimum_timestamp,
+                cache_key=self.dependencies.get_output_cache_key(generated_file))